@@ -2,6 +2,8 @@ import os
 import platform
 import subprocess as sp
 
+from fish.cli import COMMANDS
+
 package_type = os.environ.get("PACKAGE_TYPE", "onefile")
 assert package_type in ("onedir", "onefile"), "PACKAGE_TYPE must be onedir or onefile"
 
@@ -29,12 +31,16 @@ if platform.system() == "Windows":
         "--include-data-dir=assets=assets",
         "--include-data-dir=locales=locales",
         "--include-data-files=fish_audio_preprocess=fish_audio_preprocess/=**/*.py",
-        "--windows-console-mode=disable",
+        # No console window for the GUI, but ``fish tts`` run from a terminal
+        # prints to it
+        "--windows-console-mode=attach",
         "--enable-plugins=pkg-resources",
         "--enable-plugins=pyqt6",
         # --follow-import-to=numpy
         "--nofollow-import-to=mkl,click,scipy,pandas,matplotlib,pytest",
         "--include-qt-plugins=sensible,multimedia",
+        # Subcommands are imported by name, which Nuitka cannot follow
+        *[f"--include-module={module}" for module in COMMANDS.values()],
         "--show-memory",
         "--show-progress",
         # "--debug",
@@ -56,6 +62,8 @@ else:
         f"locales{sep}locales",
         "--noconsole",
         f"--icon={ICON_PATH}",
+        # Subcommands are imported by name, which PyInstaller cannot follow
+        *[f"--hidden-import={module}" for module in COMMANDS.values()],
     ]
 
 sp.check_call(args)
@@ -0,0 +1,8 @@
+# Headless subcommands and their modules, see ``python -m fish.cli``. They
+# are imported by name, build.py lists them as hidden imports for packaging
+COMMANDS = {
+    "tts": "fish.cli.tts",
+    "proxy": "fish.cli.proxy",
+    "standin": "fish.cli.standin",
+    "loadtest": "fish.cli.loadtest",
+}
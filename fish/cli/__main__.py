@@ -0,0 +1,23 @@
+"""Run a headless subcommand: ``python -m fish.cli <command> [args]``."""
+
+import argparse
+import importlib
+import sys
+
+from fish.cli import COMMANDS
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="fish", description="Headless fish-speech tools, no Qt required."
+    )
+    parser.add_argument("command", choices=list(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    # Only the chosen command's dependencies are imported
+    module = importlib.import_module(COMMANDS[args.command])
+    return module.main(args.args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,339 @@
+"""Load-test a fish-speech TTS backend with a replayed corpus.
+
+Example::
+
+    python -m fish.cli.loadtest http://localhost:8080/v1/tts \\
+        --corpus prompts.jsonl --ref voice.wav --concurrency 8 --requests 200
+
+The corpus is a text (one prompt per line), CSV or JSONL file as accepted
+by batch synthesis. Rows may carry a ``references`` column with audio
+paths separated by ``|``; each audio needs a ``.lab`` transcript.
+Requests stop after ``--requests`` or ``--duration``, whichever comes first.
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import random
+import sys
+import time
+import wave
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+import numpy as np
+import soundfile as sf
+
+from fish.config import config
+from fish.services.tts import TTSClient
+from fish.services.tts.batch import load_batch_items
+from fish.utils.wav import data_offset
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclass
+class Payload:
+    text: str
+    body: bytes
+
+
+@dataclass
+class Sample:
+    """Outcome of one request, latencies in seconds from sending it."""
+
+    start: float
+    ok: bool = False
+    status: int = 0
+    error: str | None = None
+    ttfb: float | None = None
+    ttfa: float | None = None
+    total: float | None = None
+    nbytes: int = 0
+    chars: int = 0
+    audio_seconds: float | None = None
+
+    @property
+    def rtf(self) -> float | None:
+        if not self.audio_seconds or self.total is None:
+            return None
+        return self.total / self.audio_seconds
+
+
+def audio_seconds(body: bytes) -> float | None:
+    offset = data_offset(body[:4096])
+    if offset is not None:
+        # Streamed WAVs carry placeholder sizes, so count the PCM bytes
+        with wave.open(io.BytesIO(body[:offset]), "rb") as f:
+            frame_size = f.getsampwidth() * f.getnchannels()
+            return (len(body) - offset) / frame_size / f.getframerate()
+    try:
+        return sf.info(io.BytesIO(body)).duration
+    except RuntimeError:
+        return None
+
+
+def _corpus_references(value, root: Path) -> list[str]:
+    if not value:
+        return []
+    paths = value if isinstance(value, list) else str(value).split("|")
+    return [str((root / p.strip()).resolve()) for p in paths if p.strip()]
+
+
+def build_payloads(args: argparse.Namespace) -> list[Payload]:
+    if args.corpus:
+        items = load_batch_items(args.corpus, format=args.format)
+        root = Path(args.corpus).parent
+    else:
+        items = [None]
+        root = Path.cwd()
+
+    payloads = []
+    for item in items:
+        text = item.text if item else args.text
+        params = dict(item.params) if item else {}
+        refs = _corpus_references(params.pop("references", None), root)
+        client = TTSClient(
+            backend=args.url,
+            api_key=args.api_key,
+            ref_files=refs or args.ref,
+            ref_id=args.reference_id,
+            chunk_length=args.chunk_length,
+            format=args.format,
+            latency=args.latency,
+        )
+        request = client.build_request(text, streaming=args.streaming, **params)
+        payloads.append(Payload(text=text, body=client.pack(request)))
+    return payloads
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, payloads: list[Payload]):
+        self.args = args
+        self.payloads = payloads
+        self.samples: list[Sample] = []
+        self.headers = TTSClient(args.url, args.api_key).headers
+        self._order = itertools.cycle(payloads)
+
+    def _done(self, started: int) -> bool:
+        if self.args.requests and started >= self.args.requests:
+            return True
+        return time.perf_counter() - self.start >= self.args.duration
+
+    @staticmethod
+    def _audio_offset(body: bytearray) -> int | None:
+        """Bytes before the first audio sample, None until the header is complete."""
+        if not body.startswith(b"RIFF") and len(body) >= 4:
+            return 0
+        offset = data_offset(bytes(body[:4096]))
+        if offset is None and len(body) >= 4096:
+            return 0
+        return offset
+
+    async def _request(self, client: httpx.AsyncClient, payload: Payload):
+        sample = Sample(start=time.perf_counter(), chars=len(payload.text))
+        self.samples.append(sample)
+        body, offset = bytearray(), None
+        try:
+            async with client.stream(
+                "POST", self.args.url, content=payload.body, headers=self.headers
+            ) as response:
+                sample.status = response.status_code
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    now = time.perf_counter() - sample.start
+                    if sample.ttfb is None:
+                        sample.ttfb = now
+                    body += chunk
+                    if offset is None:
+                        offset = self._audio_offset(body)
+                    if (
+                        offset is not None
+                        and sample.ttfa is None
+                        and len(body) > offset
+                    ):
+                        sample.ttfa = now
+            sample.total = time.perf_counter() - sample.start
+            sample.nbytes = len(body)
+            sample.audio_seconds = audio_seconds(bytes(body))
+            sample.ok = True
+        except httpx.HTTPStatusError:
+            sample.error = f"HTTP {sample.status}"
+        except httpx.HTTPError as e:
+            sample.error = type(e).__name__
+
+    async def _closed_loop(self, client: httpx.AsyncClient):
+        started = 0
+
+        async def user():
+            nonlocal started
+            while not self._done(started):
+                started += 1
+                await self._request(client, next(self._order))
+
+        await asyncio.gather(*(user() for _ in range(self.args.concurrency)))
+
+    async def _open_loop(self, client: httpx.AsyncClient):
+        # Poisson arrivals, independent of how fast the backend answers
+        tasks, started = [], 0
+        while not self._done(started):
+            started += 1
+            tasks.append(asyncio.create_task(self._request(client, next(self._order))))
+            await asyncio.sleep(random.expovariate(self.args.rate))
+        await asyncio.gather(*tasks)
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(
+            max_connections=None if self.args.rate else self.args.concurrency,
+            max_keepalive_connections=self.args.concurrency,
+        )
+        timeout = httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.read_timeout,
+            pool=None,
+        )
+        async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+            self.start = time.perf_counter()
+            if self.args.rate:
+                await self._open_loop(client)
+            else:
+                await self._closed_loop(client)
+            self.elapsed = time.perf_counter() - self.start
+        return self.report()
+
+    def report(self) -> dict:
+        ok = [s for s in self.samples if s.ok]
+        errors: dict[str, int] = {}
+        for s in self.samples:
+            if not s.ok:
+                errors[s.error] = errors.get(s.error, 0) + 1
+
+        def distribution(values: list[float | None]) -> dict | None:
+            values = [v for v in values if v is not None]
+            if not values:
+                return None
+            result = {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+            result.update(mean=float(np.mean(values)), max=float(np.max(values)))
+            return result
+
+        audio = sum(s.audio_seconds or 0.0 for s in ok)
+        return {
+            "url": self.args.url,
+            "streaming": self.args.streaming,
+            "mode": (
+                f"rate={self.args.rate}/s"
+                if self.args.rate
+                else f"concurrency={self.args.concurrency}"
+            ),
+            "elapsed": self.elapsed,
+            "requests": len(self.samples),
+            "succeeded": len(ok),
+            "error_rate": 1 - len(ok) / len(self.samples) if self.samples else 0.0,
+            "errors": errors,
+            "throughput": {
+                "requests_per_second": len(ok) / self.elapsed,
+                "chars_per_second": sum(s.chars for s in ok) / self.elapsed,
+                "audio_seconds_per_second": audio / self.elapsed,
+                "megabytes_per_second": sum(s.nbytes for s in ok) / self.elapsed / 1e6,
+            },
+            "latency": {
+                "ttfb": distribution([s.ttfb for s in ok]),
+                "ttfa": distribution([s.ttfa for s in ok]),
+                "total": distribution([s.total for s in ok]),
+            },
+            "rtf": distribution([s.rtf for s in ok]),
+        }
+
+
+def format_table(report: dict) -> str:
+    lines = [
+        f"{report['url']} ({report['mode']}, "
+        f"{'streaming' if report['streaming'] else 'non-streaming'})",
+        f"requests: {report['requests']}  succeeded: {report['succeeded']}  "
+        f"error rate: {report['error_rate']:.1%}  elapsed: {report['elapsed']:.1f}s",
+    ]
+    for error, count in report["errors"].items():
+        lines.append(f"  {error}: {count}")
+    throughput = report["throughput"]
+    lines.append(
+        f"throughput: {throughput['requests_per_second']:.2f} req/s, "
+        f"{throughput['chars_per_second']:.1f} chars/s, "
+        f"{throughput['audio_seconds_per_second']:.2f} audio s/s"
+    )
+
+    columns = [f"p{p}" for p in PERCENTILES] + ["mean", "max"]
+    lines.append("")
+    lines.append(f"{'':<10}" + "".join(f"{c:>10}" for c in columns))
+    rows = [(f"{k} (ms)", v, 1000.0) for k, v in report["latency"].items()]
+    rows.append(("rtf", report["rtf"], 1.0))
+    for name, values, scale in rows:
+        if values is None:
+            lines.append(f"{name:<10}" + "".join(f"{'-':>10}" for _ in columns))
+        else:
+            cells = "".join(f"{values[c] * scale:>10.2f}" for c in columns)
+            lines.append(f"{name:<10}{cells}")
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fish-loadtest",
+        description="Load-test a fish-speech TTS backend.",
+    )
+    parser.add_argument("url", nargs="?", default=config.backend)
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--corpus", help="txt, csv or jsonl file of prompts")
+    parser.add_argument(
+        "--text", default="Hello, this is a load test of the speech backend."
+    )
+    parser.add_argument(
+        "--ref", action="append", default=[], help="reference audio with a .lab"
+    )
+    parser.add_argument("--reference-id", default=None)
+    parser.add_argument("--format", default="wav", choices=["wav", "mp3", "opus"])
+    parser.add_argument("--chunk-length", type=int, default=config.chunk_length)
+    parser.add_argument("--latency", default="normal", choices=["normal", "balanced"])
+    parser.add_argument("--streaming", action="store_true")
+
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument(
+        "--concurrency", type=int, default=4, help="closed loop: parallel users"
+    )
+    load.add_argument("--rate", type=float, help="open loop: arrivals per second")
+
+    parser.add_argument("--requests", type=int, default=0, help="0 means no limit")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--json", help="write the report as JSON to this file")
+    parser.add_argument(
+        "--samples", help="write every request as JSON lines to this file"
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.rate is not None and args.rate <= 0:
+        print("--rate must be positive", file=sys.stderr)
+        return 2
+
+    test = LoadTest(args, build_payloads(args))
+    report = asyncio.run(test.run())
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.samples:
+        with open(args.samples, "w", encoding="utf-8") as f:
+            for sample in test.samples:
+                row = asdict(sample)
+                row.update(start=sample.start - test.start, rtf=sample.rtf)
+                f.write(json.dumps(row) + "\n")
+    print(format_table(report))
+    return 0 if report["succeeded"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
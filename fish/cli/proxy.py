@@ -0,0 +1,342 @@
+"""Headless TTS proxy that shares one warm client stack between local tools.
+
+It accepts ``ServeTTSRequest`` bodies on ``/v1/tts`` like the real server,
+as msgpack or JSON, and forwards them over the pooled transport to the
+configured backends, with load balancing, failover and hedging. Identical
+requests in flight are coalesced into one backend request, finished
+results are cached on disk, and streaming requests are streamed back
+chunked as the backend produces audio::
+
+    python -m fish.cli.proxy --port 8081 --backend http://gpu1:8080/v1/tts,http://gpu2:8080/v1/tts
+
+``GET /v1/stats`` reports request, coalescing and cache counters.
+Nothing here imports Qt.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+import ormsgpack
+from pydantic import ValidationError
+
+from fish.config import config
+from fish.services.scheduler import Priority, scheduler, scheduler_limits
+from fish.services.tts import (
+    BackendPool,
+    NoBackendError,
+    RequestCancelled,
+    ResultCache,
+    ServeTTSRequest,
+    TransportResponse,
+    TTSClient,
+    transport,
+)
+from fish.utils.http_server import AbortConnection, HTTPServer, Request, Response
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+}
+
+
+class ProxyClient(TTSClient):
+    """Forwards requests as received, including their own references."""
+
+    def pack(self, request: ServeTTSRequest) -> bytes:
+        return ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+
+
+class Flight:
+    """One backend request, shared by every client that asked for it."""
+
+    def __init__(self, request: ServeTTSRequest):
+        self.request = request
+        self.status = 0
+        self.content_type = CONTENT_TYPES.get(request.format, "audio/wav")
+        self.error = b""
+        self.chunks: list[bytes] = []
+        self.done = False
+        self.subscribers = 0
+        self.response: TransportResponse | None = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    def notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, done: bool = False):
+        """Wait until the backend answered, or finished if ``done``."""
+        while not (self.done if done else self.status):
+            await self._changed.wait()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Replay the chunks received so far, then follow the live ones."""
+        index, completed = 0, False
+        self.subscribers += 1
+        try:
+            while True:
+                while index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                if self.done:
+                    break
+                await self._changed.wait()
+            if not self.ok:
+                # The backend failed mid-stream, don't pass it off as complete
+                raise AbortConnection()
+            completed = True
+        finally:
+            self.subscribers -= 1
+            if not completed and not self.subscribers and not self.done:
+                # Nobody is left to read it
+                if self.response is not None:
+                    self.response.cancel()
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+
+class TTSProxy:
+    def __init__(
+        self,
+        backend: str,
+        api_key: str = "",
+        cache: ResultCache | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        host: str = "127.0.0.1",
+        port: int = 8081,
+    ):
+        self.backend = backend
+        self.api_key = api_key
+        self.cache = cache
+        self.priority = priority
+        self.flights: dict[str, Flight] = {}
+        # Clients by API key, a client without one uses ``api_key``
+        self.clients: dict[str, ProxyClient] = {}
+        self.stats = dict(
+            requests=0, coalesced=0, cache_hits=0, forwarded=0, failures=0
+        )
+        self.http = HTTPServer(host, port)
+        self.http.route("POST", "/v1/tts")(self.tts)
+        self.http.route("GET", "/v1/health")(self.health)
+        self.http.route("GET", "/v1/stats")(self.report)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.http.host}:{self.http.port}"
+
+    def credential(self, request: Request) -> str:
+        auth = request.headers.get("authorization", "")
+        return auth.removeprefix("Bearer ").strip() or self.api_key
+
+    def client(self, api_key: str) -> ProxyClient:
+        if api_key not in self.clients:
+            self.clients[api_key] = ProxyClient(
+                self.backend, api_key, use_cache=False, priority=self.priority
+            )
+        return self.clients[api_key]
+
+    @staticmethod
+    def _parse(request: Request) -> ServeTTSRequest | Response:
+        try:
+            if "json" in request.headers.get("content-type", ""):
+                return ServeTTSRequest.model_validate_json(request.body)
+            return ServeTTSRequest(**ormsgpack.unpackb(request.body))
+        except (ValidationError, ormsgpack.MsgpackDecodeError, TypeError) as e:
+            return Response(422, str(e).encode(), "text/plain")
+
+    @staticmethod
+    def request_key(request: ServeTTSRequest, api_key: str) -> str:
+        # Unlike the GUI cache, streamed and whole bodies are kept apart, and
+        # results are scoped to the credential that paid for them
+        data = ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+        scope = hashlib.sha256(api_key.encode()).digest()
+        return hashlib.sha256(scope + data).hexdigest()
+
+    async def _forward(self, key: str, flight: Flight, client: ProxyClient):
+        self.stats["forwarded"] += 1
+        try:
+            try:
+                flight.response = await asyncio.to_thread(client.post, flight.request)
+            except httpx.HTTPStatusError as e:
+                flight.status = e.response.status_code
+                flight.error = str(e).encode()
+                self.stats["failures"] += 1
+                return
+            flight.status = flight.response.status_code
+            flight.content_type = flight.response.headers.get(
+                "content-type", flight.content_type
+            )
+            flight.notify()
+
+            chunks = flight.response.iter_content()
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                flight.chunks.append(chunk)
+                flight.notify()
+            flight.done = True
+            flight.notify()
+            if self.cache is not None:
+                try:
+                    await asyncio.to_thread(
+                        self.cache.put_bytes,
+                        key,
+                        flight.body,
+                        f".{flight.request.format}",
+                    )
+                except OSError as e:
+                    logger.warning(f"Unable to cache result: {e}")
+        except (RequestCancelled, httpx.HTTPError) as e:
+            # Also marks a stream that broke off as failed
+            flight.status = 502
+            flight.error = str(e).encode() or b"Request cancelled"
+            if not isinstance(e, RequestCancelled):
+                self.stats["failures"] += 1
+                logger.warning(f"Forwarding failed: {e!r}")
+        finally:
+            flight.done = True
+            if flight.response is not None:
+                flight.response.close()
+            self.flights.pop(key, None)
+            flight.notify()
+
+    async def tts(self, request: Request) -> Response:
+        req = self._parse(request)
+        if isinstance(req, Response):
+            return req
+        self.stats["requests"] += 1
+        api_key = self.credential(request)
+        key = self.request_key(req, api_key)
+
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return Response(
+                body=await asyncio.to_thread(cached.read_bytes),
+                content_type=CONTENT_TYPES.get(req.format, "audio/wav"),
+            )
+
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = Flight(req)
+            flight.task = asyncio.create_task(
+                self._forward(key, flight, self.client(api_key))
+            )
+        else:
+            self.stats["coalesced"] += 1
+
+        await flight.wait(done=not req.streaming)
+        if not flight.ok:
+            return Response(flight.status, flight.error, "text/plain")
+        if req.streaming:
+            return Response(body=flight.stream(), content_type=flight.content_type)
+        return Response(body=flight.body, content_type=flight.content_type)
+
+    async def health(self, request: Request) -> Response:
+        return Response(body=b'{"status": "ok"}', content_type="application/json")
+
+    async def report(self, request: Request) -> Response:
+        pool = BackendPool(self.backend)
+        stats = {
+            **self.stats,
+            "in_flight": len(self.flights),
+            "backends": {
+                e.url: {"healthy": e.healthy, "outstanding": e.outstanding}
+                for e in pool.endpoints
+            },
+            "hedging": BackendPool.hedge_stats(),
+        }
+        return Response(
+            body=json.dumps(stats).encode(), content_type="application/json"
+        )
+
+    async def serve_forever(self):
+        await self.http.serve_forever()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fish-proxy",
+        description="Headless TTS proxy with pooling, coalescing and caching.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument(
+        "--backend",
+        default=config.backend,
+        help="TTS endpoint, comma separated replicas are load balanced",
+    )
+    parser.add_argument(
+        "--api-key", default="", help="used when a client sends no key of its own"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=config.interactive_concurrency,
+        help="backend requests in flight",
+    )
+    parser.add_argument("--pool-size", type=int, default=config.pool_size)
+    parser.add_argument(
+        "--cache-dir", type=Path, default=Path.home() / ".fish" / "cache" / "proxy"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=config.result_cache_size, help="MB"
+    )
+    parser.add_argument(
+        "--cache", action=argparse.BooleanOptionalAction, default=config.result_cache
+    )
+    parser.add_argument(
+        "--hedge", action=argparse.BooleanOptionalAction, default=config.hedge
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        pool = BackendPool(args.backend)
+    except NoBackendError as e:
+        parser.error(str(e))
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    config.hedge = args.hedge
+    transport.configure(args.pool_size, config.pool_idle_timeout)
+    limits = {**scheduler_limits(), Priority.INTERACTIVE: args.concurrency}
+    scheduler.configure(limits, max(config.max_concurrency, args.concurrency))
+    cache = (
+        ResultCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+        if args.cache
+        else None
+    )
+    proxy = TTSProxy(args.backend, args.api_key, cache, host=args.host, port=args.port)
+    pool.warmup()
+
+    async def serve():
+        await proxy.http.start()
+        print(f"TTS proxy listening on {proxy.url}/v1/tts", flush=True)
+        await proxy.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,435 @@
+"""CPU-only stand-in for a fish-speech server, for offline benchmarking.
+
+It speaks the same wire formats as the real backend on ``/v1/tts``,
+``/v1/vqgan/encode``, ``/v1/vqgan/decode`` and ``/v1/chat``, and returns
+deterministic synthetic audio and VQ codes. Latency, throughput, jitter,
+chunk sizes and failures are configurable::
+
+    python -m fish.cli.standin --port 8080 --latency 0.3 --throughput 2
+
+``GET /v1/stats`` reports request, failure, abort and disconnect counts.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import wave
+from dataclasses import dataclass, fields
+from typing import AsyncIterator
+
+import numpy as np
+import ormsgpack
+import soundfile as sf
+from pydantic import ValidationError
+
+from fish.services.agent.schema import (
+    ServeMessage,
+    ServeRequest,
+    ServeResponse,
+    ServeStreamDelta,
+    ServeStreamResponse,
+    ServeTextPart,
+    ServeVQGANDecodeRequest,
+    ServeVQGANDecodeResponse,
+    ServeVQGANEncodeRequest,
+    ServeVQGANEncodeResponse,
+    ServeVQPart,
+)
+from fish.services.tts.preprocess import resample
+from fish.services.tts.schema import ServeTTSRequest
+from fish.utils.http_server import AbortConnection, HTTPServer, Request, Response
+
+SAMPLE_RATE = 44100
+# Audio samples per VQ frame and the codebook layout of the VQGAN
+HOP_LENGTH = 2048
+NUM_CODEBOOKS = 8
+CODEBOOK_SIZE = 1024
+SECONDS_PER_CHAR = 0.06
+# VQ frames sent per chat delta
+FRAMES_PER_PART = 4
+
+CONTENT_TYPES = {
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+}
+
+
+@dataclass
+class StandInConfig:
+    # Seconds before the first byte of every response
+    latency: float = 0.2
+    # Seconds of audio generated per wall-clock second, i.e. 1 / RTF
+    throughput: float = 4.0
+    # Relative random variation applied to every delay
+    jitter: float = 0.1
+    # Audio per streamed TTS chunk
+    chunk_ms: int = 200
+    # Chat text tokens per second
+    token_rate: float = 50.0
+    decode_latency: float = 0.02
+    # Fraction of requests answered with ``failure_status``
+    failure_rate: float = 0.0
+    failure_status: int = 500
+    # Fraction of streams dropped mid-response
+    abort_rate: float = 0.0
+    seed: int = 0
+
+
+def tone_audio(values: np.ndarray, samples_per_value: int) -> np.ndarray:
+    """Render one short tone per value, the pitch derived from the value."""
+    values = np.asarray(values, dtype=np.int64).reshape(-1)
+    freqs = 120.0 + (values % 48) * 8.0
+    t = np.arange(samples_per_value) / SAMPLE_RATE
+    envelope = np.hanning(samples_per_value)
+    tones = np.sin(2 * np.pi * freqs[:, None] * t[None, :]) * envelope
+    return (0.3 * tones).reshape(-1).astype(np.float32)
+
+
+def synthesize(text: str) -> np.ndarray:
+    chars = [c for c in text if not c.isspace()] or ["."]
+    return tone_audio([ord(c) for c in chars], int(SECONDS_PER_CHAR * SAMPLE_RATE))
+
+
+def to_wav(pcm: bytes = b"", sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Encode ``pcm``, or just a header with zero length for streaming."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def to_pcm(audio: np.ndarray) -> bytes:
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+def encode(audio: np.ndarray, format: str) -> bytes:
+    if format == "pcm":
+        return to_pcm(audio)
+    if format == "wav":
+        return to_wav(to_pcm(audio))
+
+    buffer = io.BytesIO()
+    if format == "mp3":
+        sf.write(buffer, audio, SAMPLE_RATE, format="MP3")
+    else:
+        # Opus only supports 48 kHz and its divisors
+        sf.write(
+            buffer,
+            resample(audio, SAMPLE_RATE, 48000),
+            48000,
+            format="OGG",
+            subtype="OPUS",
+        )
+    return buffer.getvalue()
+
+
+def codes_for(seed_bytes: bytes, frames: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(seed_bytes).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, CODEBOOK_SIZE, (NUM_CODEBOOKS, max(1, frames)))
+
+
+class StandInServer:
+    def __init__(
+        self,
+        config: StandInConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+    ):
+        self.config = config or StandInConfig()
+        self.rng = random.Random(self.config.seed)
+        self.stats = dict(requests=0, completed=0, failures=0, aborts=0, disconnects=0)
+        self.http = HTTPServer(host, port)
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.http.route("POST", "/v1/tts")(self.tts)
+        self.http.route("POST", "/v1/vqgan/encode")(self.vqgan_encode)
+        self.http.route("POST", "/v1/vqgan/decode")(self.vqgan_decode)
+        self.http.route("POST", "/v1/chat")(self.chat)
+        self.http.route("GET", "/v1/health")(self.health)
+        self.http.route("GET", "/v1/stats")(self.report)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.http.host}:{self.http.port}"
+
+    def _delay(self, seconds: float) -> float:
+        jitter = self.config.jitter
+        return max(0.0, seconds * self.rng.uniform(1 - jitter, 1 + jitter))
+
+    async def _sleep(self, seconds: float):
+        await asyncio.sleep(self._delay(seconds))
+
+    async def _begin(self) -> Response | None:
+        """Count the request, wait out the latency and maybe fail it."""
+        self.stats["requests"] += 1
+        await self._sleep(self.config.latency)
+        if self.rng.random() < self.config.failure_rate:
+            self.stats["failures"] += 1
+            return Response(
+                self.config.failure_status, b"Injected failure", "text/plain"
+            )
+        return None
+
+    async def _paced(
+        self, chunks: list[bytes], durations: list[float], rate: float
+    ) -> AsyncIterator[bytes]:
+        """Yield ``chunks`` as if each took ``duration / rate`` to generate."""
+        abort_at = (
+            self.rng.randrange(len(chunks))
+            if self.rng.random() < self.config.abort_rate
+            else None
+        )
+        loop = asyncio.get_running_loop()
+        start, produced, completed = loop.time(), 0.0, False
+        try:
+            for i, (chunk, duration) in enumerate(zip(chunks, durations)):
+                if i == abort_at:
+                    self.stats["aborts"] += 1
+                    raise AbortConnection()
+                produced += duration
+                await asyncio.sleep(self._delay(start + produced / rate - loop.time()))
+                yield chunk
+            completed = True
+            self.stats["completed"] += 1
+        finally:
+            if not completed and abort_at is None:
+                self.stats["disconnects"] += 1
+
+    @staticmethod
+    def _unpack(request: Request, model):
+        try:
+            return model(**ormsgpack.unpackb(request.body))
+        except (ValidationError, ormsgpack.MsgpackDecodeError, TypeError) as e:
+            return Response(422, str(e).encode(), "text/plain")
+
+    async def tts(self, request: Request) -> Response:
+        req = self._unpack(request, ServeTTSRequest)
+        if isinstance(req, Response):
+            return req
+        if failure := await self._begin():
+            return failure
+
+        audio = synthesize(req.text)
+        data = encode(audio, req.format)
+        content_type = CONTENT_TYPES[req.format]
+        if not req.streaming:
+            await self._sleep(len(audio) / SAMPLE_RATE / self.config.throughput)
+            self.stats["completed"] += 1
+            return Response(body=data, content_type=content_type)
+
+        step = max(1, int(SAMPLE_RATE * self.config.chunk_ms / 1000))
+        count = math.ceil(len(audio) / step)
+        if req.format in ("wav", "pcm"):
+            # Like the real server: a header with unknown length, then PCM
+            pcm = to_pcm(audio)
+            chunks = [pcm[i * step * 2 : (i + 1) * step * 2] for i in range(count)]
+            if req.format == "wav":
+                chunks[0] = to_wav() + chunks[0]
+        else:
+            size = math.ceil(len(data) / count)
+            chunks = [data[i * size : (i + 1) * size] for i in range(count)]
+        durations = [step / SAMPLE_RATE] * count
+        return Response(
+            body=self._paced(chunks, durations, self.config.throughput),
+            content_type=content_type,
+        )
+
+    async def vqgan_encode(self, request: Request) -> Response:
+        req = self._unpack(request, ServeVQGANEncodeRequest)
+        if isinstance(req, Response):
+            return req
+        if failure := await self._begin():
+            return failure
+
+        tokens = []
+        for audio in req.audios:
+            try:
+                seconds = sf.info(io.BytesIO(audio)).duration
+            except RuntimeError:
+                seconds = len(audio) / SAMPLE_RATE / 2
+            frames = math.ceil(seconds * SAMPLE_RATE / HOP_LENGTH)
+            tokens.append(codes_for(audio, frames).tolist())
+        self.stats["completed"] += 1
+        return Response(
+            body=ormsgpack.packb(
+                ServeVQGANEncodeResponse(tokens=tokens),
+                option=ormsgpack.OPT_SERIALIZE_PYDANTIC,
+            ),
+            content_type="application/msgpack",
+        )
+
+    async def vqgan_decode(self, request: Request) -> Response:
+        req = self._unpack(request, ServeVQGANDecodeRequest)
+        if isinstance(req, Response):
+            return req
+        self.stats["requests"] += 1
+        await self._sleep(self.config.decode_latency)
+
+        audios = []
+        for codes in req.tokens:
+            audio = tone_audio(np.asarray(codes)[0], HOP_LENGTH)
+            audios.append(audio.astype(np.float16).tobytes())
+        self.stats["completed"] += 1
+        return Response(
+            body=ormsgpack.packb(
+                ServeVQGANDecodeResponse(audios=audios),
+                option=ormsgpack.OPT_SERIALIZE_PYDANTIC,
+            ),
+            content_type="application/msgpack",
+        )
+
+    @staticmethod
+    def _reply(req: ServeRequest) -> str:
+        question = "<audio>"
+        for message in reversed(req.messages):
+            if message.role == "user":
+                texts = [p.text for p in message.parts if p.type == "text"]
+                question = " ".join(texts) or question
+                break
+        return (
+            f"Question: {question}\n\n"
+            f"Response: This is a synthetic answer. "
+            f"It was generated for {len(question)} characters of input."
+        )
+
+    def _chat_parts(self, reply: str) -> list[ServeStreamResponse]:
+        # Every sentence is streamed as text tokens followed by its speech
+        deltas = []
+        for sentence in re.findall(r"[^.\n]+[.\n]*", reply):
+            for token in re.findall(r"\S+\s*|\s+", sentence):
+                part = ServeTextPart(text=token)
+                deltas.append(ServeStreamDelta(role="assistant", part=part))
+            frames = math.ceil(
+                len(sentence.strip()) * SECONDS_PER_CHAR * SAMPLE_RATE / HOP_LENGTH
+            )
+            codes = codes_for(sentence.encode("utf-8"), frames)
+            for i in range(0, codes.shape[1], FRAMES_PER_PART):
+                part = ServeVQPart(codes=codes[:, i : i + FRAMES_PER_PART].tolist())
+                deltas.append(ServeStreamDelta(role="assistant", part=part))
+        return [ServeStreamResponse(delta=delta) for delta in deltas]
+
+    async def chat(self, request: Request) -> Response:
+        req = self._unpack(request, ServeRequest)
+        if isinstance(req, Response):
+            return req
+        if failure := await self._begin():
+            return failure
+
+        responses = self._chat_parts(self._reply(req))
+        if not req.streaming:
+            parts = [r.delta.part for r in responses]
+            self.stats["completed"] += 1
+            return Response(
+                body=ormsgpack.packb(
+                    ServeResponse(
+                        messages=[ServeMessage(role="assistant", parts=parts)],
+                        finish_reason="stop",
+                    ),
+                    option=ormsgpack.OPT_SERIALIZE_PYDANTIC,
+                ),
+                content_type="application/msgpack",
+            )
+
+        responses.append(ServeStreamResponse(finish_reason="stop", stats={}))
+        chunks, durations = [], []
+        frame_seconds = HOP_LENGTH / SAMPLE_RATE
+        for r in responses:
+            body = ormsgpack.packb(r, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+            chunks.append(struct.pack("I", len(body)) + body)
+            part = r.delta.part if r.delta else None
+            if part is None:
+                durations.append(0.0)
+            elif part.type == "text":
+                # Expressed in audio seconds, like the VQ frames
+                durations.append(self.config.throughput / self.config.token_rate)
+            else:
+                durations.append(len(part.codes[0]) * frame_seconds)
+        return Response(
+            body=self._paced(chunks, durations, self.config.throughput),
+            content_type="application/msgpack",
+        )
+
+    async def health(self, request: Request) -> Response:
+        return Response(body=b'{"status": "ok"}', content_type="application/json")
+
+    async def report(self, request: Request) -> Response:
+        return Response(
+            body=json.dumps(self.stats).encode(), content_type="application/json"
+        )
+
+    async def serve_forever(self):
+        await self.http.serve_forever()
+
+    def start_in_thread(self) -> str:
+        """Serve from a daemon thread and return the base URL once listening."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.http.start(), self._loop).result()
+        return self.url
+
+    async def _close(self):
+        await self.http.close()
+        # Drop connections that are still being served
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def shutdown(self):
+        """Stop a server started by ``start_in_thread`` and close its loop."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fish-standin",
+        description="CPU-only stand-in fish-speech server with synthetic output.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    for f in fields(StandInConfig):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default
+        )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = vars(build_parser().parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+    server = StandInServer(StandInConfig(**args), host=host, port=port)
+
+    async def serve():
+        await server.http.start()
+        print(f"Stand-in fish-speech server listening on {server.url}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,244 @@
+"""Synthesize speech from the command line, without Qt or a display.
+
+Examples::
+
+    python -m fish.cli tts "Hello world" --ref voice.wav --out hello.wav
+    cat chapter.txt | python -m fish.cli tts --stream --out - | ffplay -
+    python -m fish.cli tts --batch prompts.jsonl --out-dir renders
+
+Text comes from the argument, ``--text-file`` or stdin, and ``--out -``
+writes the audio to stdout as it arrives. Each reference audio needs a
+``.lab`` transcript next to it. ``--batch`` takes a text (one prompt per
+line), CSV or JSONL file as accepted by batch synthesis in the GUI.
+``--metrics`` prints the same latency breakdown the GUI shows to stderr.
+The exit status is 1 if any request failed.
+"""
+
+import argparse
+import logging
+import sys
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+import httpx
+
+from fish.config import config
+from fish.services.tts import RequestCancelled, TTSClient, TTSJob
+from fish.services.tts.batch import (
+    BatchResult,
+    BatchRunner,
+    BatchStats,
+    load_batch_items,
+)
+from fish.utils.wav import HEADER_SIZE, ProgressiveWavWriter
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="fish tts",
+        description="Synthesize speech with a fish-speech backend.",
+    )
+    parser.add_argument("text", nargs="?", help="text to synthesize")
+    parser.add_argument("--text-file", help="read the text from a file, - for stdin")
+    parser.add_argument("--batch", help="synthesize every prompt of a txt/csv/jsonl")
+    parser.add_argument(
+        "-o", "--out", default="-", help="output file, - for stdout (default)"
+    )
+    parser.add_argument("--out-dir", default=config.save_path, help="batch output")
+    parser.add_argument(
+        "--ref",
+        action="append",
+        default=[],
+        help="reference audio with a .lab transcript, may be repeated",
+    )
+    parser.add_argument("--ref-id", default=config.ref_id)
+    parser.add_argument("--backend", default=config.backend)
+    parser.add_argument("--api-key", default="")
+    parser.add_argument(
+        "--format", choices=("wav", "pcm", "mp3", "opus"), default=config.audio_format
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="stream audio as it is generated"
+    )
+    parser.add_argument("--chunk-length", type=int, default=config.chunk_length)
+    parser.add_argument(
+        "--latency", choices=("normal", "balanced"), default=config.latency_mode
+    )
+    parser.add_argument("--max-new-tokens", type=int, default=config.max_new_tokens)
+    parser.add_argument("--top-p", type=float, default=config.top_p / 1000)
+    parser.add_argument(
+        "--repetition-penalty", type=float, default=config.repetition_penalty / 1000
+    )
+    parser.add_argument("--temperature", type=float, default=config.temperature / 1000)
+    parser.add_argument("--mp3-bitrate", type=int, default=config.mp3_bitrate)
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=config.result_cache,
+        help="reuse audio of identical requests",
+    )
+    parser.add_argument("--concurrency", type=int, default=config.batch_concurrency)
+    parser.add_argument(
+        "--adaptive",
+        action=argparse.BooleanOptionalAction,
+        default=config.batch_adaptive,
+        help="tune batch concurrency on the fly, up to --concurrency",
+    )
+    parser.add_argument(
+        "--metrics", action="store_true", help="print latency metrics to stderr"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser
+
+
+def build_client(args: argparse.Namespace) -> TTSClient:
+    return TTSClient(
+        backend=args.backend,
+        api_key=args.api_key,
+        ref_files=args.ref,
+        ref_id=args.ref_id,
+        use_cache=args.cache,
+        format=args.format,
+        chunk_length=args.chunk_length,
+        latency=args.latency,
+        max_new_tokens=args.max_new_tokens,
+        top_p=args.top_p,
+        repetition_penalty=args.repetition_penalty,
+        temperature=args.temperature,
+        mp3_bitrate=args.mp3_bitrate,
+    )
+
+
+def read_text(args: argparse.Namespace) -> str | None:
+    if args.text is not None:
+        return args.text
+    if args.text_file == "-" or (args.text_file is None and not sys.stdin.isatty()):
+        return sys.stdin.read()
+    if args.text_file is not None:
+        return Path(args.text_file).read_text(encoding="utf-8")
+    return None
+
+
+def _open_output(args: argparse.Namespace) -> BinaryIO | ProgressiveWavWriter:
+    if args.out == "-":
+        return sys.stdout.buffer
+    if args.stream and args.format == "wav":
+        # The streamed header has no length, write one that stays valid
+        return ProgressiveWavWriter(args.out)
+    return open(args.out, "wb")
+
+
+def synthesize(args: argparse.Namespace, client: TTSClient, text: str) -> int:
+    to_stdout = args.out == "-"
+    job = TTSJob(client, text, None if to_stdout else args.out, args.stream)
+    metrics = job.new_metrics()
+
+    cached = job.load_cached()
+    if cached is not None:
+        if to_stdout:
+            sys.stdout.buffer.write(cached.read_bytes())
+            sys.stdout.buffer.flush()
+    else:
+        received = []
+        output = _open_output(args)
+        try:
+            for chunk in job.chunks():
+                metrics.receive(len(chunk))
+                output.write(chunk)
+                if to_stdout:
+                    output.flush()
+                    received.append(chunk)
+            metrics.mark("last_byte")
+        except KeyboardInterrupt:
+            job.cancel()
+            return 130
+        except (RequestCancelled, httpx.HTTPError) as e:
+            print(f"Synthesis failed: {e}", file=sys.stderr)
+            return 1
+        finally:
+            if not to_stdout:
+                output.close()
+            job.close()
+
+        # 16 bit mono, soundfile can't read raw PCM or WAV from a pipe
+        if args.format == "pcm":
+            metrics.samples = metrics.bytes_received // 2
+        elif args.format == "wav" and to_stdout:
+            metrics.samples = max(0, metrics.bytes_received - HEADER_SIZE) // 2
+        job.store_cached(b"".join(received) if to_stdout else None)
+
+    job.finish_metrics()
+    if args.metrics:
+        print(metrics.summary(), file=sys.stderr)
+    return 0
+
+
+def run_batch(args: argparse.Namespace, client: TTSClient) -> int:
+    items = load_batch_items(args.batch, args.format)
+
+    def on_result(result: BatchResult, stats: BatchStats):
+        line = f"[{stats.done + stats.failed}/{stats.total}] {result.item.output}"
+        if not result.ok:
+            line += f" failed: {result.error}"
+        else:
+            line += f" {result.elapsed:.2f} s"
+            metrics = result.metrics
+            if args.metrics and metrics is not None:
+                if metrics.cache_hit:
+                    line += " (cached)"
+                elif (sent := metrics.elapsed("build")) is not None:
+                    backend = metrics.elapsed("last_byte") - sent
+                    line += f" (backend {backend * 1000:.0f} ms)"
+        print(line, file=sys.stderr)
+
+    runner = BatchRunner(
+        client,
+        items,
+        args.out_dir,
+        concurrency=args.concurrency,
+        on_result=on_result,
+        adaptive=args.adaptive,
+    )
+    thread = threading.Thread(target=runner.run)
+    thread.start()
+    try:
+        # Joined in steps so Ctrl+C reaches the main thread
+        while thread.is_alive():
+            thread.join(0.2)
+    except KeyboardInterrupt:
+        runner.stop()
+        thread.join()
+        return 130
+
+    stats = runner.stats
+    print(
+        f"{stats.done}/{stats.total} done, {stats.failed} failed in "
+        f"{stats.elapsed:.1f} s, {stats.chars_per_second:.1f} chars/s",
+        file=sys.stderr,
+    )
+    return 1 if stats.failed else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(levelname)s %(message)s",
+    )
+    for ref in args.ref:
+        if not Path(ref).with_suffix(".lab").is_file():
+            parser.error(f"{ref} has no .lab transcript next to it")
+
+    client = build_client(args)
+    if args.batch:
+        return run_batch(args, client)
+    text = read_text(args)
+    if not text or not text.strip():
+        parser.error("no text given, pass it as an argument, --text-file or stdin")
+    return synthesize(args, client, text.strip())
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -19,8 +19,27 @@ else:
 class Config:
     theme: Literal["auto", "light", "dark"] = "auto"
     locale: str = locale.getdefaultlocale()[0]
-    # Service: TTS
+    # Service: TTS, comma separated replicas are load balanced
     backend: str = "http://localhost:8080/v1/tts"
+    # Seconds between health probes of backend replicas
+    probe_interval: float = 10.0
+    # Duplicate a request to another replica once it is slower than this
+    # percentile of recent answers, but not before the minimum delay
+    hedge: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.2
+    # Requests in flight to the backends, in total and per priority class
+    max_concurrency: int = 6
+    interactive_concurrency: int = 4
+    chat_concurrency: int = 2
+    bulk_concurrency: int = 4
+    speculative_concurrency: int = 1
+    pool_size: int = 4
+    pool_idle_timeout: int = 60
+    # TTS request timeouts in seconds, a total timeout of 0 means no limit
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0
+    total_timeout: float = 600.0
     # Service: Agent
     decoder_url: str = "http://localhost:8080/v1/vqgan"
     llm_url: str = "http://localhost:8080/v1/chat"
@@ -39,6 +58,26 @@ class Config:
     )
 
     ref_id: str = ""
+    # Reference cache budget in MB
+    reference_cache_size: int = 256
+    # Downmix and resample references before upload, optionally as FLAC. Off
+    # by default so references reach the server exactly as recorded
+    reference_preprocess: bool = False
+    reference_sample_rate: int = 44100
+    reference_flac: bool = False
+    # Seconds of reference speech per request, longer clips are trimmed, 0 = off
+    reference_budget: float = 0.0
+    # Reuse audio of identical requests, and its on-disk budget in MB. Off by
+    # default since sampling is random and a repeat should sound different
+    result_cache: bool = False
+    result_cache_size: int = 1024
+    # Synthesize the text in the background once editing pauses for
+    # speculative_delay seconds, kept in a separate cache of this many MB
+    speculative: bool = False
+    speculative_delay: float = 1.5
+    speculative_cache_size: int = 64
+    # Per-request latency breakdown, JSONL (or CSV by extension)
+    metrics_log: str = str(Path.home() / ".fish" / "tts_metrics.jsonl")
     save_path: str = str(Path.cwd() / "output")
     python_path: str = (
         str(Path.cwd() / "fishenv" / "env" / "python.exe")
@@ -48,16 +87,35 @@ class Config:
 
     input_device: str | None = None
     output_device: str | None = None
-
+    # Seconds of audio a producer may queue ahead of the output device
+    output_buffer: float = 2.0
+    # Initial jitter buffer in seconds, grown after underruns
+    output_prebuffer: float = 0.2
+    # The output stream is paused after this many idle seconds, and stays open
+    output_idle_timeout: float = 30.0
+
+    # Format of synthesized audio, streamed formats other than wav need ffmpeg.
+    # mp3 and opus save bandwidth, but are opt-in so streaming stays the same
+    audio_format: Literal["wav", "mp3", "opus"] = "wav"
     mp3_bitrate: int = 64
     opus_bitrate: int = -1000
 
     chunk_length: int = 200
+    # "balanced" trades some stability for a faster first chunk
+    latency_mode: Literal["normal", "balanced"] = "normal"
+    # Calibrated chunk_length and latency mode per backend URL
+    tuning_file: str = str(Path.home() / ".fish" / "tuning.json")
     max_new_tokens: int = 0
     top_p: int = 700
     repetition_penalty: int = 1200
     temperature: int = 700
 
+    batch_concurrency: int = 4
+    # Tune batch concurrency on the fly, batch_concurrency is then the maximum
+    batch_adaptive: bool = True
+    # Segments generated ahead of the one being played in pipelined mode
+    pipeline_depth: int = 2
+
     sample_duration: int = 1000
     fade_duration: int = 80
     extra_duration: int = 50
@@ -5,7 +5,6 @@ import sys
 
 import pkg_resources
 import qdarktheme
-import requests
 from PyQt6.QtCore import Qt, QUrl
 from PyQt6.QtGui import QCloseEvent, QIcon, QPixmap
 from PyQt6.QtMultimedia import QAudioOutput, QMediaPlayer
@@ -21,8 +20,10 @@ from PyQt6.QtWidgets import (
     QListWidget,
     QMainWindow,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QSlider,
+    QSpinBox,
     QTabWidget,
     QVBoxLayout,
     QWidget,
@@ -44,10 +45,29 @@ from fish.fap import (
 from fish.input import TextEditorWidget
 from fish.modules.console import ConsoleWidget
 from fish.modules.globals import STOP_BUTTON_QSS
-from fish.modules.log import stderr_stream, stdout_stream
+from fish.modules.log import logger, stderr_stream, stdout_stream
 from fish.modules.registry import widget_registry
-from fish.modules.worker import TTSWorker
+from fish.modules.worker import (
+    BackendTestWorker,
+    BatchTTSWorker,
+    LongFormWorker,
+    PipelinedTTSWorker,
+    SpeculativeTTSWorker,
+    TTSWorker,
+    TuneWorker,
+)
+from fish.services.playback import output_engine
+from fish.services.tts import (
+    BackendPool,
+    NoBackendError,
+    RequestMetrics,
+    TTSClient,
+    TuningResult,
+    tuning_store,
+)
+from fish.services.tts.batch import load_batch_items
 from fish.utils.audio import get_devices
+from fish.utils.decoder import can_stream
 from fish.utils.file import *
 from fish.utils.i18n import _t, language_map
 
@@ -116,6 +136,15 @@ class MainWindow(QMainWindow):
         # Uploaded ref files
         self.files = []
 
+        # Open keep-alive connections before the first conversion
+        try:
+            BackendPool(config.backend).warmup()
+        except NoBackendError as e:
+            logger.warning(e)
+        # Likewise the audio device, before the first playback
+        output_engine.configure(config.output_device)
+        output_engine.warmup()
+
     def set_widget_background(
         self,
         widget: QWidget,
@@ -191,6 +220,7 @@ class MainWindow(QMainWindow):
         widget_registry.register(tab2, "tab2")
         self.setup_textinput_settings(layout2)
         self.setup_audioplayer_settings(layout2)
+        self.setup_batch_settings(layout2)
 
         tab2.setLayout(layout2)
         return tab2
@@ -349,6 +379,9 @@ class MainWindow(QMainWindow):
                 config.output_device = self.output_device_combo.itemData(0)
 
         self.input_device_combo.setFixedWidth(300)
+        self.output_device_combo.currentIndexChanged.connect(
+            lambda: output_engine.configure(self.output_device_combo.currentData())
+        )
         row_layout.addWidget(self.output_device_combo, 1, 1)
         row.setMaximumHeight(100)
         row.setLayout(row_layout)
@@ -456,8 +489,35 @@ class MainWindow(QMainWindow):
 
         row_layout.addWidget(self.mp3_bitrate_combo, 2, 4)
 
+        self.result_cache_check = QCheckBox(_t("audio.result_cache"))
+        self.result_cache_check.setToolTip(_t("audio.result_cache_tooltip"))
+        self.result_cache_check.setChecked(config.result_cache)
+        row_layout.addWidget(self.result_cache_check, 3, 0, 1, 3)
+
+        row_layout.addWidget(QLabel(_t("audio.format")), 3, 3)
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(["wav", "mp3", "opus"])
+        self.format_combo.setToolTip(_t("audio.format_tooltip"))
+        self.format_combo.setFixedWidth(100)
+        self.format_combo.setCurrentText(config.audio_format)
+        row_layout.addWidget(self.format_combo, 3, 4)
+
+        row_layout.addWidget(QLabel(_t("audio.latency")), 4, 0)
+        self.latency_combo = QComboBox()
+        self.latency_combo.addItems(["normal", "balanced"])
+        self.latency_combo.setToolTip(_t("audio.latency_tooltip"))
+        self.latency_combo.setFixedWidth(100)
+        self.latency_combo.setCurrentText(config.latency_mode)
+        row_layout.addWidget(self.latency_combo, 4, 1)
+
+        self.tune_worker = None
+        self.calibrate_button = QPushButton(_t("audio.calibrate"))
+        self.calibrate_button.setToolTip(_t("audio.calibrate_tooltip"))
+        self.calibrate_button.clicked.connect(self.toggle_calibration)
+        row_layout.addWidget(self.calibrate_button, 4, 3, 1, 2)
+
         row.setLayout(row_layout)
-        row.setMaximumHeight(200)
+        row.setMaximumHeight(240)
         layout.addWidget(row)
 
     def setup_reference_settings(self, layout: QVBoxLayout):
@@ -495,6 +555,15 @@ class MainWindow(QMainWindow):
         self.remove_button.setFixedWidth(100)
         row_layout.addWidget(self.remove_button, 3, 2, 1, 1)
 
+        row_layout.addWidget(QLabel(_t("reference.budget")), 4, 0, 1, 1)
+        self.ref_budget_spin = QSpinBox()
+        self.ref_budget_spin.setRange(0, 120)
+        self.ref_budget_spin.setSuffix(" s")
+        self.ref_budget_spin.setSpecialValueText(_t("reference.budget_off"))
+        self.ref_budget_spin.setToolTip(_t("reference.budget_tooltip"))
+        self.ref_budget_spin.setValue(int(config.reference_budget))
+        row_layout.addWidget(self.ref_budget_spin, 4, 1, 1, 1)
+
         row.setLayout(row_layout)
         layout.addWidget(row)
 
@@ -505,6 +574,10 @@ class MainWindow(QMainWindow):
 
         row_layout = QGridLayout()
         self.text_editor = TextEditorWidget()
+        # Running speculative workers, referenced until their threads end
+        self.speculative_workers: set[SpeculativeTTSWorker] = set()
+        self.text_editor.input_edit.textChanged.connect(self.cancel_speculation)
+        self.text_editor.text_settled.connect(self.speculate)
         row_layout.addWidget(self.text_editor)
         row.setLayout(row_layout)
         layout.addWidget(row)
@@ -518,6 +591,10 @@ class MainWindow(QMainWindow):
         self.player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.player.setAudioOutput(self.audio_output)
+        # A streamed file that is still being written, reloaded as it grows
+        self.growing_audio: str | None = None
+        self.waiting_for_audio = False
+        self.pending_seek: tuple[int, bool] | None = None
 
         self.progress_slider = QSlider(Qt.Orientation.Horizontal)
         self.progress_slider.setRange(0, 100)
@@ -588,6 +665,57 @@ class MainWindow(QMainWindow):
 
         self.player.positionChanged.connect(self.update_position)
         self.player.durationChanged.connect(self.update_duration)
+        self.player.mediaStatusChanged.connect(self.on_media_status)
+        layout.addWidget(row)
+
+    def setup_batch_settings(self, layout: QVBoxLayout):
+        row = QGroupBox()
+        widget_registry.register(row, "batch")
+        row.setTitle(_t("batch.name"))
+        row_layout = QGridLayout()
+
+        row_layout.addWidget(QLabel(_t("batch.input")), 0, 0)
+        self.batch_input = QLineEdit()
+        self.batch_input.setPlaceholderText(_t("batch.input_info"))
+        row_layout.addWidget(self.batch_input, 0, 1, 1, 4)
+        self.batch_browse_button = QPushButton(_t("task.browse"))
+        self.batch_browse_button.clicked.connect(self.browse_batch_file)
+        row_layout.addWidget(self.batch_browse_button, 0, 5)
+
+        row_layout.addWidget(QLabel(_t("batch.concurrency")), 1, 0)
+        self.batch_concurrency_spin = QSpinBox()
+        self.batch_concurrency_spin.setRange(1, 64)
+        self.batch_concurrency_spin.setValue(config.batch_concurrency)
+        row_layout.addWidget(self.batch_concurrency_spin, 1, 1)
+        self.batch_adaptive_check = QCheckBox(_t("batch.adaptive"))
+        self.batch_adaptive_check.setToolTip(_t("batch.adaptive_tooltip"))
+        self.batch_adaptive_check.setChecked(config.batch_adaptive)
+        row_layout.addWidget(self.batch_adaptive_check, 2, 0, 1, 2)
+
+        self.batch_start_button = QPushButton(_t("batch.start"))
+        self.batch_start_button.clicked.connect(self.start_batch)
+        row_layout.addWidget(self.batch_start_button, 1, 2)
+
+        self.longform_button = QPushButton(_t("batch.longform"))
+        self.longform_button.setToolTip(_t("batch.longform_tooltip"))
+        self.longform_button.clicked.connect(self.start_longform)
+        row_layout.addWidget(self.longform_button, 1, 3)
+
+        self.batch_stop_button = QPushButton(_t("batch.stop"))
+        self.batch_stop_button.setEnabled(False)
+        self.batch_stop_button.setStyleSheet(STOP_BUTTON_QSS)
+        self.batch_stop_button.clicked.connect(self.stop_batch)
+        row_layout.addWidget(self.batch_stop_button, 1, 4)
+
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setValue(0)
+        row_layout.addWidget(self.batch_progress, 1, 5)
+
+        self.batch_status = QLabel("")
+        row_layout.addWidget(self.batch_status, 2, 2, 1, 4)
+
+        row.setMaximumHeight(150)
+        row.setLayout(row_layout)
         layout.addWidget(row)
 
     def setup_backend_settings(self, layout: QVBoxLayout):
@@ -622,6 +750,8 @@ class MainWindow(QMainWindow):
         row.addWidget(QLabel(_t("backend.name")), 2, 0)
         self.backend_input = QLineEdit()
         self.backend_input.setText(config.backend)
+        self.backend_input.setToolTip(_t("backend.name_tooltip"))
+        self.backend_input.editingFinished.connect(self.on_backend_changed)
         row.addWidget(self.backend_input, 2, 1)
 
         self.test_url_button = QPushButton(_t("backend.test_url"))
@@ -646,6 +776,20 @@ class MainWindow(QMainWindow):
 
         self.streaming = QCheckBox(_t("action.stream"))
         row_layout.addWidget(self.streaming)
+        self.pipelined = QCheckBox(_t("action.pipeline"))
+        self.pipelined.setToolTip(_t("action.pipeline_tooltip"))
+        row_layout.addWidget(self.pipelined)
+        self.hedge = QCheckBox(_t("action.hedge"))
+        self.hedge.setToolTip(_t("action.hedge_tooltip"))
+        self.hedge.setChecked(config.hedge)
+        row_layout.addWidget(self.hedge)
+        self.speculative = QCheckBox(_t("action.speculative"))
+        self.speculative.setToolTip(_t("action.speculative_tooltip"))
+        self.speculative.setChecked(config.speculative)
+        self.speculative.toggled.connect(
+            lambda: self.speculate(self.text_editor.input_edit.toPlainText())
+        )
+        row_layout.addWidget(self.speculative)
         self.start_button = QPushButton(_t("action.start"))
         self.start_button.clicked.connect(self.start_conversion)
         row_layout.addWidget(self.start_button)
@@ -781,45 +925,126 @@ class MainWindow(QMainWindow):
         message_box.exec()
 
     def test_backend(self):
-        backend = self.backend_input.text()
-
-        try:
-            response = requests.options(backend, timeout=5)
-        except:
-            response = None
+        self.test_url_button.setEnabled(False)
+        self.backend_test_worker = BackendTestWorker(self.backend_input.text())
+        self.backend_test_worker.result_signal.connect(self.on_backend_tested)
+        self.backend_test_worker.start()
+
+    def on_backend_tested(self, results: list):
+        self.test_url_button.setEnabled(True)
+        lines = [
+            f"{url}: {f'{latency * 1000:.0f} ms' if ok else _t('backend.unreachable')}"
+            for url, ok, latency in results
+        ]
 
         message_box = QMessageBox()
 
-        if response is not None and (
-            response.status_code == 200 or response.status_code == 204
-        ):
+        if results and all(ok for _, ok, _ in results):
             message_box.setIcon(QMessageBox.Icon.Information)
-            message_box.setText(_t("backend.test_succeed") + f"{response}")
-            config.backend = backend
+            message_box.setText(_t("backend.test_succeed") + "\n" + "\n".join(lines))
+            config.backend = self.backend_input.text()
             save_config()
         else:
             message_box.setIcon(QMessageBox.Icon.Question)
-            message_box.setText(_t("backend.test_failed") + f"{response}")
+            message_box.setText(_t("backend.test_failed") + "\n" + "\n".join(lines))
 
         message_box.exec()
 
+    def on_backend_changed(self):
+        backend = self.backend_input.text()
+        try:
+            BackendPool(backend).warmup()
+        except NoBackendError as e:
+            logger.warning(e)
+            return
+        # Settings calibrated for this backend before
+        tuning = tuning_store.get(backend)
+        if tuning is not None:
+            self.apply_tuning(tuning)
+
+    def apply_tuning(self, tuning: TuningResult):
+        self.chunk_length_slider.setValue(tuning.chunk_length)
+        self.latency_combo.setCurrentText(tuning.latency)
+
+    def toggle_calibration(self):
+        if self.tune_worker is not None:
+            self.tune_worker.stop()
+            self.calibrate_button.setEnabled(False)
+            return
+        self.tune_worker = TuneWorker(
+            ref_files=self.files,
+            ref_id=self.ref_id_input.text(),
+            backend=self.backend_input.text(),
+            api_key=self.api_key.text(),
+        )
+        self.tune_worker.progress_signal.connect(
+            lambda done, total: self.calibrate_button.setText(
+                _t("audio.calibrating").format(done=done, total=total)
+            )
+        )
+        self.tune_worker.finished_signal.connect(self.on_calibrated)
+        self.calibrate_button.setText(_t("audio.calibrating").format(done=0, total="?"))
+        self.tune_worker.start()
+
+    def on_calibrated(self, result: TuningResult | None):
+        stopped = self.tune_worker.tuner.stopped
+        self.tune_worker = None
+        self.calibrate_button.setText(_t("audio.calibrate"))
+        self.calibrate_button.setEnabled(True)
+        if stopped:
+            return
+        if result is None:
+            QMessageBox.warning(self, "Error", _t("audio.calibrate_failed"))
+            return
+
+        msg_box = QMessageBox()
+        msg_box.setIcon(
+            QMessageBox.Icon.Question if result.realtime else QMessageBox.Icon.Warning
+        )
+        text = _t("audio.calibrate_result").format(
+            chunk_length=result.chunk_length,
+            latency=result.latency,
+            first_audio=result.first_audio * 1000,
+            rtf=result.rtf,
+        )
+        if not result.realtime:
+            text += "\n" + _t("audio.calibrate_slow")
+        msg_box.setText(text)
+        msg_box.setStandardButtons(
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        msg_box.setDefaultButton(QMessageBox.StandardButton.Yes)
+        if msg_box.exec() == QMessageBox.StandardButton.Yes:
+            # Remembered for this backend only when accepted
+            tuning_store.put(result)
+            self.apply_tuning(result)
+            self.save_config(save_to_file=False)
+
     def save_config(self, save_to_file=True):
         config.backend = self.backend_input.text()
         config.input_device = self.input_device_combo.currentData()
         config.output_device = self.output_device_combo.currentData()
         config.chunk_length = self.chunk_length_slider.value()
+        config.latency_mode = self.latency_combo.currentText()
         config.max_new_tokens = self.max_new_tokens_slider.value()
         config.top_p = self.top_p_slider.value()
         config.repetition_penalty = self.repetition_penalty_slider.value()
         config.temperature = self.temperature_slider.value()
         config.mp3_bitrate = int(self.mp3_bitrate_combo.currentText())
+        config.audio_format = self.format_combo.currentText()
         config.ref_id = self.ref_id_input.text()
+        config.reference_budget = float(self.ref_budget_spin.value())
         config.save_path = self.save_audio_path.text()
         config.speed = self.speed_slider.value()
         config.volume = self.volume_slider.value()
         config.font_size = self.text_editor.font_size_spin.value()
         config.font_family = self.text_editor.font_combo.currentText()
         config.python_path = self.python.text()
+        config.batch_concurrency = self.batch_concurrency_spin.value()
+        config.batch_adaptive = self.batch_adaptive_check.isChecked()
+        config.result_cache = self.result_cache_check.isChecked()
+        config.hedge = self.hedge.isChecked()
+        config.speculative = self.speculative.isChecked()
         save_config()
 
         # pop up a message box to tell user if they want to save the config to a file
@@ -881,6 +1106,35 @@ class MainWindow(QMainWindow):
             self.play_button.setText(_t("tts_output.play"))
             self.now_audio.setText(_t("action.audio").format(audio_name=audio_file))
 
+    def reload_audio(self, play: bool = False):
+        """Load the current file again to pick up audio written since."""
+        source = self.player.source()
+        self.pending_seek = (self.player.position(), play)
+        self.player.setSource(QUrl())
+        self.player.setSource(source)
+
+    def on_media_status(self, status: QMediaPlayer.MediaStatus):
+        if status == QMediaPlayer.MediaStatus.LoadedMedia and self.pending_seek:
+            position, play = self.pending_seek
+            self.pending_seek = None
+            self.player.setPosition(position)
+            if play:
+                self.player.play()
+                self.play_button.setText(_t("tts_output.pause"))
+
+    def on_audio_progress(self, audio_path: str, seconds: float):
+        # Ignore late updates of a conversion that was already stopped
+        if audio_path != self.audio_path or not self.stop_button.isEnabled():
+            return
+        if self.growing_audio != audio_path:
+            self.growing_audio = audio_path
+            self.waiting_for_audio = False
+            self.set_audio(audio_path)
+        elif self.player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            # While playing, the file is reloaded once playback catches up
+            self.reload_audio(play=self.waiting_for_audio)
+            self.waiting_for_audio = False
+
     def toggle_play(self):
         if self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.player.pause()
@@ -912,6 +1166,12 @@ class MainWindow(QMainWindow):
         total_time = self.format_time(self.player.duration())
         self.time_label.setText(f"{current_time} / {total_time}")
         if self.player.position() == self.player.duration():
+            if self.growing_audio and self.player.duration() > 0:
+                # Resume as soon as more of the file has been written
+                self.waiting_for_audio = self.waiting_for_audio or (
+                    self.player.playbackState()
+                    == QMediaPlayer.PlaybackState.PlayingState
+                )
             self.player.pause()
             self.play_button.setText(_t("tts_output.play"))
 
@@ -921,8 +1181,46 @@ class MainWindow(QMainWindow):
         minutes = (ms // (1000 * 60)) % 60
         return f"{minutes:02}:{seconds:02}"
 
+    def tts_format(self) -> str:
+        format = self.format_combo.currentText()
+        # Pipelined segments are stitched as PCM, other streams need a decoder
+        if self.pipelined.isChecked() or (
+            self.streaming.isChecked() and not can_stream(format)
+        ):
+            format = "wav"
+        return format
+
+    def speculate(self, text: str):
+        """Synthesize ``text`` in the background so Generate plays at once."""
+        self.cancel_speculation()
+        # Pipelined results are stitched from segments and cached differently
+        if (
+            not self.speculative.isChecked()
+            or self.pipelined.isChecked()
+            or not text.strip()
+            or not self.start_button.isEnabled()
+        ):
+            return
+        worker = SpeculativeTTSWorker(
+            ref_files=self.files,
+            ref_id=self.ref_id_input.text(),
+            backend=self.backend_input.text(),
+            text=text,
+            api_key=self.api_key.text(),
+            **self.get_tts_params(self.tts_format()),
+        )
+        worker.finished.connect(lambda: self.speculative_workers.discard(worker))
+        self.speculative_workers.add(worker)
+        worker.start()
+
+    def cancel_speculation(self):
+        for worker in self.speculative_workers:
+            worker.stop()
+
     def start_conversion(self):
         self.save_config(save_to_file=False)
+        # Free the backend, a finished speculation is picked up from its cache
+        self.cancel_speculation()
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
 
@@ -930,20 +1228,16 @@ class MainWindow(QMainWindow):
         text = self.text_editor.input_edit.toPlainText()
 
         audio_name = now.strftime("%Y%m%d_%H%M%S")
-        format = "wav" if self.streaming.isChecked() else "mp3"
+        pipelined = self.pipelined.isChecked()
+        format = self.tts_format()
         audio_path = Path(self.save_audio_path.text()) / f"{audio_name}.{format}"
         audio_path.parent.mkdir(parents=True, exist_ok=True)
         self.audio_path = str(audio_path)
-        kwargs = dict(
-            chunk_length=self.chunk_length_slider.value(),
-            top_p=self.top_p_slider.value() / 1000.0,
-            repetition_penalty=self.repetition_penalty_slider.value() / 1000.0,
-            max_new_tokens=self.max_new_tokens_slider.value(),
-            temperature=self.temperature_slider.value() / 1000.0,
-            mp3_bitrate=int(self.mp3_bitrate_combo.currentText()),
-            format=format,
-        )
-        self.tts_worker = TTSWorker(
+        kwargs = self.get_tts_params(format)
+        if pipelined:
+            kwargs["depth"] = config.pipeline_depth
+        worker_cls = PipelinedTTSWorker if pipelined else TTSWorker
+        self.tts_worker = worker_cls(
             ref_files=self.files,
             ref_id=self.ref_id_input.text(),
             backend=self.backend_input.text(),
@@ -960,17 +1254,173 @@ class MainWindow(QMainWindow):
                 _t("action.latency").format(latency=(t * 1000.0))
             )
         )
+        self.tts_worker.metrics_signal.connect(self.on_tts_metrics)
+        self.tts_worker.audio_progress.connect(self.on_audio_progress)
         self.tts_worker.start()
 
+    def on_tts_metrics(self, metrics: RequestMetrics):
+        ttfb, rtf = metrics.elapsed("ttfb"), metrics.rtf
+        if ttfb is not None and rtf is not None:
+            text = _t("action.metrics").format(
+                ttfb=ttfb * 1000.0, total=metrics.elapsed("total") * 1000.0, rtf=rtf
+            )
+            if metrics.prebuffer is not None:
+                text += _t("action.playback").format(
+                    underruns=metrics.underruns, overruns=metrics.overruns
+                )
+            self.latency_label.setText(text)
+        summary = metrics.summary()
+        stats = output_engine.stats()
+        summary += "\n" + _t("action.output_stats").format(
+            underruns=stats["underruns"],
+            overruns=stats["overruns"],
+            prebuffer=stats["prebuffer"] * 1000.0,
+        )
+        if config.hedge:
+            summary += "\n" + _t("action.hedge_stats").format(
+                **BackendPool.hedge_stats()
+            )
+        self.latency_label.setToolTip(summary)
+
+    def get_tts_params(self, format: str) -> dict:
+        return dict(
+            chunk_length=self.chunk_length_slider.value(),
+            latency=self.latency_combo.currentText(),
+            top_p=self.top_p_slider.value() / 1000.0,
+            repetition_penalty=self.repetition_penalty_slider.value() / 1000.0,
+            max_new_tokens=self.max_new_tokens_slider.value(),
+            temperature=self.temperature_slider.value() / 1000.0,
+            mp3_bitrate=int(self.mp3_bitrate_combo.currentText()),
+            format=format,
+        )
+
+    def browse_batch_file(self):
+        file, _ = QFileDialog.getOpenFileName(
+            self, _t("batch.input"), "", "Prompts (*.txt *.csv *.jsonl)"
+        )
+        if file:
+            self.batch_input.setText(file)
+
+    def start_batch(self):
+        self.save_config(save_to_file=False)
+        batch_file = Path(self.batch_input.text())
+        if not batch_file.is_file():
+            QMessageBox.warning(self, _t("batch.name"), _t("batch.input_error"))
+            return
+
+        format = self.format_combo.currentText()
+        try:
+            items = load_batch_items(batch_file, format=format)
+        except Exception as e:
+            QMessageBox.warning(self, _t("batch.name"), f"{e}")
+            return
+
+        client = TTSClient(
+            backend=self.backend_input.text(),
+            api_key=self.api_key.text(),
+            ref_files=self.files,
+            ref_id=self.ref_id_input.text(),
+            **self.get_tts_params(format),
+        )
+        output_dir = Path(self.save_audio_path.text()) / batch_file.stem
+        self.batch_worker = BatchTTSWorker(
+            client,
+            items,
+            str(output_dir),
+            concurrency=self.batch_concurrency_spin.value(),
+            adaptive=self.batch_adaptive_check.isChecked(),
+        )
+        self.batch_limit = ""
+        self.batch_worker.progress_signal.connect(self.on_batch_progress)
+        self.batch_worker.limiter_signal.connect(self.on_batch_limit)
+        self.batch_worker.finished_signal.connect(self.on_batch_finished)
+        self.batch_progress.setMaximum(max(len(items), 1))
+        self.batch_progress.setValue(0)
+        self.batch_start_button.setEnabled(False)
+        self.longform_button.setEnabled(False)
+        self.batch_stop_button.setEnabled(True)
+        self.batch_worker.start()
+
+    def start_longform(self):
+        self.save_config(save_to_file=False)
+        text_file = Path(self.batch_input.text())
+        if not text_file.is_file():
+            QMessageBox.warning(self, _t("batch.name"), _t("batch.input_error"))
+            return
+        text = text_file.read_text(encoding="utf-8")
+
+        # Segments are cached in the project itself, which is what resumes
+        client = TTSClient(
+            backend=self.backend_input.text(),
+            api_key=self.api_key.text(),
+            ref_files=self.files,
+            ref_id=self.ref_id_input.text(),
+            use_cache=False,
+            **self.get_tts_params("wav"),
+        )
+        project_dir = Path(self.save_audio_path.text()) / f"{text_file.stem}_audiobook"
+        self.batch_worker = LongFormWorker(
+            client,
+            text,
+            str(project_dir),
+            concurrency=self.batch_concurrency_spin.value(),
+            adaptive=self.batch_adaptive_check.isChecked(),
+        )
+        self.batch_limit = ""
+        self.batch_worker.progress_signal.connect(self.on_batch_progress)
+        self.batch_worker.limiter_signal.connect(self.on_batch_limit)
+        self.batch_worker.finished_signal.connect(self.on_batch_finished)
+        self.batch_progress.setValue(0)
+        self.batch_start_button.setEnabled(False)
+        self.longform_button.setEnabled(False)
+        self.batch_stop_button.setEnabled(True)
+        self.batch_worker.start()
+
+    def stop_batch(self):
+        self.batch_worker.stop()
+        self.batch_stop_button.setEnabled(False)
+
+    def on_batch_progress(self, done: int, failed: int, total: int, rate: float):
+        self.batch_progress.setMaximum(max(total, 1))
+        self.batch_progress.setValue(done + failed)
+        self.batch_status.setText(
+            _t("batch.status").format(done=done, failed=failed, total=total, rate=rate)
+            + self.batch_limit
+        )
+
+    def on_batch_limit(self, limit: int, throughput: float):
+        # Emitted just before the progress of the same result
+        self.batch_limit = ", " + _t("batch.limit").format(
+            limit=limit, throughput=throughput
+        )
+
+    def on_batch_finished(self, message: str):
+        self.batch_status.setText(message)
+        self.batch_start_button.setEnabled(True)
+        self.longform_button.setEnabled(True)
+        self.batch_stop_button.setEnabled(False)
+
     def stop_conversion(self):
         self.tts_worker.stop()
         # self.tts_worker.wait()
+        self.growing_audio = None
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
     def on_conversion_finished(self, audio_path):
         self.now_audio.setText(_t("action.audio").format(audio_name=audio_path))
-        self.set_audio(self.audio_path)
+        if self.growing_audio == self.audio_path:
+            # Keep the position of a preview that started during synthesis
+            playing = (
+                self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState
+            )
+            self.reload_audio(play=playing or self.waiting_for_audio)
+        else:
+            self.set_audio(self.audio_path)
+        self.growing_audio = None
+        self.waiting_for_audio = False
+        if self.tts_worker.cache_hit:
+            self.toggle_play()
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
 
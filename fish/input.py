@@ -1,7 +1,7 @@
 import re
 import sys
 
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtWidgets import (
     QApplication,
     QCheckBox,
@@ -78,6 +78,9 @@ class EmotionSelector(QDialog):
 
 
 class TextEditorWidget(QWidget):
+    # The text, once it has not been edited for config.speculative_delay
+    text_settled = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         layout = QVBoxLayout(self)
@@ -131,6 +134,14 @@ class TextEditorWidget(QWidget):
 
         self.checkbox.stateChanged.connect(self.toggle_display)
         self.input_edit.textChanged.connect(self.update_display)
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.timeout.connect(
+            lambda: self.text_settled.emit(self.input_edit.toPlainText())
+        )
+        self.input_edit.textChanged.connect(
+            lambda: self.settle_timer.start(int(config.speculative_delay * 1000))
+        )
         self.emotion_selector = EmotionSelector(self)
 
         self.update_display()
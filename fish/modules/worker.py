@@ -5,20 +5,37 @@ import re
 import subprocess
 import time
 import wave
-from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import AsyncIterator, Iterator, List
 
+import httpx
 import numpy as np
-import ormsgpack
 import psutil
-import pyaudio
-import requests
 import sounddevice as sd
 from PyQt6.QtCore import QMutex, QMutexLocker, QObject, QRunnable, QThread, pyqtSignal
 
 from fish.config import config
-from fish.services.tts import ServeReferenceAudio, ServeTTSRequest
+from fish.services.playback import Playback, output_engine
+from fish.services.scheduler import Priority
+from fish.services.tts import (
+    BackendPool,
+    LatencyTuner,
+    NoBackendError,
+    ProbeResult,
+    RequestCancelled,
+    RequestMetrics,
+    TTSClient,
+    TTSJob,
+    result_cache,
+    speculative_cache,
+)
+from fish.services.tts.batch import BatchItem, BatchResult, BatchRunner, BatchStats
+from fish.services.tts.longform import LongFormRenderer
+from fish.services.tts.segment import split_sentences
+from fish.utils.decoder import FFMPEG_FORMATS, StreamDecoder, create_decoder
 from fish.utils.i18n import _t
+from fish.utils.wav import ProgressiveWavWriter
 
 from .network import WebSocketClient
 
@@ -171,113 +188,141 @@ class SubprocessWorker(BaseWorker):
         self.process = None
 
 
-class TimeWorker(QThread):
-    time_signal = pyqtSignal(float)
-
-    def __init__(self, pause_time=0.1, parent=None):
-        super().__init__(parent)
-        self._stop_requested = False
-        self.pause_time = pause_time
-
-    def run(self):
-        start_time = time.time()
-        while not self._stop_requested:
-            time.sleep(self.pause_time)
-            self.time_signal.emit(time.time() - start_time)
-
-    def stop(self):
-        self._stop_requested = True
-
-
 class AudioPlayWorker(QThread):
     finished_signal = pyqtSignal(str)
     packet_delay = pyqtSignal(float)
+    # Path and playable seconds of a streamed WAV file that is still growing
+    audio_progress = pyqtSignal(str, float)
 
     def __init__(
         self,
         audio_path: str,
         streaming: bool,
         frames_per_buffer: int = 16384,
+        format: str = "wav",
     ):
         super().__init__()
         self.audio_path = audio_path
         self.streaming = streaming
         self.frames_per_buffer = frames_per_buffer
+        self.format = format
         self.iterable_chunks = None
+        # Compressed streams are decoded for playback and saved verbatim
+        self.decoder: StreamDecoder | None = None
+        # Set by callers that want a latency breakdown of the playback
+        self.metrics: RequestMetrics | None = None
 
         self.is_interrupted = False
-        self.elapsed = 0
-        self.p = None
-        self.stream = None
-
-        self.time_worker = TimeWorker(pause_time=0.1)
-        self.time_worker.time_signal.connect(self._calc_elapsed)
-
-    def _calc_elapsed(self, elapsed):
-        self.elapsed = elapsed
-        self.packet_delay.emit(elapsed)
-
-    def _initialize_audio_stream(self):
-        p = pyaudio.PyAudio()
-        stream = p.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=44100,
-            output=True,
-            frames_per_buffer=self.frames_per_buffer,
+        self.playback: Playback | None = None
+
+    def _initialize_audio_stream(self) -> Playback:
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.output_latency = output_engine.latency
+        return output_engine.playback(
+            on_start=None if metrics is None else lambda: metrics.mark("first_audio")
         )
-        return p, stream
 
     def start_audio_streaming(self):
-        if self.streaming:
-            self.p, self.stream = self._initialize_audio_stream()
-            self.f = wave.open(self.audio_path, "wb")
-            self.f.setnchannels(1)
-            self.f.setsampwidth(2)
-            self.f.setframerate(44100)
+        if self.streaming and self.format in FFMPEG_FORMATS:
+            self.playback = self._initialize_audio_stream()
+            self.decoder = create_decoder(self.format)
+            self.f = open(self.audio_path, "wb")
+        elif self.streaming:
+            self.playback = self._initialize_audio_stream()
+            self.f = ProgressiveWavWriter(
+                self.audio_path,
+                on_update=lambda seconds: self.audio_progress.emit(
+                    self.audio_path, seconds
+                ),
+            )
         else:
             self.f = open(self.audio_path, "wb")
 
+    def play_pcm(self, pcm: bytes):
+        if not pcm:
+            return
+        self.playback.write(pcm)
+        if self.metrics is not None:
+            self.metrics.samples += len(pcm) // 2
+
+    async def play_pcm_async(self, pcm: bytes):
+        if not pcm:
+            return
+        await self.playback.write_async(pcm)
+        if self.metrics is not None:
+            self.metrics.samples += len(pcm) // 2
+
+    def save_chunk(self, chunk: bytes) -> bytes:
+        """Write ``chunk`` to the output file and return the PCM to play."""
+        metrics = self.metrics
+        if metrics is not None and (ttfb := metrics.receive(len(chunk))) is not None:
+            self.packet_delay.emit(ttfb)
+
+        if self.decoder is not None:
+            self.f.write(chunk)
+            return self.decoder.feed(chunk)
+        if self.streaming:
+            return self.f.write(chunk)
+        self.f.write(chunk)
+        return b""
+
+    def write_chunk(self, chunk: bytes):
+        self.play_pcm(self.save_chunk(chunk))
+
     def audio_streaming(self):
-        first_packet_time = None
         if not self.iterable_chunks:
             return
         for chunk in self.iterable_chunks:
             if self.is_interrupted:
                 break
-            if self.streaming:
-                self.stream.write(chunk)
-                self.f.writeframesraw(chunk)
-            else:
-                self.f.write(chunk)
-
-            if first_packet_time is None:
-                first_packet_time = self.elapsed
-                self.time_worker.stop()
+            self.write_chunk(chunk)
+        if self.metrics is not None:
+            self.metrics.mark("last_byte")
 
     async def async_audio_streaming(self):
-        first_packet_time = None
         if not self.iterable_chunks:
             return
         async for chunk in self.iterable_chunks:
             if self.is_interrupted:
                 break
-            if self.streaming:
-                self.stream.write(chunk)
-                self.f.writeframesraw(chunk)
-            else:
-                self.f.write(chunk)
-
-            if first_packet_time is None:
-                first_packet_time = self.elapsed
-                self.time_worker.stop()
+            await self.play_pcm_async(self.save_chunk(chunk))
+        if self.metrics is not None:
+            self.metrics.mark("last_byte")
+
+    def _flush_decoder(self) -> bytes:
+        if self.decoder is None or self.is_interrupted:
+            return b""
+        return self.decoder.flush()
+
+    def finish_playback(self):
+        """Play what is left, and return once the device played it."""
+        self.play_pcm(self._flush_decoder())
+        if self.playback is not None and not self.is_interrupted:
+            self.playback.finish()
+            self.playback.wait()
+
+    async def finish_playback_async(self):
+        await self.play_pcm_async(self._flush_decoder())
+        if self.playback is not None and not self.is_interrupted:
+            self.playback.finish()
+            await self.playback.wait_async()
 
     def stop_audio_streaming(self):
-        if self.streaming and self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-            self.p.terminate()
+        if self.decoder is not None:
+            self.decoder.close()
+            self.decoder = None
+        if self.playback is not None:
+            if not self.playback.done:
+                # Interrupted or failed, drop what is still buffered
+                self.playback.cancel()
+            if self.metrics is not None:
+                self.metrics.prebuffer = self.playback.prebuffer
+                self.metrics.underruns = self.playback.underruns
+                self.metrics.overruns = self.playback.overruns
         self.f.close()
+        if self.metrics is not None:
+            self.metrics.mark("total")
         logger.info("Playback Finished")
 
     def set_chunks(self, chunks: Iterator[bytes] | AsyncIterator[bytes] = None):
@@ -286,8 +331,11 @@ class AudioPlayWorker(QThread):
     def run(self):
         logger.info("Sync Playback Started")
         self.start_audio_streaming()
-        self.audio_streaming()
-        self.stop_audio_streaming()
+        try:
+            self.audio_streaming()
+            self.finish_playback()
+        finally:
+            self.stop_audio_streaming()
         if not self.is_interrupted:
             logger.info("Sync Playback Finished")
             self.finished_signal.emit(self.audio_path)
@@ -295,20 +343,30 @@ class AudioPlayWorker(QThread):
     async def run_async(self):
         logger.info("Async Playback Started")
         self.start_audio_streaming()
-        await self.async_audio_streaming()
-        self.stop_audio_streaming()
+        try:
+            await self.async_audio_streaming()
+            await self.finish_playback_async()
+        except asyncio.CancelledError:
+            # The reply was cancelled, silence it at once
+            self.stop()
+            raise
+        finally:
+            self.stop_audio_streaming()
         if not self.is_interrupted:
             logger.info("Async Playback Finished")
             self.finished_signal.emit(self.audio_path)
 
     def stop(self):
         self.is_interrupted = True
-        self.time_worker.stop()
+        if self.playback is not None:
+            # Silence at once instead of after the queued audio
+            self.playback.cancel()
         logger.info("Playback Stopped")
 
 
 class TTSWorker(AudioPlayWorker):
     error_signal = pyqtSignal()
+    metrics_signal = pyqtSignal(object)
 
     def __init__(
         self,
@@ -321,72 +379,372 @@ class TTSWorker(AudioPlayWorker):
         streaming: bool,
         **kwargs,
     ):
-        super().__init__(audio_path, streaming)
-        self.ref_files = ref_files
-        self.ref_id = ref_id if ref_id else None
-        self.backend = backend
+        super().__init__(audio_path, streaming, format=kwargs.get("format", "wav"))
         self.text = text
-        self.api_key = api_key
-        self.kwargs = kwargs
         self.streaming = streaming
-
-    def _get_pre_files(self):
-        return [f for f in self.ref_files if not f.endswith(".lab")]
-
-    def _filter_audio_files(self, pre_files: List[str]):
-        return [
-            f
-            for f in pre_files
-            if Path(f).exists() and Path(f).with_suffix(".lab").exists()
-        ]
-
-    def _create_tts_request(self, audio_files: List[str]):
-        return ServeTTSRequest(
-            text=self.text,
-            references=[
-                ServeReferenceAudio(
-                    audio=Path(f).read_bytes(),
-                    text=Path(f).with_suffix(".lab").read_text(encoding="utf-8"),
-                )
-                for f in audio_files
-            ],
-            reference_id=self.ref_id,
-            streaming=self.streaming,
-            format=self.kwargs.get("format", "wav"),
-            chunk_length=self.kwargs.get("chunk_length", 200),
-            top_p=self.kwargs.get("top_p"),
-            repetition_penalty=self.kwargs.get("repetition_penalty"),
-            max_new_tokens=self.kwargs.get("max_new_tokens"),
-            temperature=self.kwargs.get("temperature"),
-            mp3_bitrate=self.kwargs.get("mp3_bitrate"),
+        self.client = TTSClient(
+            backend=backend,
+            api_key=api_key,
+            ref_files=ref_files,
+            ref_id=ref_id,
+            **kwargs,
         )
+        self.job = TTSJob(self.client, text, audio_path, streaming)
 
-    def run(self):
-        pre_files = self._get_pre_files()
-        audio_files = self._filter_audio_files(pre_files)
-        request = self._create_tts_request(audio_files)
+    @property
+    def cache_hit(self) -> bool:
+        return self.job.cache_hit
+
+    def _load_cached(self) -> bool:
+        if self.job.load_cached() is None:
+            return False
+        self.finished_signal.emit(self.audio_path)
+        return True
+
+    def _store_cached(self):
+        if not self.is_interrupted:
+            self.job.store_cached()
+
+    def _new_metrics(self) -> RequestMetrics:
+        self.metrics = self.job.new_metrics()
+        return self.metrics
+
+    def _finish_metrics(self):
+        if self.is_interrupted:
+            return
+        metrics = self.job.finish_metrics()
+        if metrics is not None:
+            self.metrics_signal.emit(metrics)
 
+    def stop(self):
+        super().stop()
+        # Abort in-flight requests so a blocked read returns immediately
+        self.job.cancel()
+
+    def run(self):
         try:
-            self.time_worker.start()
-            response = requests.post(
-                self.backend,
-                data=ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC),
-                stream=self.streaming,
-                headers={
-                    "authorization": f"Bearer {self.api_key}",
-                    "content-type": "application/msgpack",
-                },
-            )
-            response.raise_for_status()
-            audio_chunks = response.iter_content(chunk_size=self.frames_per_buffer)
-            self.set_chunks(audio_chunks)
+            self._new_metrics()
+            if self._load_cached():
+                self._finish_metrics()
+                return
+            # Played as it arrives, the output engine takes care of framing
+            self.set_chunks(self.job.chunks())
             super().run()
-        except requests.RequestException as e:
+            self._store_cached()
+            self._finish_metrics()
+        except RequestCancelled:
+            logger.info("TTS request cancelled")
+        except httpx.HTTPError as e:
             logger.error(f"Network request failed: {e}")
             self.error_signal.emit()
         finally:
             self.stop()  # Ensure the thread stops gracefully if there's an error
-            response.close()
+            self.job.close()
+
+
+class SpeculativeTTSWorker(QThread):
+    """Synthesize the text being edited before Generate is clicked.
+
+    The audio is stored in ``speculative_cache`` under the key a
+    ``TTSWorker`` with the same text and settings looks up, so Generate
+    then plays it at once. Requests run in the lowest priority class.
+    """
+
+    def __init__(
+        self,
+        ref_files: List[str],
+        ref_id: str,
+        backend: str,
+        text: str,
+        api_key: str,
+        **kwargs,
+    ):
+        super().__init__()
+        self.text = text
+        self.client = TTSClient(
+            backend=backend,
+            api_key=api_key,
+            ref_files=ref_files,
+            ref_id=ref_id,
+            priority=Priority.SPECULATIVE,
+            **kwargs,
+        )
+        self.is_interrupted = False
+
+    def run(self):
+        request = self.client.build_request(self.text)
+        key = self.client.cache_key(request)
+        if speculative_cache.get(key) is not None:
+            return
+        if self.client.use_cache and result_cache.get(key) is not None:
+            return
+        try:
+            with self.client.post(request) as response:
+                content = response.content
+        except RequestCancelled:
+            return
+        except httpx.HTTPError as e:
+            logger.warning(f"Speculative synthesis failed: {e}")
+            return
+        if not self.is_interrupted:
+            speculative_cache.put_bytes(key, content, f".{request.format}")
+            logger.info(f"Speculative synthesis ready: {len(self.text)} chars")
+
+    def stop(self):
+        self.is_interrupted = True
+        self.client.cancel()
+
+
+class PipelinedTTSWorker(TTSWorker):
+    """Synthesize long text sentence by sentence with overlapping requests.
+
+    Segment N is played while segments N+1..N+depth are being generated,
+    and the decoded audio is stitched into one WAV file.
+    """
+
+    def __init__(self, *args, depth: int = 2, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Segments are always decoded and played as PCM
+        self.streaming = True
+        self.format = "wav"
+        self.depth = max(1, depth)
+        self.job = TTSJob(
+            self.client,
+            self.text,
+            self.audio_path,
+            streaming=True,
+            salt="pipelined",
+            format="wav",
+        )
+
+    def _synthesize_segment(self, text: str) -> bytes:
+        request = self.client.build_request(text, streaming=False, format="wav")
+        # Only the first request of the session reaches the early phases
+        with self.client.post(request, self.metrics) as response:
+            with wave.open(io.BytesIO(response.content), "rb") as f:
+                return f.readframes(f.getnframes())
+
+    def _segment_chunks(self, segments: List[str]) -> Iterator[bytes]:
+        executor = ThreadPoolExecutor(max_workers=self.depth + 1)
+        pending = deque()
+        next_index = 0
+        try:
+            while pending or next_index < len(segments):
+                while next_index < len(segments) and len(pending) <= self.depth:
+                    future = executor.submit(
+                        self._synthesize_segment, segments[next_index]
+                    )
+                    pending.append(future)
+                    next_index += 1
+
+                if self.is_interrupted:
+                    for future in pending:
+                        future.cancel()
+                    return
+
+                pcm = pending.popleft().result()
+                for offset in range(0, len(pcm), self.frames_per_buffer):
+                    yield pcm[offset : offset + self.frames_per_buffer]
+        except BaseException:
+            # Report a failed segment now instead of after the ones in flight
+            self.client.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        segments = split_sentences(self.text)
+        logger.info(f"Pipelined synthesis of {len(segments)} segments")
+        try:
+            self._new_metrics()
+            if self._load_cached():
+                self._finish_metrics()
+                return
+            self.set_chunks(self._segment_chunks(segments))
+            AudioPlayWorker.run(self)
+            self._store_cached()
+            self._finish_metrics()
+        except RequestCancelled:
+            logger.info("TTS request cancelled")
+        except httpx.HTTPError as e:
+            logger.error(f"Network request failed: {e}")
+            self.error_signal.emit()
+        except (wave.Error, EOFError, ValueError) as e:
+            # A segment that is not a well-formed WAV file
+            logger.error(f"Unable to decode audio: {e}")
+            self.error_signal.emit()
+        finally:
+            self.stop()
+
+
+class BatchTTSWorker(QThread):
+    progress_signal = pyqtSignal(int, int, int, float)  # done, failed, total, rate
+    limiter_signal = pyqtSignal(int, float)  # concurrency limit, chars per second
+    finished_signal = pyqtSignal(str)
+
+    def __init__(
+        self,
+        client: TTSClient,
+        items: List[BatchItem],
+        output_dir: str,
+        concurrency: int,
+        adaptive: bool = False,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.output_dir = output_dir
+        self.runner = BatchRunner(
+            client,
+            items,
+            output_dir,
+            concurrency=concurrency,
+            on_result=self._on_result,
+            adaptive=adaptive,
+        )
+
+    def _on_result(self, result: BatchResult, stats: BatchStats):
+        if not result.ok:
+            logger.error(f"Batch item {result.item.output} failed: {result.error}")
+        if stats.limit is not None:
+            self.limiter_signal.emit(stats.limit, stats.throughput)
+        self.progress_signal.emit(
+            stats.done, stats.failed, stats.total, stats.items_per_second
+        )
+
+    def run(self):
+        logger.info(f"Batch synthesis of {len(self.runner.items)} items started")
+        self.runner.run()
+        stats = self.runner.stats
+        self.finished_signal.emit(
+            _t("batch.finished").format(
+                done=stats.done,
+                failed=stats.failed,
+                elapsed=stats.elapsed,
+                rate=stats.chars_per_second,
+                output_dir=self.output_dir,
+            )
+        )
+
+    def stop(self):
+        self.runner.stop()
+        logger.info("Batch synthesis stopping")
+
+
+class LongFormWorker(QThread):
+    progress_signal = pyqtSignal(int, int, int, float)  # done, failed, total, rate
+    limiter_signal = pyqtSignal(int, float)  # concurrency limit, chars per second
+    finished_signal = pyqtSignal(str)
+
+    def __init__(
+        self,
+        client: TTSClient,
+        text: str,
+        project_dir: str,
+        concurrency: int,
+        adaptive: bool = False,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.project_dir = project_dir
+        self.renderer = LongFormRenderer(
+            client,
+            text,
+            project_dir,
+            concurrency=concurrency,
+            adaptive=adaptive,
+            on_result=self._on_result,
+        )
+        self.rendered = 0
+        self.total = 0
+
+    def _on_result(self, result: BatchResult, stats: BatchStats):
+        if not result.ok:
+            logger.error(f"Segment {result.item.text[:30]!r} failed: {result.error}")
+        if stats.limit is not None:
+            self.limiter_signal.emit(stats.limit, stats.throughput)
+        self.progress_signal.emit(
+            self.rendered + stats.done, stats.failed, self.total, stats.items_per_second
+        )
+
+    def run(self):
+        try:
+            # Reading the manifest and the text may fail as well
+            segments = self.renderer.plan()
+            keys = {segment.key for segment in segments}
+            self.total = len(keys)
+            self.rendered = self.total - len({s.key for s in self.renderer.pending})
+            logger.info(
+                f"Long-form rendering of {len(segments)} segments, "
+                f"{self.rendered} of {self.total} already rendered"
+            )
+            self.progress_signal.emit(self.rendered, 0, self.total, 0.0)
+            complete = self.renderer.run()
+        except Exception as e:
+            logger.exception("Long-form rendering failed")
+            self.finished_signal.emit(f"{e}")
+            return
+        if complete:
+            message = _t("batch.longform_finished").format(
+                chapters=len(self.renderer.chapters), output_dir=self.project_dir
+            )
+        else:
+            message = _t("batch.longform_paused").format(
+                pending=len(self.renderer.pending), output_dir=self.project_dir
+            )
+        self.finished_signal.emit(message)
+
+    def stop(self):
+        self.renderer.stop()
+        logger.info("Long-form rendering stopping")
+
+
+class BackendTestWorker(QThread):
+    """Probe every backend replica without blocking the GUI thread."""
+
+    result_signal = pyqtSignal(list)  # [(url, ok, latency in seconds or None)]
+
+    def __init__(self, backend: str, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+
+    def _probe(self, endpoint):
+        ok = BackendPool.probe(endpoint)
+        return endpoint.url, ok, endpoint.probe_latency
+
+    def run(self):
+        try:
+            endpoints = BackendPool(self.backend).endpoints
+        except NoBackendError as e:
+            logger.warning(e)
+            self.result_signal.emit([(self.backend, False, None)])
+            return
+        with ThreadPoolExecutor(max_workers=max(1, len(endpoints))) as executor:
+            results = list(executor.map(self._probe, endpoints))
+        self.result_signal.emit(results)
+
+
+class TuneWorker(QThread):
+    """Probe chunk_length and latency settings against one backend."""
+
+    progress_signal = pyqtSignal(int, int)  # probes done, total
+    finished_signal = pyqtSignal(object)  # TuningResult or None
+
+    def __init__(self, ref_files, ref_id, backend, api_key, parent=None):
+        super().__init__(parent)
+        # Probes are never cached, a cache hit would measure nothing
+        client = TTSClient(backend, api_key, ref_files, ref_id, use_cache=False)
+        self.tuner = LatencyTuner(client, on_probe=self.on_probe)
+
+    def on_probe(self, result: ProbeResult, done: int, total: int):
+        self.progress_signal.emit(done, total)
+
+    def run(self):
+        # Only stored once the user accepts it, see MainWindow.on_calibrated
+        self.finished_signal.emit(self.tuner.run())
+
+    def stop(self):
+        self.tuner.stop()
+        logger.info("Tuning stopping")
 
 
 class AudioRecordWorker(AsyncTaskWorker):
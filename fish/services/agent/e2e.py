@@ -11,6 +11,7 @@ import ormsgpack
 import soundfile as sf
 
 from fish.config import config
+from fish.services.scheduler import Priority, scheduler
 
 from .schema import ServeRequest, ServeVQGANDecodeRequest, ServeVQGANEncodeRequest
 
@@ -104,11 +105,12 @@ class FishE2EAgent:
         encode_request_bytes = ormsgpack.packb(
             encode_request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC
         )
-        encode_response = await FishE2EAgent.client.post(
-            f"{self.vqgan_url}/encode",
-            data=encode_request_bytes,
-            headers={"Content-Type": "application/msgpack"},
-        )
+        async with scheduler.aslot(Priority.CHAT):
+            encode_response = await FishE2EAgent.client.post(
+                f"{self.vqgan_url}/encode",
+                data=encode_request_bytes,
+                headers={"Content-Type": "application/msgpack"},
+            )
         encode_response_data = ormsgpack.unpackb(encode_response.content)
         codes = encode_response_data["tokens"][0]
 
@@ -170,40 +172,44 @@ class FishE2EAgent:
             current_vq = False
             vq_codes = []
 
-        async with self.client.stream(
-            "POST",
-            self.llm_url,
-            data=ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC),
-            headers={"Content-Type": "application/msgpack"},
-        ) as response:
-            async for chunk in response.aiter_bytes():
-                buffer += chunk
-
-                while len(buffer) >= 4:
-                    read_length = struct.unpack("I", buffer[:4])[0]
-                    if len(buffer) < 4 + read_length:
-                        break
-
-                    body = buffer[4 : 4 + read_length]
-                    buffer = buffer[4 + read_length :]
-                    data = ormsgpack.unpackb(body)
-
-                    if data["delta"] and data["delta"]["part"]:
-                        if current_vq and data["delta"]["part"]["type"] == "text":
-                            async for event in decode_send():
-                                yield event
-                        if data["delta"]["part"]["type"] == "text":
-                            yield FishE2EEvent(
-                                type=FishE2EEventType.TEXT_SEGMENT,
-                                text=data["delta"]["part"]["text"],
-                            )
-                        elif data["delta"]["part"]["type"] == "vq":
-                            vq_codes.append(np.array(data["delta"]["part"]["codes"]))
-                            current_vq = True
-
-        if current_vq and vq_codes:
-            async for event in decode_send():
-                yield event
+        # One slot covers the chat stream and the decodes it triggers
+        async with scheduler.aslot(Priority.CHAT):
+            async with self.client.stream(
+                "POST",
+                self.llm_url,
+                data=ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC),
+                headers={"Content-Type": "application/msgpack"},
+            ) as response:
+                async for chunk in response.aiter_bytes():
+                    buffer += chunk
+
+                    while len(buffer) >= 4:
+                        read_length = struct.unpack("I", buffer[:4])[0]
+                        if len(buffer) < 4 + read_length:
+                            break
+
+                        body = buffer[4 : 4 + read_length]
+                        buffer = buffer[4 + read_length :]
+                        data = ormsgpack.unpackb(body)
+
+                        if data["delta"] and data["delta"]["part"]:
+                            if current_vq and data["delta"]["part"]["type"] == "text":
+                                async for event in decode_send():
+                                    yield event
+                            if data["delta"]["part"]["type"] == "text":
+                                yield FishE2EEvent(
+                                    type=FishE2EEventType.TEXT_SEGMENT,
+                                    text=data["delta"]["part"]["text"],
+                                )
+                            elif data["delta"]["part"]["type"] == "vq":
+                                vq_codes.append(
+                                    np.array(data["delta"]["part"]["codes"])
+                                )
+                                current_vq = True
+
+            if current_vq and vq_codes:
+                async for event in decode_send():
+                    yield event
 
         yield FishE2EEvent(type=FishE2EEventType.END_OF_TEXT)
         yield FishE2EEvent(type=FishE2EEventType.END_OF_SPEECH)
@@ -53,3 +53,22 @@ class ServeVQGANDecodeRequest(BaseModel):
 class ServeVQGANDecodeResponse(BaseModel):
     # The audio here should be in PCM float16 format
     audios: list[bytes]
+
+
+class ServeResponse(BaseModel):
+    messages: list[ServeMessage]
+    finish_reason: Literal["stop", "error"] | None = None
+    stats: dict[str, int | float | str] = {}
+
+
+class ServeStreamDelta(BaseModel):
+    role: Literal["system", "assistant", "user"] | None = None
+    part: ServeVQPart | ServeTextPart | None = None
+
+
+class ServeStreamResponse(BaseModel):
+    # Sent over /v1/chat as a struct "I" length prefix and a msgpack map
+    sample_id: int = 0
+    delta: ServeStreamDelta | None = None
+    finish_reason: Literal["stop", "error"] | None = None
+    stats: dict[str, int | float | str] | None = None
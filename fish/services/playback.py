@@ -0,0 +1,458 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+import sounddevice as sd
+
+from fish.config import config
+from fish.utils.wav import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Fixed size byte FIFO, not thread safe on its own."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self._start = 0
+        self.size = 0
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    def write(self, data: bytes) -> int:
+        """Append as much of ``data`` as fits, return the number of bytes taken."""
+        n = min(len(data), self.free)
+        end = (self._start + self.size) % self.capacity
+        first = min(n, self.capacity - end)
+        self._data[end : end + first] = data[:first]
+        self._data[: n - first] = data[first:n]
+        self.size += n
+        return n
+
+    def read(self, n: int) -> bytes:
+        n = min(n, self.size)
+        first = min(n, self.capacity - self._start)
+        data = bytes(self._data[self._start : self._start + first])
+        if n > first:
+            data += self._data[: n - first]
+        self._start = (self._start + n) % self.capacity
+        self.size -= n
+        return data
+
+    def clear(self):
+        self._start = 0
+        self.size = 0
+
+
+class Playback:
+    """One producer's PCM, played after every playback queued before it.
+
+    ``write`` blocks while the ring buffer is full, so a producer is paced
+    by the device without writing to it itself. Playback starts once the
+    jitter buffer holds ``target`` bytes, and after an underrun it is
+    refilled to the target again, so a slow network causes one longer pause
+    instead of a stutter. ``write_async`` and ``wait_async`` await the same
+    conditions on an event loop, which keeps running while audio plays.
+    """
+
+    def __init__(
+        self,
+        engine: "OutputEngine",
+        capacity: int,
+        prebuffer: float,
+        on_start: Callable[[], None] | None = None,
+    ):
+        self.engine = engine
+        self.ring = RingBuffer(capacity)
+        # Seconds of audio to buffer before playing, as learned by the engine
+        self.prebuffer = prebuffer
+        # Called from the audio callback when the first frames are played
+        self.on_start = on_start
+        self.played = 0
+        self.written = 0
+        self.buffering = True
+        self.finished = False
+        self.cancelled = False
+        self.error: str | None = None
+        # The device ran dry mid-stream, or the producer waited for space
+        self.underruns = 0
+        self.overruns = 0
+        self._first_write: float | None = None
+        self._partial = b""
+        self._done = threading.Event()
+        # Called with the lock held when space frees up or the playback ends
+        self._waiters: list[Callable[[], None]] = []
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def arrival_rate(self) -> float | None:
+        """Seconds of audio received per second since the first write."""
+        if self._first_write is None:
+            return None
+        elapsed = time.perf_counter() - self._first_write
+        if elapsed < 0.2:
+            return None
+        return self.written / self.engine.bytes_per_second / elapsed
+
+    @property
+    def target(self) -> int:
+        """Bytes to buffer before playing, more if audio arrives too slowly."""
+        seconds = self.prebuffer
+        rate = self.arrival_rate
+        if rate is not None and rate < 1:
+            # Generation slower than real time needs a longer head start
+            seconds /= max(rate, 0.1)
+        seconds = min(seconds, self.engine.max_prebuffer)
+        size = int(seconds * self.engine.bytes_per_second)
+        return size - size % self.engine.frame_size
+
+    def _frames(self, pcm: bytes) -> memoryview:
+        data = self._partial + pcm
+        # A sample may be split across network chunks
+        cut = len(data) - len(data) % self.engine.frame_size
+        self._partial = data[cut:]
+        return memoryview(data)[:cut]
+
+    def _put(self, data: memoryview) -> int:
+        """Buffer as much of ``data`` as fits, called with the lock."""
+        if self._first_write is None:
+            self._first_write = time.perf_counter()
+        n = self.ring.write(data)
+        self.written += n
+        return n
+
+    def _overrun(self):
+        self.overruns += 1
+        self.engine.overruns += 1
+
+    def write(self, pcm: bytes) -> bool:
+        """Queue ``pcm``, False if the playback was cancelled or failed."""
+        data = self._frames(pcm)
+        condition = self.engine.condition
+        with condition:
+            waited = False
+            while data:
+                if not self.ring.free and not self.cancelled:
+                    if not waited:
+                        waited = True
+                        self._overrun()
+                    condition.wait_for(lambda: self.cancelled or self.ring.free)
+                if self.cancelled:
+                    return False
+                data = data[self._put(data) :]
+        return True
+
+    async def _until(self, ready: Callable[[], bool]):
+        """Wait on the event loop until ``ready`` holds, woken by the engine."""
+        loop = asyncio.get_running_loop()
+
+        def resolve(future: asyncio.Future):
+            if not future.done():
+                future.set_result(None)
+
+        def wake(future: asyncio.Future):
+            try:
+                loop.call_soon_threadsafe(resolve, future)
+            except RuntimeError:
+                pass  # The loop is closed, nobody waits anymore
+
+        while True:
+            with self.engine.condition:
+                if ready():
+                    return
+                future = loop.create_future()
+                self._waiters.append(lambda: wake(future))
+            await future
+
+    async def write_async(self, pcm: bytes) -> bool:
+        """Like ``write``, but awaits buffer space instead of blocking the loop."""
+        data = self._frames(pcm)
+        waited = False
+        while True:
+            with self.engine.condition:
+                if self.cancelled:
+                    return False
+                data = data[self._put(data) :]
+                if not data:
+                    return True
+                if not waited:
+                    waited = True
+                    self._overrun()
+            await self._until(lambda: self.cancelled or self.ring.free)
+
+    def finish(self):
+        """No more audio follows, the playback ends once the buffer is played."""
+        with self.engine.condition:
+            self.finished = True
+
+    def cancel(self):
+        """Drop the buffered audio and stop as soon as possible."""
+        with self.engine.condition:
+            self.cancelled = True
+            self.ring.clear()
+            self.engine.condition.notify_all()
+            self._wake()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the buffered audio was played, False on timeout."""
+        return self._done.wait(timeout)
+
+    async def wait_async(self):
+        """Like ``wait``, without blocking the event loop."""
+        await self._until(lambda: self.done)
+
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for wake in waiters:
+            wake()
+
+    def _complete(self):
+        self._done.set()
+        self._wake()
+
+
+class OutputEngine:
+    """A process-wide output stream shared by every audio producer.
+
+    Opening a PortAudio device for each playback costs noticeable latency
+    before the first sample, so a callback stream on ``config.output_device``
+    is kept open and only paused after ``idle_timeout`` seconds without
+    audio. Producers get a ``Playback`` each, and the callback plays their
+    ring buffers back to back, strictly in the order they were created.
+
+    The jitter buffer starts at ``config.output_prebuffer`` seconds. It grows
+    by half after a playback with underruns and shrinks slowly after clean
+    ones, so it settles just above the jitter of the network.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1,
+        sample_width: int = 2,
+        min_prebuffer: float = 0.05,
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.device = config.output_device
+        self.buffer_seconds = config.output_buffer
+        self.prebuffer = config.output_prebuffer
+        self.min_prebuffer = min_prebuffer
+        self.idle_timeout = config.output_idle_timeout
+        self.underruns = 0
+        self.overruns = 0
+        self.condition = threading.Condition()
+        self._queue: deque[Playback] = deque()
+        self._stream: sd.RawOutputStream | None = None
+        self._stream_device = None
+        self._last_active = time.monotonic()
+        self._warm = False
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def bytes_per_second(self) -> int:
+        return self.sample_rate * self.frame_size
+
+    @property
+    def max_prebuffer(self) -> float:
+        # Leave room to keep receiving while the buffer is played
+        return self.buffer_seconds * 0.75
+
+    @property
+    def latency(self) -> float | None:
+        """Output latency of the open stream in seconds, as PortAudio reports."""
+        stream = self._stream
+        return None if stream is None else stream.latency
+
+    def stats(self) -> dict:
+        return dict(
+            underruns=self.underruns,
+            overruns=self.overruns,
+            prebuffer=self.prebuffer,
+            latency=self.latency,
+        )
+
+    def configure(
+        self,
+        device=None,
+        buffer_seconds: float | None = None,
+        idle_timeout: float | None = None,
+    ):
+        """Switch device and limits, an open stream moves to the new device."""
+        with self.condition:
+            self.device = device
+            if buffer_seconds is not None:
+                self.buffer_seconds = buffer_seconds
+            if idle_timeout is not None:
+                self.idle_timeout = idle_timeout
+        self._wakeup.set()
+
+    def warmup(self):
+        """Open the device in the background, so the first playback starts at once."""
+        self._warm = True
+        self._ensure_thread()
+        self._wakeup.set()
+
+    def playback(self, on_start: Callable[[], None] | None = None) -> Playback:
+        capacity = int(self.buffer_seconds * self.sample_rate) * self.frame_size
+        with self.condition:
+            playback = Playback(self, capacity, self.prebuffer, on_start)
+            self._queue.append(playback)
+        self._ensure_thread()
+        self._wakeup.set()
+        return playback
+
+    def _ensure_thread(self):
+        with self.condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(
+                    target=self._run, name="audio-output", daemon=True
+                )
+                self._thread.start()
+
+    def _open(self):
+        if self._stream is not None and self._stream_device != self.device:
+            self._close_stream()
+        if self._stream is None:
+            self._stream = sd.RawOutputStream(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype=f"int{self.sample_width * 8}",
+                device=self.device,
+                latency="low",
+                callback=self._callback,
+            )
+            self._stream_device = self.device
+            logger.info(
+                f"Audio output opened on {self.device}, "
+                f"latency {self._stream.latency * 1000:.0f} ms"
+            )
+        if not self._stream.active:
+            self._stream.start()
+
+    def _close_stream(self):
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except sd.PortAudioError as e:
+                logger.warning(f"Unable to close audio output: {e}")
+
+    def _adapt(self, playback: Playback):
+        """Learn the jitter buffer from how ``playback`` went."""
+        if playback.underruns:
+            self.prebuffer = min(self.prebuffer * 1.5, self.max_prebuffer)
+            logger.info(f"Audio underrun, jitter buffer now {self.prebuffer:.2f} s")
+        elif not playback.cancelled and playback.played:
+            self.prebuffer = max(self.prebuffer * 0.9, self.min_prebuffer)
+
+    def _fill(self, size: int) -> bytes:
+        """Up to ``size`` bytes of the queued playbacks, called with the lock."""
+        out = bytearray()
+        while len(out) < size and self._queue:
+            head = self._queue[0]
+            if head.cancelled or (head.finished and not head.ring.size):
+                self._queue.popleft()
+                self._adapt(head)
+                head._complete()
+                continue
+            if head.buffering:
+                if head.finished or head.ring.size >= head.target:
+                    head.buffering = False
+                else:
+                    break
+            data = head.ring.read(size - len(out))
+            if not data:
+                # Play silence until the jitter buffer is full again
+                head.buffering = True
+                head.underruns += 1
+                self.underruns += 1
+                break
+            if not head.played and head.on_start is not None:
+                head.on_start()
+            head.played += len(data)
+            head._wake()
+            out += data
+        if out:
+            self._last_active = time.monotonic()
+        # Producers may be waiting for space
+        self.condition.notify_all()
+        return bytes(out)
+
+    def _callback(self, outdata, frames: int, time_info, status):
+        size = frames * self.frame_size
+        with self.condition:
+            if status.output_underflow:
+                self.underruns += 1
+            data = self._fill(size)
+        outdata[: len(data)] = data
+        if len(data) < size:
+            outdata[len(data) :] = bytes(size - len(data))
+
+    def _fail(self, error: str):
+        with self.condition:
+            for playback in self._queue:
+                playback.error = error
+                playback.cancelled = True
+                playback.ring.clear()
+                playback._complete()
+            self._queue.clear()
+            self.condition.notify_all()
+
+    def _run(self):
+        while not self._closing:
+            with self.condition:
+                busy = bool(self._queue)
+                idle = time.monotonic() - self._last_active >= self.idle_timeout
+            moved = self._stream is not None and self._stream_device != self.device
+            try:
+                if busy or moved or self._warm:
+                    self._warm = False
+                    self._open()
+                elif idle and self._stream is not None and self._stream.active:
+                    # Keep the device open, a paused stream restarts quickly
+                    self._stream.stop()
+            except sd.PortAudioError as e:
+                logger.error(f"Audio output failed: {e}")
+                self._close_stream()
+                self._fail(str(e))
+            self._wakeup.wait(self.idle_timeout)
+            self._wakeup.clear()
+        self._close_stream()
+
+    def close(self):
+        with self.condition:
+            self._closing = True
+            for playback in self._queue:
+                playback.cancelled = True
+                playback._complete()
+            self._queue.clear()
+            self.condition.notify_all()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+
+# Plays TTS audio, which is always SAMPLE_RATE whatever the recording rate
+output_engine = OutputEngine()
+atexit.register(output_engine.close)
@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import itertools
+import threading
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import AsyncIterator, Callable, Iterator
+
+from fish.config import config
+
+
+class Priority(IntEnum):
+    """Request classes, lower values are served first."""
+
+    INTERACTIVE = 0
+    CHAT = 1
+    BULK = 2
+    # Guesses at what the user will ask for next
+    SPECULATIVE = 3
+
+
+@dataclass(eq=False)
+class Ticket:
+    priority: Priority
+    seq: int
+    # Called once when the ticket is granted or cancelled, from any thread
+    wake: Callable[[], None]
+    granted: bool = False
+    cancelled: bool = False
+    done: bool = False
+    _event: threading.Event = field(default_factory=threading.Event)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until granted, False if cancelled or timed out."""
+        self._event.wait(timeout)
+        return self.granted and not self.cancelled
+
+
+class RequestScheduler:
+    """Admits backend requests by priority class, shared by the whole process.
+
+    Each class has its own concurrency cap, and all classes together are
+    capped by ``max_concurrency``. Pending requests are admitted strictly by
+    priority: a bulk request is not started while an interactive or chat
+    request is still waiting, so background load cannot delay a click.
+    ``widen`` raises a class's cap for as long as a caller, e.g. a batch
+    run with a larger concurrency, needs it.
+    """
+
+    def __init__(self, limits: dict[Priority, int], max_concurrency: int):
+        self.limits = dict(limits)
+        self.max_concurrency = max_concurrency
+        self.running = {p: 0 for p in Priority}
+        # Caps requested through widen(), on top of the configured limits
+        self._widened: dict[Priority, list[int]] = {p: [] for p in Priority}
+        self._pending: list[Ticket] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def configure(self, limits: dict[Priority, int], max_concurrency: int):
+        with self._lock:
+            self.limits = dict(limits)
+            self.max_concurrency = max_concurrency
+            granted = self._dispatch()
+        self._wake(granted)
+
+    @property
+    def pending(self) -> dict[Priority, int]:
+        with self._lock:
+            counts = {p: 0 for p in Priority}
+            for ticket in self._pending:
+                counts[ticket.priority] += 1
+            return counts
+
+    def _limit(self, priority: Priority) -> int:
+        return max([self.limits.get(priority, 1), *self._widened[priority]])
+
+    def _max_concurrency(self) -> int:
+        # Widened classes bring their extra slots, the others keep their share
+        extra = sum(self._limit(p) - self.limits.get(p, 1) for p in Priority)
+        return self.max_concurrency + extra
+
+    def limit(self, priority: Priority) -> int:
+        """Requests of ``priority`` that may run at once, including widening."""
+        with self._lock:
+            return self._limit(Priority(priority))
+
+    def _dispatch(self) -> list[Ticket]:
+        granted = []
+        max_concurrency = self._max_concurrency()
+        for ticket in sorted(self._pending, key=lambda t: (t.priority, t.seq)):
+            if sum(self.running.values()) >= max_concurrency:
+                break
+            if self.running[ticket.priority] >= self._limit(ticket.priority):
+                # Lower classes must not overtake a waiting higher class
+                break
+            self._pending.remove(ticket)
+            self.running[ticket.priority] += 1
+            ticket.granted = True
+            granted.append(ticket)
+        return granted
+
+    @staticmethod
+    def _wake(tickets: list[Ticket]):
+        for ticket in tickets:
+            ticket._event.set()
+            ticket.wake()
+
+    def submit(
+        self, priority: Priority, wake: Callable[[], None] = lambda: None
+    ) -> Ticket:
+        """Queue a request, ``ticket.wait()`` blocks until it may start."""
+        ticket = Ticket(Priority(priority), next(self._seq), wake)
+        with self._lock:
+            self._pending.append(ticket)
+            granted = self._dispatch()
+        self._wake(granted)
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Finish a granted request or withdraw a pending one, idempotent."""
+        with self._lock:
+            if ticket.done:
+                return
+            ticket.done = True
+            if ticket.granted:
+                self.running[ticket.priority] -= 1
+            else:
+                self._pending.remove(ticket)
+            granted = self._dispatch()
+        self._wake(granted)
+
+    def cancel(self, ticket: Ticket):
+        """Withdraw ``ticket`` and wake up whoever is waiting on it."""
+        if ticket.done:
+            return
+        ticket.cancelled = True
+        self.release(ticket)
+        self._wake([ticket])
+
+    @contextlib.contextmanager
+    def widen(self, priority: Priority, limit: int) -> Iterator[None]:
+        """Let at least ``limit`` requests of ``priority`` run inside the block."""
+        priority = Priority(priority)
+        with self._lock:
+            self._widened[priority].append(limit)
+            granted = self._dispatch()
+        self._wake(granted)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._widened[priority].remove(limit)
+
+    @contextlib.contextmanager
+    def slot(self, priority: Priority) -> Iterator[Ticket]:
+        ticket = self.submit(priority)
+        try:
+            ticket.wait()
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, priority: Priority) -> AsyncIterator[Ticket]:
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(
+                lambda: granted.done() or granted.set_result(None)
+            )
+
+        ticket = self.submit(priority, wake)
+        try:
+            if not ticket.granted:
+                await granted
+            if ticket.cancelled:
+                raise asyncio.CancelledError
+            yield ticket
+        finally:
+            self.release(ticket)
+
+
+def scheduler_limits() -> dict[Priority, int]:
+    return {
+        Priority.INTERACTIVE: config.interactive_concurrency,
+        Priority.CHAT: config.chat_concurrency,
+        Priority.BULK: config.bulk_concurrency,
+        Priority.SPECULATIVE: config.speculative_concurrency,
+    }
+
+
+scheduler = RequestScheduler(scheduler_limits(), config.max_concurrency)
@@ -1,6 +1,49 @@
+from .cache import ResultCache, result_cache, speculative_cache
+from .client import TTSClient
+from .job import TTSJob
+from .metrics import MetricsLog, RequestMetrics, metrics_log
+from .pool import BackendPool, Endpoint, NoBackendError, parse_backends
+from .reference import (
+    ReferenceCache,
+    ReferenceEntry,
+    pack_tts_request,
+    reference_cache,
+)
 from .schema import *
+from .transport import (
+    PooledTransport,
+    RequestCancelled,
+    TransportResponse,
+    transport,
+)
+from .tuner import LatencyTuner, ProbeResult, TuningResult, TuningStore, tuning_store
 
 __all__ = [
     "ServeReferenceAudio",
     "ServeTTSRequest",
+    "PooledTransport",
+    "RequestCancelled",
+    "TransportResponse",
+    "transport",
+    "TTSClient",
+    "TTSJob",
+    "BackendPool",
+    "Endpoint",
+    "NoBackendError",
+    "parse_backends",
+    "ResultCache",
+    "result_cache",
+    "speculative_cache",
+    "MetricsLog",
+    "RequestMetrics",
+    "metrics_log",
+    "ReferenceCache",
+    "ReferenceEntry",
+    "pack_tts_request",
+    "reference_cache",
+    "LatencyTuner",
+    "ProbeResult",
+    "TuningResult",
+    "TuningStore",
+    "tuning_store",
 ]
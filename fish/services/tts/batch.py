@@ -0,0 +1,241 @@
+import csv
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path, PureWindowsPath
+from typing import Callable
+
+from fish.services.scheduler import Priority, scheduler
+
+from .client import TTSClient
+from .limiter import AdaptiveLimiter
+from .metrics import RequestMetrics
+from .transport import RequestCancelled
+
+
+@dataclass
+class BatchItem:
+    index: int
+    text: str
+    # File name relative to the output directory
+    output: str
+    # Per-row ServeTTSRequest overrides, e.g. temperature or chunk_length
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    item: BatchItem
+    path: Path
+    elapsed: float
+    nbytes: int = 0
+    error: str | None = None
+    metrics: RequestMetrics | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchStats:
+    total: int
+    done: int = 0
+    failed: int = 0
+    chars: int = 0
+    # Adaptive concurrency limit and recent chars/s, None with a fixed limit
+    limit: int | None = None
+    throughput: float | None = None
+    start_time: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    @property
+    def items_per_second(self) -> float:
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chars_per_second(self) -> float:
+        return self.chars / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def default_output_name(index: int, text: str, format: str) -> str:
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+    return f"{index:05d}_{digest}.{format}"
+
+
+def _output_name(name: str) -> str:
+    """Confine a batch file's output name to the output directory.
+
+    Relative subdirectories are kept, anything absolute or climbing out
+    with ``..`` is reduced to its file name.
+    """
+    # Windows rules take both separators and catch drive letters
+    path = PureWindowsPath(name)
+    if path.anchor or ".." in path.parts:
+        path = PureWindowsPath(path.name)
+    return "" if path.name in ("", "..") else path.as_posix()
+
+
+def _make_item(index: int, row: dict, format: str) -> BatchItem | None:
+    text = str(row.get("text") or "").strip()
+    if not text:
+        return None
+    params = {
+        k: v
+        for k, v in row.items()
+        if k not in ("text", "output") and v not in (None, "")
+    }
+    item_format = params.get("format", format)
+    output = _output_name(str(row.get("output") or ""))
+    if not output:
+        output = default_output_name(index, text, item_format)
+    if not Path(output).suffix:
+        output = f"{output}.{item_format}"
+    return BatchItem(index=index, text=text, output=output, params=params)
+
+
+def load_batch_items(path: str | Path, format: str = "wav") -> list[BatchItem]:
+    """Load prompts from a text (one per line), CSV or JSONL file.
+
+    CSV and JSONL rows need a ``text`` column and may carry an ``output``
+    file name plus any ``ServeTTSRequest`` field as per-row parameters.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    with open(path, "r", encoding="utf-8") as f:
+        if suffix == ".csv":
+            rows = list(csv.DictReader(f))
+        elif suffix in (".jsonl", ".ndjson"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = [{"text": line} for line in f]
+
+    items = []
+    for row in rows:
+        item = _make_item(len(items), row, format)
+        if item is not None:
+            items.append(item)
+    return items
+
+
+class BatchRunner:
+    """Synthesize batch items with a bounded number of concurrent requests.
+
+    Requests are scheduled as ``priority``, bulk by default, so interactive
+    synthesis started meanwhile goes first. With ``adaptive``, concurrency
+    is tuned by an ``AdaptiveLimiter`` up to ``concurrency``.
+    """
+
+    def __init__(
+        self,
+        client: TTSClient,
+        items: list[BatchItem],
+        output_dir: str | Path,
+        concurrency: int = 4,
+        on_result: Callable[[BatchResult, BatchStats], None] | None = None,
+        priority: Priority = Priority.BULK,
+        adaptive: bool = False,
+    ):
+        self.client = client
+        self.items = items
+        self.output_dir = Path(output_dir)
+        self.concurrency = max(1, concurrency)
+        self.on_result = on_result
+        self.priority = priority
+        self.limiter = AdaptiveLimiter(max_limit=self.concurrency) if adaptive else None
+        self.stats = BatchStats(total=len(items))
+        self._stop_event = threading.Event()
+
+    def _synthesize(self, item: BatchItem) -> BatchResult:
+        path = self.output_dir / item.output
+        start = time.monotonic()
+        if self._stop_event.is_set():
+            return BatchResult(item, path, 0.0, error="stopped")
+        # Before taking a limiter slot, which a failure here would leak
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            return BatchResult(item, path, 0.0, error=str(e))
+        if self.limiter is not None and not self.limiter.acquire():
+            return BatchResult(item, path, 0.0, error="stopped")
+
+        metrics = RequestMetrics(backend=self.client.backend, text_chars=len(item.text))
+        error = None
+        cancelled = False
+        try:
+            nbytes = self.client.synthesize(
+                item.text, path, priority=self.priority, metrics=metrics, **item.params
+            )
+        except RequestCancelled:
+            cancelled = True
+            return BatchResult(item, path, time.monotonic() - start, error="stopped")
+        except Exception as e:
+            error = e
+            return BatchResult(item, path, time.monotonic() - start, error=str(e))
+        finally:
+            if self.limiter is None:
+                pass
+            elif cancelled or self._stop_event.is_set():
+                # A cut short request says nothing about the backend
+                self.limiter.record(None, len(item.text))
+            else:
+                self._record(metrics, len(item.text), error)
+        return BatchResult(
+            item, path, time.monotonic() - start, nbytes=nbytes, metrics=metrics
+        )
+
+    def _record(self, metrics: RequestMetrics, chars: int, error: Exception | None):
+        # Measured from before the scheduler slot was requested, so queueing
+        # behind other requests counts as back-pressure
+        if metrics.cache_hit or metrics.elapsed("build") is None:
+            self.limiter.record(None, chars)
+            return
+        end = metrics.elapsed("last_byte")
+        if end is None:
+            end = time.perf_counter() - metrics.start
+        self.limiter.record(end, chars, error)
+
+    def run(self) -> list[BatchResult]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # The scheduler's bulk cap would otherwise override ``concurrency``
+        with scheduler.widen(self.priority, self.concurrency):
+            if self.limiter is not None:
+                self.limiter.max_limit = min(
+                    self.concurrency, scheduler.limit(self.priority)
+                )
+            return self._run()
+
+    def _run(self) -> list[BatchResult]:
+        self.stats = BatchStats(total=len(self.items))
+        results = []
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._synthesize, item) for item in self.items]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result.ok:
+                    self.stats.done += 1
+                    self.stats.chars += len(result.item.text)
+                else:
+                    self.stats.failed += 1
+                if self.limiter is not None:
+                    self.stats.limit = self.limiter.current
+                    self.stats.throughput = self.limiter.throughput
+                if self.on_result is not None:
+                    self.on_result(result, self.stats)
+
+        return sorted(results, key=lambda r: r.item.index)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.limiter is not None:
+            self.limiter.close()
+        self.client.cancel()
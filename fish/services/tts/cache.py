@@ -0,0 +1,135 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from fish.config import config
+
+
+class ResultCache:
+    """On-disk cache of synthesized audio, keyed by a hash of the request.
+
+    ``index.json`` records every entry in least-recently-used order and the
+    oldest entries are evicted once the total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int):
+        self.root = Path(root)
+        self.index_path = self.root / "index.json"
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load_index()
+        atexit.register(self.flush)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, entry in sorted(entries.items(), key=lambda kv: kv[1]["atime"]):
+            if (self.root / entry["file"]).exists():
+                self._entries[key] = entry
+                self.total_bytes += entry["size"]
+
+    def _save_index(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def get(self, key: str) -> Path | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            path = self.root / entry["file"]
+            if not path.exists():
+                self.total_bytes -= self._entries.pop(key)["size"]
+                self._dirty = True
+                return None
+            entry["atime"] = time.time()
+            self._entries.move_to_end(key)
+            self._dirty = True
+            return path
+
+    def _path(self, key: str, suffix: str) -> tuple[str, Path]:
+        name = f"{key[:2]}/{key}{suffix}"
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return name, path
+
+    def put(self, key: str, source: str | Path) -> Path:
+        """Copy the finished audio file ``source`` into the cache."""
+        source = Path(source)
+        name, path = self._path(key, source.suffix)
+        shutil.copyfile(source, path)
+        self._add(key, name, path)
+        return path
+
+    def put_bytes(self, key: str, data: bytes, suffix: str) -> Path:
+        name, path = self._path(key, suffix)
+        path.write_bytes(data)
+        self._add(key, name, path)
+        return path
+
+    def _add(self, key: str, name: str, path: Path):
+        size = path.stat().st_size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old["size"]
+            self._entries[key] = {"file": name, "size": size, "atime": time.time()}
+            self.total_bytes += size
+            self._evict()
+            self._save_index()
+
+    def delete(self, key: str):
+        """Remove ``key`` and its file, if cached."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            self.total_bytes -= entry["size"]
+            (self.root / entry["file"]).unlink(missing_ok=True)
+            self._save_index()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            (self.root / entry["file"]).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                (self.root / entry["file"]).unlink(missing_ok=True)
+            self._entries.clear()
+            self.total_bytes = 0
+            self._save_index()
+
+
+result_cache = ResultCache(
+    Path.home() / ".fish" / "cache" / "results",
+    max_bytes=config.result_cache_size * 1024 * 1024,
+)
+
+# Results synthesized ahead of time, kept apart so they never evict real ones
+speculative_cache = ResultCache(
+    Path.home() / ".fish" / "cache" / "speculative",
+    max_bytes=config.speculative_cache_size * 1024 * 1024,
+)
@@ -0,0 +1,290 @@
+import functools
+import hashlib
+import logging
+import shutil
+import threading
+import weakref
+from pathlib import Path
+
+import httpx
+
+from fish.config import config
+from fish.services.scheduler import Priority, Ticket, scheduler
+
+from .cache import result_cache
+from .metrics import RequestMetrics, trace_hook
+from .pool import BackendPool, NoBackendError
+from .reference import ReferenceEntry, pack_tts_request, reference_cache
+from .schema import ServeTTSRequest
+from .transport import RequestCancelled, TransportResponse, transport
+
+logger = logging.getLogger(__name__)
+
+
+class TTSClient:
+    """Builds ``ServeTTSRequest`` payloads and posts them to a backend.
+
+    ``backend`` may list several comma separated replicas, requests are then
+    routed and failed over by a ``BackendPool``. Every request first waits
+    for a slot of its ``priority`` class from the shared scheduler.
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        api_key: str,
+        ref_files: list[str] = (),
+        ref_id: str | None = None,
+        use_cache: bool | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        **params,
+    ):
+        self.backend = backend
+        self.api_key = api_key
+        self.ref_files = list(ref_files)
+        self.ref_id = ref_id if ref_id else None
+        # Disable to always draw fresh samples from the backend
+        self.use_cache = config.result_cache if use_cache is None else use_cache
+        self.params = params
+        self.priority = priority
+        self._tickets: list[Ticket] = []
+        self._responses = weakref.WeakSet()
+        self._lock = threading.Lock()
+        # Set by cancel(), later requests of this client fail at once
+        self._cancelled = threading.Event()
+
+    @functools.cached_property
+    def pool(self) -> BackendPool:
+        # Built on first use, so a bad backend fails the request like any
+        # other network error instead of the caller constructing the client
+        return BackendPool(self.backend)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {"content-type": "application/msgpack"}
+        # httpx rejects the trailing whitespace of an empty "Bearer " value
+        if self.api_key:
+            headers["authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def references(self) -> list[ReferenceEntry]:
+        pre_files = [f for f in self.ref_files if not f.endswith(".lab")]
+        # The duration budget is shared by all references of a request
+        budget = config.reference_budget / len(pre_files) if pre_files else 0
+        entries = [reference_cache.get(f, budget) for f in pre_files]
+        return [entry for entry in entries if entry is not None]
+
+    def build_request(
+        self, text: str, streaming: bool = False, **overrides
+    ) -> ServeTTSRequest:
+        # References are spliced in pre-packed by pack()
+        params = {**self.params, **overrides}
+        fields = {
+            k: v
+            for k, v in params.items()
+            if k in ServeTTSRequest.model_fields and v is not None
+        }
+        fields.pop("references", None)
+        return ServeTTSRequest(
+            **{
+                **fields,
+                "text": text,
+                "reference_id": self.ref_id,
+                "streaming": streaming,
+            }
+        )
+
+    def pack(self, request: ServeTTSRequest) -> bytes:
+        return pack_tts_request(request, self.references())
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise RequestCancelled("Request cancelled")
+
+    def _send(self, data: bytes, extensions: dict, tried: set) -> TransportResponse:
+        self._check_cancelled()
+        endpoint = self.pool.acquire(exclude=tried)
+        if endpoint is None:
+            raise NoBackendError("Every backend replica was tried")
+        tried.add(endpoint.url)
+        response = transport.send(
+            "POST",
+            endpoint.url,
+            content=data,
+            headers=self.headers,
+            extensions=extensions,
+        )
+        self.pool.track(endpoint, response)
+        with self._lock:
+            self._responses.add(response)
+        # cancel() may have run between the check above and registering
+        if self._cancelled.is_set():
+            response.cancel()
+        return response
+
+    def _hedge(
+        self,
+        primary: TransportResponse,
+        data: bytes,
+        tried: set,
+        metrics: RequestMetrics | None,
+    ) -> TransportResponse:
+        """Race another replica against ``primary`` if it is slow to answer."""
+        endpoint = self.pool.endpoint(primary.url)
+        delay = self.pool.hedge_delay(
+            endpoint, config.hedge_percentile, config.hedge_min_delay
+        )
+        answered = threading.Event()
+        primary.notify(answered)
+        if delay is None or len(tried) >= len(self.pool) or answered.wait(delay):
+            self.pool.count_request()
+            return primary
+
+        backup = self._send(data, {}, tried)
+        backup.notify(answered)
+        racers = [primary, backup]
+        while True:
+            answered.clear()
+            done = [r for r in racers if r.answered]
+            good = [
+                r for r in done if not (r.cancelled or r.error or r.status_code >= 500)
+            ]
+            if good or len(done) == len(racers):
+                break
+            answered.wait()
+
+        # Both may have answered by now, keep the one that did so first
+        winner = min(good, key=lambda r: r.started + r.answer_latency, default=primary)
+        for response in racers:
+            if response is not winner:
+                response.cancel()
+        won = winner is backup
+        self.pool.count_request(hedged=True, won=won)
+        if metrics is not None:
+            metrics.hedged, metrics.hedge_won = True, won
+        logger.info(
+            f"Hedged {primary.url} after {delay * 1000:.0f} ms with {backup.url}, "
+            f"{'backup' if won else 'primary'} won"
+        )
+        return winner
+
+    def _acquire(self, priority: Priority) -> Ticket:
+        self._check_cancelled()
+        ticket = scheduler.submit(priority)
+        with self._lock:
+            self._tickets.append(ticket)
+        if self._cancelled.is_set():
+            scheduler.cancel(ticket)
+        try:
+            if not ticket.wait():
+                raise RequestCancelled("Request cancelled")
+        finally:
+            with self._lock:
+                self._tickets.remove(ticket)
+        return ticket
+
+    def post(
+        self,
+        request: ServeTTSRequest,
+        metrics: RequestMetrics | None = None,
+        priority: Priority | None = None,
+    ) -> TransportResponse:
+        """Send ``request`` once the scheduler admits it.
+
+        The slot is held until the response has been fully received.
+        """
+        ticket = self._acquire(self.priority if priority is None else priority)
+        try:
+            response = self._post(request, metrics)
+        except BaseException:
+            scheduler.release(ticket)
+            raise
+        response._future.add_done_callback(lambda _: scheduler.release(ticket))
+        return response
+
+    def _post(
+        self, request: ServeTTSRequest, metrics: RequestMetrics | None
+    ) -> TransportResponse:
+        extensions = {}
+        data = self.pack(request)
+        self._check_cancelled()
+        if metrics is not None:
+            metrics.mark("build")
+            extensions["trace"] = trace_hook(metrics)
+
+        tried = set()
+        while True:
+            # _send checks for cancellation before every attempt
+            response = self._send(data, extensions, tried)
+            if config.hedge and len(tried) == 1:
+                response = self._hedge(response, data, tried, metrics)
+            if metrics is not None:
+                metrics.backend = response.url
+
+            # Nothing has been handed to the caller yet, so failing over to
+            # another replica is safe
+            can_retry = len(tried) < len(self.pool)
+            try:
+                response.wait(stream=request.streaming)
+            except httpx.TransportError as e:
+                if can_retry:
+                    logger.warning(f"{response.url} failed ({e!r}), trying another")
+                    continue
+                raise
+            if response.status_code >= 500 and can_retry:
+                logger.warning(f"{response.url} returned {response}, trying another")
+                response.close()
+                continue
+            response.raise_for_status()
+            return response
+
+    def cancel(self):
+        """Abort every request of this client, including ones not yet sent.
+
+        Cancelling is final, later requests of this client fail at once.
+        """
+        self._cancelled.set()
+        with self._lock:
+            tickets = list(self._tickets)
+            responses = list(self._responses)
+        for ticket in tickets:
+            scheduler.cancel(ticket)
+        for response in responses:
+            response.cancel()
+
+    def cache_key(self, request: ServeTTSRequest, salt: str = "") -> str:
+        """Hash everything that determines the synthesized audio."""
+        # Streaming only changes how the audio is delivered
+        request = request.model_copy(update={"streaming": False})
+        h = hashlib.sha256(salt.encode("utf-8"))
+        h.update(pack_tts_request(request, []))
+        for ref in self.references():
+            h.update(ref.digest)
+        return h.hexdigest()
+
+    def synthesize(
+        self,
+        text: str,
+        output_path: str | Path,
+        priority: Priority | None = None,
+        metrics: RequestMetrics | None = None,
+        **overrides,
+    ) -> int:
+        """Synthesize ``text`` in one request and write it to ``output_path``."""
+        request = self.build_request(text, **overrides)
+        key = self.cache_key(request) if self.use_cache else None
+        cached = result_cache.get(key) if key else None
+        if cached is not None:
+            if metrics is not None:
+                metrics.cache_hit = True
+            shutil.copyfile(cached, output_path)
+            return cached.stat().st_size
+
+        with self.post(request, metrics=metrics, priority=priority) as response:
+            Path(output_path).write_bytes(response.content)
+        if metrics is not None:
+            metrics.bytes_received = len(response.content)
+            metrics.mark("last_byte")
+        if key:
+            result_cache.put(key, output_path)
+        return len(response.content)
@@ -0,0 +1,133 @@
+import logging
+import shutil
+from pathlib import Path
+from typing import Iterator
+
+import soundfile as sf
+
+from .cache import result_cache, speculative_cache
+from .client import TTSClient
+from .metrics import RequestMetrics, metrics_log
+from .schema import ServeTTSRequest
+from .transport import TransportResponse
+
+logger = logging.getLogger(__name__)
+
+
+class TTSJob:
+    """One text synthesized into one output, shared by the GUI and the CLI.
+
+    It covers the request, the result cache and the latency metrics, while
+    the caller decides what to do with the audio chunks. ``salt`` and
+    ``overrides`` describe how the output is produced if that differs from
+    a single request with the client's parameters.
+    """
+
+    def __init__(
+        self,
+        client: TTSClient,
+        text: str,
+        output_path: str | Path | None = None,
+        streaming: bool = False,
+        salt: str = "",
+        **overrides,
+    ):
+        self.client = client
+        self.text = text
+        self.output_path = None if output_path is None else Path(output_path)
+        self.streaming = streaming
+        self.salt = salt
+        self.overrides = overrides
+        self.metrics: RequestMetrics | None = None
+        self.response: TransportResponse | None = None
+        self.cache_hit = False
+
+    def build_request(self) -> ServeTTSRequest:
+        return self.client.build_request(
+            self.text, streaming=self.streaming, **self.overrides
+        )
+
+    def request_key(self) -> str:
+        return self.client.cache_key(self.build_request(), salt=self.salt)
+
+    def cache_key(self) -> str | None:
+        return self.request_key() if self.client.use_cache else None
+
+    def load_cached(self) -> Path | None:
+        """Find a finished result and copy it to the output path, if any.
+
+        A result synthesized speculatively is handed out once, so a repeated
+        request draws a fresh sample unless the result cache is enabled.
+        """
+        key = self.cache_key()
+        cached = result_cache.get(key) if key else None
+        if cached is None and self.output_path is not None:
+            # Synthesized in the background while the text was being edited
+            speculative_key = self.request_key()
+            speculative = speculative_cache.get(speculative_key)
+            if speculative is not None:
+                shutil.copyfile(speculative, self.output_path)
+                speculative_cache.delete(speculative_key)
+                cached = self.output_path
+        if cached is None:
+            return None
+        if self.output_path is not None and cached != self.output_path:
+            shutil.copyfile(cached, self.output_path)
+        self.cache_hit = True
+        if self.metrics is not None:
+            self.metrics.cache_hit = True
+        logger.info(f"Result cache hit: {cached}")
+        return cached
+
+    def store_cached(self, data: bytes | None = None):
+        """Cache the finished output file, or ``data`` if there is none."""
+        key = self.cache_key()
+        if not key:
+            return
+        if data is not None:
+            result_cache.put_bytes(key, data, f".{self.build_request().format}")
+        elif self.output_path is not None:
+            result_cache.put(key, self.output_path)
+
+    def new_metrics(self) -> RequestMetrics:
+        self.metrics = RequestMetrics(
+            backend=self.client.backend,
+            text_chars=len(self.text),
+            streaming=self.streaming,
+        )
+        return self.metrics
+
+    def chunks(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        """Send the request and yield the response body as it arrives."""
+        self.response = self.client.post(self.build_request(), self.metrics)
+        with self.response:
+            yield from self.response.iter_content(chunk_size=chunk_size)
+
+    def finish_metrics(self) -> RequestMetrics | None:
+        """Complete the metrics of a finished job and append them to the log."""
+        metrics = self.metrics
+        if metrics is None:
+            return None
+        metrics.cache_hit = self.cache_hit
+        metrics.mark("total")
+        if not metrics.samples and self.output_path is not None:
+            # Only streamed PCM is counted while playing
+            try:
+                info = sf.info(self.output_path)
+                metrics.samples, metrics.sample_rate = info.frames, info.samplerate
+            except RuntimeError as e:
+                logger.warning(f"Unable to read audio length: {e}")
+        logger.info(f"TTS latency breakdown:\n{metrics.summary()}")
+        try:
+            metrics_log.append(metrics)
+        except OSError as e:
+            logger.warning(f"Unable to write metrics log: {e}")
+        return metrics
+
+    def cancel(self):
+        """Abort the request, a blocked read of ``chunks()`` returns at once."""
+        self.client.cancel()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
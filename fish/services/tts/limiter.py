@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+
+import httpx
+
+# Responses that mean the backend is overloaded rather than the request bad
+OVERLOAD_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_overload(error: BaseException | None) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in OVERLOAD_STATUS
+    return isinstance(error, httpx.TimeoutException)
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for bulk requests.
+
+    The limit grows by one after a limit's worth of healthy requests and is
+    cut by ``backoff`` on 429, 5xx or timeouts, or when the smoothed latency
+    per character rises above ``tolerance`` times the best seen so far.
+    Decreases are spaced by one request latency so a burst of failures from
+    the same overload only counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        tolerance: float = 1.5,
+        backoff: float = 0.7,
+        window: float = 30.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.window = window
+        self.in_flight = 0
+        # Seconds per character, best seen and exponentially smoothed
+        self.baseline: float | None = None
+        self.smoothed: float | None = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        # (time, characters) of recent successful requests
+        self._completed: deque[tuple[float, int]] = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    @property
+    def throughput(self) -> float:
+        """Characters synthesized per second over the last ``window`` seconds."""
+        with self._cond:
+            self._trim(time.monotonic())
+            if not self._completed:
+                return 0.0
+            span = max(time.monotonic() - self._completed[0][0], 1.0)
+            return sum(chars for _, chars in self._completed) / span
+
+    def _trim(self, now: float):
+        while self._completed and now - self._completed[0][0] > self.window:
+            self._completed.popleft()
+
+    def acquire(self) -> bool:
+        """Block until below the limit, False once the limiter is closed."""
+        with self._cond:
+            while not self._closed and self.in_flight >= self.current:
+                self._cond.wait()
+            if self._closed:
+                return False
+            self.in_flight += 1
+            return True
+
+    def _decrease(self, now: float, latency: float):
+        if now - self._last_decrease < latency:
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+    def record(
+        self,
+        latency: float | None,
+        chars: int,
+        error: BaseException | None = None,
+    ):
+        """Release a slot taken by ``acquire`` and adapt the limit.
+
+        A ``latency`` of None, e.g. for a cache hit, only releases the slot.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            if latency is None:
+                pass
+            elif is_overload(error):
+                self._decrease(now, latency)
+            elif error is None:
+                self._completed.append((now, chars))
+                self._trim(now)
+                cost = latency / max(chars, 1)
+                if self.baseline is None or cost < self.baseline:
+                    self.baseline = cost
+                else:
+                    # Let the baseline follow slowly if the texts get harder
+                    self.baseline += 0.01 * (cost - self.baseline)
+                if self.smoothed is None:
+                    self.smoothed = cost
+                else:
+                    self.smoothed += 0.2 * (cost - self.smoothed)
+
+                if self.smoothed > self.tolerance * self.baseline:
+                    self._decrease(now, latency)
+                else:
+                    self._successes += 1
+                    if self._successes >= self.current:
+                        self._successes = 0
+                        self.limit = min(self.max_limit, self.limit + 1)
+            self._cond.notify_all()
+
+    def close(self):
+        """Wake up every waiting ``acquire``, which then returns False."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,294 @@
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import soundfile as sf
+
+from .batch import BatchItem, BatchResult, BatchRunner, BatchStats
+from .client import TTSClient
+from .preprocess import resample
+from .segment import split_sentences
+
+MANIFEST_VERSION = 1
+
+NUMBER_WORD = (
+    r"(?:(?:twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety)"
+    r"(?:-(?:one|two|three|four|five|six|seven|eight|nine))?"
+    r"|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve"
+    r"|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|hundred)"
+)
+ROMAN_NUMERAL = (
+    r"(?=[mdclxvi])m{0,3}(?:cm|cd|d?c{0,3})(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})"
+)
+# Markdown headings, "Chapter 12", "Part IV: ...", "第十二章 ..." and the like.
+# Chapter, part and book need a number, and a title after it without a
+# separator must not read like a sentence, so "Part of me ..." stays text.
+CHAPTER_HEADING = re.compile(
+    r"^(#{1,3}\s+\S.*"
+    rf"|(?:chapter|part|book)\s+(?:\d+|{ROMAN_NUMERAL}|{NUMBER_WORD})"
+    r"(?:[.:]?|\s*[.:\-–—]\s*\S.*|\s+(?!.*[.!?。！？]$)\S.*)"
+    r"|(?:prologue|epilogue)(?:\s*[:\-–—]\s*\S.*)?"
+    r"|第[0-9零〇一二三四五六七八九十百千两]+[章回节卷部篇].*"
+    r"|序章.*|尾声.*)$",
+    re.IGNORECASE,
+)
+MAX_HEADING_CHARS = 80
+
+
+@dataclass
+class Segment:
+    chapter: int
+    paragraph: int
+    text: str
+    # Hash of the request, also the name of the segment's audio file
+    key: str = ""
+    done: bool = False
+    duration: float = 0.0
+
+
+@dataclass
+class Chapter:
+    title: str
+    paragraphs: list[str] = field(default_factory=list)
+
+
+def split_chapters(text: str, default_title: str = "Chapter 1") -> list[Chapter]:
+    """Split a document into chapters at heading lines, then into paragraphs."""
+    chapters: list[Chapter] = []
+    paragraph: list[str] = []
+
+    def end_paragraph():
+        if paragraph:
+            if not chapters:
+                chapters.append(Chapter(default_title))
+            chapters[-1].paragraphs.append(" ".join(paragraph))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            end_paragraph()
+        elif len(line) <= MAX_HEADING_CHARS and CHAPTER_HEADING.match(line):
+            end_paragraph()
+            title = line.lstrip("#").strip()
+            # The title is read out as the first paragraph of the chapter
+            chapters.append(Chapter(title, [title]))
+        else:
+            paragraph.append(line)
+    end_paragraph()
+    return [chapter for chapter in chapters if chapter.paragraphs]
+
+
+def _slug(title: str) -> str:
+    slug = re.sub(r'[\\/:*?"<>|\s]+', "_", title).strip("_.")
+    return slug[:40] or "chapter"
+
+
+class LongFormRenderer:
+    """Render a long document into chapter audio files, resumably.
+
+    The document is split into chapters, paragraphs and sentences, and
+    every sentence is synthesized into ``segments/<key>.wav`` where the key
+    hashes the request. ``manifest.json`` tracks which segments are done,
+    so a rerun only synthesizes what is missing, and an edited document
+    reuses the audio of every sentence that did not change. Finished
+    chapters are written to ``chapters/`` with timestamps in ``index.json``.
+    """
+
+    def __init__(
+        self,
+        client: TTSClient,
+        text: str,
+        project_dir: str | Path,
+        max_chars: int = 150,
+        concurrency: int = 4,
+        adaptive: bool = False,
+        sentence_pause: float = 0.15,
+        paragraph_pause: float = 0.6,
+        chapter_format: str = "wav",
+        on_result: Callable[[BatchResult, BatchStats], None] | None = None,
+    ):
+        self.client = client
+        self.text = text
+        self.root = Path(project_dir)
+        self.max_chars = max_chars
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.sentence_pause = sentence_pause
+        self.paragraph_pause = paragraph_pause
+        self.chapter_format = chapter_format
+        self.on_result = on_result
+        self.manifest_path = self.root / "manifest.json"
+        self.chapters: list[Chapter] = []
+        self.segments: list[Segment] = []
+        self.runner: BatchRunner | None = None
+        self._stopped = False
+
+    def segment_path(self, segment: Segment) -> Path:
+        return self.root / "segments" / f"{segment.key}.wav"
+
+    def plan(self) -> list[Segment]:
+        """Segment the document and mark what earlier runs already rendered."""
+        self.chapters = split_chapters(self.text, default_title=self.root.name)
+        self.segments = []
+        for c, chapter in enumerate(self.chapters):
+            for p, paragraph in enumerate(chapter.paragraphs):
+                for sentence in split_sentences(paragraph, self.max_chars):
+                    request = self.client.build_request(sentence, format="wav")
+                    key = self.client.cache_key(request, salt="longform")
+                    self.segments.append(Segment(c, p, sentence, key))
+
+        durations = {}
+        for segment in self._load_manifest():
+            if segment.done and self.segment_path(segment).exists():
+                durations[segment.key] = segment.duration
+        for segment in self.segments:
+            if segment.key in durations:
+                segment.done, segment.duration = True, durations[segment.key]
+        self._save_manifest()
+        return self.segments
+
+    def _load_manifest(self) -> list[Segment]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if manifest.get("version") != MANIFEST_VERSION:
+            return []
+        return [Segment(**segment) for segment in manifest["segments"]]
+
+    def _save_manifest(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "chapters": [chapter.title for chapter in self.chapters],
+            "segments": [asdict(segment) for segment in self.segments],
+        }
+        # Replace atomically so a crash never leaves a truncated manifest
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    @property
+    def pending(self) -> list[Segment]:
+        return [segment for segment in self.segments if not segment.done]
+
+    def _on_result(self, result: BatchResult, stats: BatchStats):
+        if result.ok:
+            duration = sf.info(result.path).duration
+            for segment in self.segments:
+                if segment.key == result.path.stem:
+                    segment.done, segment.duration = True, duration
+            self._save_manifest()
+        if self.on_result is not None:
+            self.on_result(result, stats)
+
+    def run(self) -> bool:
+        """Synthesize missing segments, then write chapters if all are done."""
+        if not self.segments:
+            self.plan()
+        (self.root / "segments").mkdir(parents=True, exist_ok=True)
+
+        # Repeated sentences share one file
+        keys = list(dict.fromkeys(segment.key for segment in self.pending))
+        texts = {segment.key: segment.text for segment in self.pending}
+        items = [
+            BatchItem(i, texts[key], f"segments/{key}.wav", {"format": "wav"})
+            for i, key in enumerate(keys)
+        ]
+        self.runner = BatchRunner(
+            self.client,
+            items,
+            self.root,
+            concurrency=self.concurrency,
+            on_result=self._on_result,
+            adaptive=self.adaptive,
+        )
+        if items and not self._stopped:
+            self.runner.run()
+
+        if self.pending or self._stopped:
+            return False
+        self.write_chapters()
+        return True
+
+    def stop(self):
+        self._stopped = True
+        if self.runner is not None:
+            self.runner.stop()
+
+    def _read_segment(self, segment: Segment, sample_rate: int) -> np.ndarray:
+        audio, sr = sf.read(self.segment_path(segment), dtype="float32", always_2d=True)
+        return resample(audio.mean(axis=1), sr, sample_rate).astype(np.float32)
+
+    def write_chapters(self) -> list[dict]:
+        """Concatenate segments into chapter files and write ``index.json``."""
+        if not self.segments:
+            return []
+        chapter_dir = self.root / "chapters"
+        chapter_dir.mkdir(parents=True, exist_ok=True)
+        sample_rate = sf.info(self.segment_path(self.segments[0])).samplerate
+
+        index, book_time = [], 0.0
+        for c, chapter in enumerate(self.chapters):
+            segments = [s for s in self.segments if s.chapter == c]
+            path = (
+                chapter_dir
+                / f"{c + 1:03d}_{_slug(chapter.title)}.{self.chapter_format}"
+            )
+            entries, position, previous = [], 0, None
+            with sf.SoundFile(
+                path, "w", samplerate=sample_rate, channels=1, subtype="PCM_16"
+            ) as f:
+                for segment in segments:
+                    if previous is not None:
+                        pause = (
+                            self.paragraph_pause
+                            if segment.paragraph != previous.paragraph
+                            else self.sentence_pause
+                        )
+                        silence = np.zeros(int(pause * sample_rate), dtype=np.float32)
+                        f.write(silence)
+                        position += len(silence)
+                    audio = self._read_segment(segment, sample_rate)
+                    f.write(np.clip(audio, -1.0, 1.0))
+                    entries.append(
+                        {
+                            "start": round(position / sample_rate, 3),
+                            "end": round((position + len(audio)) / sample_rate, 3),
+                            "paragraph": segment.paragraph,
+                            "text": segment.text,
+                        }
+                    )
+                    position += len(audio)
+                    previous = segment
+
+            duration = position / sample_rate
+            index.append(
+                {
+                    "title": chapter.title,
+                    "file": str(path.relative_to(self.root)),
+                    "start": round(book_time, 3),
+                    "duration": round(duration, 3),
+                    "segments": entries,
+                }
+            )
+            book_time += duration
+
+        with open(self.root / "index.json", "w", encoding="utf-8") as f:
+            json.dump({"chapters": index}, f, ensure_ascii=False, indent=1)
+        self._prune()
+        return index
+
+    def _prune(self):
+        """Delete audio of sentences that are no longer in the document."""
+        keep = {f"{segment.key}.wav" for segment in self.segments}
+        for path in (self.root / "segments").glob("*.wav"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
@@ -0,0 +1,170 @@
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fish.config import config
+
+# Phases in the order they happen, all measured from the start of the request
+PHASES = (
+    "build",  # request built and serialized
+    "connect",  # new connection ready, including TLS; unset when reused
+    "upload",  # request body fully sent
+    "ttfb",  # first response body byte
+    "first_audio",  # first PCM handed to the audio device
+    "last_byte",  # response fully received
+    "total",  # output file closed
+)
+
+
+@dataclass
+class RequestMetrics:
+    backend: str = ""
+    text_chars: int = 0
+    streaming: bool = False
+    cache_hit: bool = False
+    # A duplicate was sent to another replica, and whether it answered first
+    hedged: bool = False
+    hedge_won: bool = False
+    sample_rate: int = 44100
+    # Seconds between handing PCM to the output stream and hearing it
+    output_latency: float | None = None
+    # Jitter buffer in seconds, and how often playback ran dry or was full
+    prebuffer: float | None = None
+    underruns: int = 0
+    overruns: int = 0
+    samples: int = 0
+    bytes_received: int = 0
+    start: float = field(default_factory=time.perf_counter)
+    marks: dict[str, float] = field(default_factory=dict)
+
+    def mark(self, phase: str, overwrite: bool = False):
+        """Record ``phase`` on a monotonic clock, only once unless overwritten."""
+        if overwrite or phase not in self.marks:
+            self.marks[phase] = time.perf_counter() - self.start
+
+    def elapsed(self, phase: str) -> float | None:
+        return self.marks.get(phase)
+
+    def receive(self, size: int) -> float | None:
+        """Count ``size`` body bytes, the time to first byte on the first call."""
+        self.bytes_received += size
+        if "ttfb" in self.marks:
+            return None
+        self.mark("ttfb")
+        return self.marks["ttfb"]
+
+    @property
+    def audio_duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    @property
+    def rtf(self) -> float | None:
+        """Real-time factor: generation time per second of audio produced."""
+        total = self.marks.get("last_byte", self.marks.get("total"))
+        if total is None or self.samples == 0:
+            return None
+        return total / self.audio_duration
+
+    def to_dict(self) -> dict:
+        result = {
+            "timestamp": time.time(),
+            "backend": self.backend,
+            "text_chars": self.text_chars,
+            "streaming": self.streaming,
+            "cache_hit": self.cache_hit,
+            "hedged": self.hedged,
+            "hedge_won": self.hedge_won,
+            "bytes_received": self.bytes_received,
+            "audio_seconds": round(self.audio_duration, 3),
+            "rtf": None if self.rtf is None else round(self.rtf, 3),
+            "output_latency_ms": (
+                None
+                if self.output_latency is None
+                else round(self.output_latency * 1000, 1)
+            ),
+            "prebuffer_ms": (
+                None if self.prebuffer is None else round(self.prebuffer * 1000, 1)
+            ),
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+        }
+        for phase in PHASES:
+            value = self.marks.get(phase)
+            result[f"{phase}_ms"] = None if value is None else round(value * 1000, 1)
+        return result
+
+    def summary(self) -> str:
+        lines = []
+        for phase in PHASES:
+            value = self.marks.get(phase)
+            lines.append(
+                f"{phase}: {'-' if value is None else f'{value * 1000:.1f} ms'}"
+            )
+        if self.hedged:
+            lines.append(f"hedged: {'backup' if self.hedge_won else 'primary'} won")
+        if self.output_latency is not None:
+            lines.append(f"output latency: {self.output_latency * 1000:.1f} ms")
+        if self.prebuffer is not None:
+            lines.append(f"jitter buffer: {self.prebuffer * 1000:.0f} ms")
+            lines.append(f"underruns: {self.underruns}, overruns: {self.overruns}")
+        lines.append(f"audio: {self.audio_duration:.2f} s")
+        lines.append(f"rtf: {'-' if self.rtf is None else f'{self.rtf:.3f}'}")
+        return "\n".join(lines)
+
+
+# httpcore trace events, without their connection/http11/http2 prefix, and
+# their phase. Connection events only fire when a new connection is opened.
+TRACE_PHASES = {
+    "connect_tcp.complete": "connect",
+    "connect_unix_socket.complete": "connect",
+    "start_tls.complete": "connect",
+    "send_request_body.complete": "upload",
+}
+
+
+def trace_hook(metrics: RequestMetrics):
+    """Return an httpx ``trace`` extension that marks connection phases."""
+
+    async def trace(event_name: str, info: dict):
+        phase = TRACE_PHASES.get(event_name.partition(".")[2])
+        if phase is not None:
+            # The TLS handshake completes after the TCP connect
+            metrics.mark(phase, overwrite=phase == "connect")
+
+    return trace
+
+
+class MetricsLog:
+    """Append-only JSONL (or CSV, by extension) log rotated at ``max_bytes``."""
+
+    def __init__(self, path: str | Path, max_bytes: int = 5 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+
+    def append(self, metrics: RequestMetrics):
+        row = metrics.to_dict()
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._rotate()
+            if self.path.suffix.lower() == ".csv":
+                is_new = not self.path.exists()
+                with open(self.path, "a", encoding="utf-8", newline="") as f:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    if is_new:
+                        writer.writeheader()
+                    writer.writerow(row)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(row) + "\n")
+
+
+metrics_log = MetricsLog(config.metrics_log)
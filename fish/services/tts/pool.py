@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+from fish.config import config
+
+from .transport import TransportResponse, transport
+
+# Answer latencies needed before a percentile is trusted as hedging deadline
+HEDGE_MIN_SAMPLES = 20
+
+
+class NoBackendError(httpx.TransportError):
+    """No usable backend URL, or every replica of the pool was tried."""
+
+
+def parse_backends(text: str) -> list[str]:
+    """Split a comma or whitespace separated list of backend URLs."""
+    urls = []
+    for url in text.replace(",", " ").split():
+        if url not in urls:
+            urls.append(url)
+    return urls
+
+
+@dataclass
+class Endpoint:
+    url: str
+    healthy: bool = True
+    # Requests sent and not yet fully received
+    outstanding: int = 0
+    # Exponentially weighted time to response headers, in seconds
+    latency: float | None = None
+    probe_latency: float | None = None
+    # Recent times to the first body byte of successful requests
+    answers: deque = field(default_factory=lambda: deque(maxlen=200))
+    failures: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    def score(self, default_latency: float) -> float:
+        """Expected wait, lower is better: queue length times latency."""
+        return (self.outstanding + 1) * (self.latency or default_latency)
+
+
+class BackendPool:
+    """Routes TTS requests over several replicas of the same backend.
+
+    Requests go to the healthy endpoint with the lowest expected wait, that
+    is least outstanding requests weighted by its EWMA latency. Endpoints
+    that fail are marked down until a background probe reaches them again.
+    Endpoint state is shared by every pool in the process.
+    """
+
+    _endpoints: dict[str, Endpoint] = {}
+    _lock = threading.Lock()
+    _prober: threading.Thread | None = None
+    # Process-wide hedging counters, see hedge_stats()
+    _requests = 0
+    _hedges = 0
+    _hedge_wins = 0
+
+    def __init__(self, urls: list[str] | str, alpha: float = 0.3):
+        if isinstance(urls, str):
+            urls = parse_backends(urls)
+        if not urls:
+            raise NoBackendError("No backend URL configured")
+        for url in urls:
+            try:
+                parsed = httpx.URL(url)
+            except httpx.InvalidURL as e:
+                raise NoBackendError(f"Invalid backend URL {url!r}: {e}") from e
+            if parsed.scheme not in ("http", "https") or not parsed.host:
+                raise NoBackendError(f"Invalid backend URL {url!r}")
+        self.urls = urls
+        self.alpha = alpha
+        with self._lock:
+            for url in urls:
+                self._endpoints.setdefault(url, Endpoint(url))
+        self._start_prober()
+
+    @property
+    def endpoints(self) -> list[Endpoint]:
+        return [self._endpoints[url] for url in self.urls]
+
+    def endpoint(self, url: str) -> Endpoint:
+        return self._endpoints[url]
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def acquire(self, exclude: set[str] = frozenset()) -> Endpoint | None:
+        """Pick an endpoint for a new request and count it as outstanding."""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.url not in exclude]
+            if not candidates:
+                return None
+            # Fall back to endpoints marked down rather than failing outright
+            healthy = [e for e in candidates if e.healthy] or candidates
+            known = [e.latency for e in healthy if e.latency is not None]
+            default = min(known) if known else 1.0
+            endpoint = min(healthy, key=lambda e: e.score(default))
+            endpoint.outstanding += 1
+            endpoint.last_used = time.monotonic()
+            return endpoint
+
+    def release(
+        self,
+        endpoint: Endpoint,
+        latency: float | None = None,
+        ok: bool | None = True,
+        answer_latency: float | None = None,
+    ):
+        """Finish a request, ``ok`` is None if it says nothing about health."""
+        with self._lock:
+            endpoint.outstanding = max(0, endpoint.outstanding - 1)
+            if ok is None:
+                return
+            if not ok:
+                endpoint.failures += 1
+                endpoint.healthy = False
+                return
+            endpoint.failures = 0
+            endpoint.healthy = True
+            if answer_latency is not None:
+                endpoint.answers.append(answer_latency)
+            if latency is not None:
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.alpha * (latency - endpoint.latency)
+
+    def track(self, endpoint: Endpoint, response: TransportResponse):
+        """Release ``endpoint`` once ``response`` has been fully received."""
+
+        def done(_):
+            if response.error is not None:
+                ok = not isinstance(response.error, httpx.TransportError)
+            elif not response.status_code:
+                # Cancelled before the backend answered
+                ok = None
+            else:
+                ok = response.status_code < 500
+            answer = None if response.cancelled else response.answer_latency
+            self.release(endpoint, response.header_latency, ok, answer)
+
+        response._future.add_done_callback(done)
+
+    def hedge_delay(
+        self, endpoint: Endpoint, percentile: float, min_delay: float = 0.0
+    ) -> float | None:
+        """Time after which a request to ``endpoint`` is slower than usual.
+
+        None until enough answers have been seen to estimate the percentile.
+        """
+        with self._lock:
+            answers = sorted(endpoint.answers)
+        if len(answers) < HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(answers) - 1, int(len(answers) * percentile / 100))
+        return max(min_delay, answers[index])
+
+    @classmethod
+    def count_request(cls, hedged: bool = False, won: bool = False):
+        with cls._lock:
+            cls._requests += 1
+            cls._hedges += hedged
+            cls._hedge_wins += won
+
+    @classmethod
+    def hedge_stats(cls) -> dict:
+        """Share of requests that were hedged, and of hedges that won."""
+        with cls._lock:
+            return {
+                "requests": cls._requests,
+                "hedges": cls._hedges,
+                "hedge_wins": cls._hedge_wins,
+                "hedge_rate": cls._hedges / cls._requests if cls._requests else 0.0,
+                "win_rate": cls._hedge_wins / cls._hedges if cls._hedges else 0.0,
+            }
+
+    def warmup(self):
+        for url in self.urls:
+            transport.warmup(url)
+
+    @classmethod
+    def probe(cls, endpoint: Endpoint, timeout: float = 5.0) -> bool:
+        start = time.perf_counter()
+        try:
+            response = transport.options(endpoint.url, timeout=timeout)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        with cls._lock:
+            endpoint.healthy = ok
+            endpoint.probe_latency = time.perf_counter() - start if ok else None
+            if ok:
+                endpoint.failures = 0
+        return ok
+
+    @classmethod
+    def _probe_loop(cls):
+        while True:
+            time.sleep(config.probe_interval)
+            with cls._lock:
+                # Only probe endpoints that are still in use
+                idle = time.monotonic() - 10 * config.probe_interval
+                endpoints = [
+                    e
+                    for e in cls._endpoints.values()
+                    if e.last_used > idle and (not e.healthy or e.outstanding == 0)
+                ]
+            for endpoint in endpoints:
+                cls.probe(endpoint)
+
+    @classmethod
+    def _start_prober(cls):
+        with cls._lock:
+            if cls._prober is None or not cls._prober.is_alive():
+                cls._prober = threading.Thread(target=cls._probe_loop, daemon=True)
+                cls._prober.start()
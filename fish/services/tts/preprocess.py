@@ -0,0 +1,233 @@
+import hashlib
+import io
+import re
+from pathlib import Path
+
+import numpy as np
+import ormsgpack
+import soundfile as sf
+
+from fish.config import config
+
+from .cache import ResultCache
+
+# Preprocessed references, keyed by a hash of the source bytes and settings
+reference_store = ResultCache(
+    Path.home() / ".fish" / "cache" / "references",
+    max_bytes=config.reference_cache_size * 1024 * 1024,
+)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """Band-limited FFT resampling of a mono float signal."""
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio
+    length = round(len(audio) * target_sr / orig_sr)
+    spectrum = np.fft.rfft(audio)
+    # Drop everything above the lower of the two Nyquist frequencies
+    spectrum = spectrum[: min(len(spectrum), length // 2 + 1)]
+    return np.fft.irfft(spectrum, n=length) * (length / len(audio))
+
+
+def transcode(data: bytes, sample_rate: int, flac: bool) -> bytes:
+    """Downmix ``data`` to mono 16-bit at ``sample_rate``, as FLAC or WAV."""
+    audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    if audio.shape[1] == 1 and sr == sample_rate and not flac:
+        return data
+
+    mono = resample(audio.mean(axis=1), sr, sample_rate)
+    buffer = io.BytesIO()
+    sf.write(
+        buffer,
+        np.clip(mono, -1.0, 1.0),
+        sample_rate,
+        format="FLAC" if flac else "WAV",
+        subtype="PCM_16",
+    )
+    return buffer.getvalue()
+
+
+def preprocess_reference(
+    data: bytes, sample_rate: int | None = None, flac: bool | None = None
+) -> bytes:
+    """Return a smaller encoding of the reference audio ``data`` to upload.
+
+    The source is returned unchanged if it cannot be decoded or if the
+    result would not be smaller.
+    """
+    sample_rate = sample_rate or config.reference_sample_rate
+    flac = config.reference_flac if flac is None else flac
+
+    h = hashlib.sha256(f"{sample_rate}:{flac}:".encode("utf-8"))
+    h.update(data)
+    key = h.hexdigest()
+    cached = reference_store.get(key)
+    if cached is not None:
+        return cached.read_bytes()
+
+    try:
+        processed = transcode(data, sample_rate, flac)
+    except RuntimeError:
+        # Not a format libsndfile understands, let the backend decode it
+        processed = data
+    if len(processed) >= len(data):
+        processed = data
+
+    suffix = "" if processed is data else ".flac" if flac else ".wav"
+    reference_store.put_bytes(key, processed, suffix)
+    return processed
+
+
+FRAME_SECONDS = 0.02
+# Pauses of at least this many frames (160 ms) are where a reference may be cut
+MIN_PAUSE_FRAMES = 8
+# Silence kept around the speech so words are not clipped
+PADDING_SECONDS = 0.1
+
+# Places where a transcript may be cut, strongest first
+TEXT_BREAKS = (
+    re.compile(r"[。！？!?；;…]+\s*|\.\s+"),
+    re.compile(r"[，,、：:]+\s*"),
+    re.compile(r"\s+"),
+)
+
+
+def speech_mask(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Per-frame voice activity from frame energy relative to the noise floor."""
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    n = len(audio) // frame
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    frames = audio[: n * frame].reshape(n, frame)
+    energy = 10 * np.log10(np.mean(frames**2, axis=1) + 1e-10)
+    floor, peak = np.percentile(energy, 10), np.max(energy)
+    threshold = max(floor + 0.3 * (peak - floor), peak - 40.0)
+    mask = energy > threshold
+
+    # Bridge gaps inside words and phrases that are shorter than a pause
+    index = np.arange(n)
+    previous = np.maximum.accumulate(np.where(mask, index, -1))
+    following = np.minimum.accumulate(np.where(mask, index, n)[::-1])[::-1]
+    gap = following - previous - 1
+    return mask | ((previous >= 0) & (following < n) & (gap < MIN_PAUSE_FRAMES))
+
+
+def select_span(mask: np.ndarray, budget: int) -> tuple[int, int]:
+    """Frames [start, end) of at most ``budget`` frames with the most speech.
+
+    Spans start and end in pauses, so words are not cut, unless no pause
+    fits the budget.
+    """
+    speech = np.flatnonzero(mask)
+    if len(speech) == 0:
+        return 0, min(len(mask), budget)
+    start, end = speech[0], speech[-1] + 1
+    if end - start <= budget:
+        return start, end
+
+    counts = np.concatenate([[0], np.cumsum(mask)])
+    # Speech onsets and offsets are the candidate span boundaries
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], mask, [False]])))
+    starts, ends = edges[0::2], edges[1::2]
+    last = np.searchsorted(ends, starts + budget, side="right") - 1
+    valid = last >= np.arange(len(starts))
+    if valid.any():
+        i = np.flatnonzero(valid)
+        speech_in = counts[ends[last[i]]] - counts[starts[i]]
+        best = i[np.argmax(speech_in)]
+        return starts[best], ends[last[best]]
+
+    # A single phrase longer than the budget, take its densest window
+    window = counts[budget:] - counts[:-budget]
+    best = int(np.argmax(window))
+    return best, best + budget
+
+
+def _snap(text: str, position: int) -> int:
+    """Move ``position`` to the nearest break, preferring strong ones."""
+    if position <= 0 or position >= len(text):
+        return min(max(position, 0), len(text))
+    reach = max(8, len(text) // 10)
+    for pattern in TEXT_BREAKS:
+        cuts = [m.end() for m in pattern.finditer(text)]
+        near = [c for c in cuts if abs(c - position) <= reach]
+        if near:
+            return min(near, key=lambda c: abs(c - position))
+    return position
+
+
+def trim_text(text: str, start: float, end: float) -> str:
+    """Keep the part of ``text`` spoken between fractions ``start`` and ``end``."""
+    text = text.strip()
+    begin = _snap(text, round(start * len(text)))
+    stop = _snap(text, round(end * len(text)))
+    return text[begin:stop].strip() if stop > begin else text
+
+
+def _pieces(text: str, pattern: re.Pattern) -> list[str]:
+    cuts = [0] + [m.end() for m in pattern.finditer(text)] + [len(text)]
+    pieces = [text[a:b] for a, b in zip(cuts, cuts[1:])]
+    return [piece for piece in pieces if piece.strip()]
+
+
+def align_text(text: str, mask: np.ndarray, start: int, end: int) -> str:
+    """Transcript of the speech in frames [start, end) of ``mask``.
+
+    If the audio has as many phrases as the text has sentences or clauses,
+    they are matched one to one, otherwise the text is cut in proportion to
+    the speech before and after the span.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], mask, [False]])))
+    onsets, offsets = edges[0::2], edges[1::2]
+    for pattern in TEXT_BREAKS[:2]:
+        pieces = _pieces(text.strip(), pattern)
+        if len(pieces) == len(onsets) > 1:
+            kept = (onsets >= start) & (offsets <= end)
+            if kept.any():
+                return "".join(p for p, k in zip(pieces, kept) if k).strip()
+
+    total = max(1, int(mask.sum()))
+    before, kept = int(mask[:start].sum()), int(mask[start:end].sum())
+    return trim_text(text, before / total, (before + kept) / total)
+
+
+def trim_reference(data: bytes, text: str, max_seconds: float) -> tuple[bytes, str]:
+    """Cut a reference to its best ``max_seconds`` of speech and trim its text.
+
+    Leading and trailing silence is always removed and the transcript is
+    cut to match, see ``align_text``. Results are cached on disk.
+    """
+    h = hashlib.sha256(f"trim:{max_seconds}:".encode("utf-8"))
+    h.update(text.encode("utf-8"))
+    h.update(data)
+    key = h.hexdigest()
+    cached = reference_store.get(key)
+    if cached is not None:
+        entry = ormsgpack.unpackb(cached.read_bytes())
+        return entry["audio"], entry["text"]
+
+    try:
+        audio, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except RuntimeError:
+        return data, text
+    mono = audio.mean(axis=1)
+    mask = speech_mask(mono, sr)
+    frame = max(1, int(sr * FRAME_SECONDS))
+    pad = int(PADDING_SECONDS / FRAME_SECONDS)
+    start, end = select_span(mask, max(1, int(max_seconds / FRAME_SECONDS) - 2 * pad))
+
+    trimmed_text = align_text(text, mask, start, end)
+
+    begin = max(0, (start - pad) * frame)
+    stop = min(len(audio), (end + pad) * frame)
+    if begin == 0 and stop >= len(audio) - frame:
+        trimmed = (data, text)
+    else:
+        buffer = io.BytesIO()
+        sf.write(buffer, audio[begin:stop], sr, format="WAV", subtype="PCM_16")
+        trimmed = (buffer.getvalue(), trimmed_text)
+
+    reference_store.put_bytes(
+        key, ormsgpack.packb({"audio": trimmed[0], "text": trimmed[1]}), ".trim"
+    )
+    return trimmed
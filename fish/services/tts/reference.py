@@ -0,0 +1,158 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import ormsgpack
+
+from fish.config import config
+
+from .preprocess import preprocess_reference, trim_reference
+from .schema import ServeReferenceAudio, ServeTTSRequest
+
+
+@dataclass
+class ReferenceEntry:
+    key: tuple
+    audio: bytes
+    text: str
+    # ServeReferenceAudio already encoded as a msgpack map
+    packed: bytes
+    # sha256 of ``packed``, so requests can be hashed without rehashing audio
+    digest: bytes
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.audio) + len(self.packed)
+
+
+class ReferenceCache:
+    """LRU cache of reference audios and transcripts, bounded by total bytes.
+
+    Entries are keyed by path and invalidated when the size or mtime of the
+    audio or its ``.lab`` file, the preprocessing settings or the duration
+    budget change.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, ReferenceEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(audio_path: Path, max_seconds: float) -> tuple | None:
+        try:
+            audio_stat = audio_path.stat()
+            lab_stat = audio_path.with_suffix(".lab").stat()
+        except OSError:
+            return None
+        return (
+            audio_stat.st_size,
+            audio_stat.st_mtime_ns,
+            lab_stat.st_size,
+            lab_stat.st_mtime_ns,
+            config.reference_preprocess,
+            config.reference_sample_rate,
+            config.reference_flac,
+            max_seconds,
+        )
+
+    def get(self, path: str, max_seconds: float = 0) -> ReferenceEntry | None:
+        """Return the entry for ``path``, or None if it has no ``.lab`` file.
+
+        A positive ``max_seconds`` trims the reference to its best speech.
+        """
+        audio_path = Path(path)
+        key = self._stat_key(audio_path, max_seconds)
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.key == key:
+                self._entries.move_to_end(path)
+                return entry
+
+        entry = self._load(audio_path, key)
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self._entries[path] = entry
+            self.total_bytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def _load(self, audio_path: Path, key: tuple) -> ReferenceEntry:
+        audio = audio_path.read_bytes()
+        text = audio_path.with_suffix(".lab").read_text(encoding="utf-8")
+        max_seconds = key[-1]
+        if max_seconds > 0:
+            audio, text = trim_reference(audio, text, max_seconds)
+        if config.reference_preprocess:
+            audio = preprocess_reference(audio)
+        packed = ormsgpack.packb(
+            ServeReferenceAudio(audio=audio, text=text),
+            option=ormsgpack.OPT_SERIALIZE_PYDANTIC,
+        )
+        return ReferenceEntry(
+            key=key,
+            audio=audio,
+            text=text,
+            packed=packed,
+            digest=hashlib.sha256(packed).digest(),
+        )
+
+    def _evict(self):
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+def _map_header(size: int) -> bytes:
+    if size < 16:
+        return bytes([0x80 | size])
+    if size < 1 << 16:
+        return b"\xde" + struct.pack(">H", size)
+    return b"\xdf" + struct.pack(">I", size)
+
+
+def _array_header(size: int) -> bytes:
+    if size < 16:
+        return bytes([0x90 | size])
+    if size < 1 << 16:
+        return b"\xdc" + struct.pack(">H", size)
+    return b"\xdd" + struct.pack(">I", size)
+
+
+def pack_tts_request(
+    request: ServeTTSRequest, references: list[ReferenceEntry]
+) -> bytes:
+    """Serialize ``request`` with pre-packed references spliced in.
+
+    The output is byte-identical to packing the full request with
+    ``OPT_SERIALIZE_PYDANTIC``, without re-encoding the reference audios.
+    """
+    fields = request.model_dump(exclude={"references"})
+    parts = [_map_header(len(ServeTTSRequest.model_fields))]
+    for name in ServeTTSRequest.model_fields:
+        parts.append(ormsgpack.packb(name))
+        if name == "references":
+            parts.append(_array_header(len(references)))
+            parts.extend(ref.packed for ref in references)
+        else:
+            parts.append(ormsgpack.packb(fields[name]))
+    return b"".join(parts)
+
+
+reference_cache = ReferenceCache(max_bytes=config.reference_cache_size * 1024 * 1024)
@@ -12,7 +12,7 @@ class ServeTTSRequest(BaseModel):
     text: str
     chunk_length: int = 200
     # Audio format
-    format: Literal["wav", "pcm", "mp3"] = "wav"
+    format: Literal["wav", "pcm", "mp3", "opus"] = "wav"
     mp3_bitrate: Literal[64, 128, 192] = 128
     # References audios for in-context learning
     references: list[ServeReferenceAudio] = []
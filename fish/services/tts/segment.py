@@ -0,0 +1,90 @@
+import re
+
+EMOTION_TAG = re.compile(r"\[INST\].*?\[/INST\]", re.DOTALL)
+
+# Strong breaks end a sentence, weak breaks are only used for long sentences
+STRONG_BREAKS = re.compile(r"[。！？!?；;…\n]+|\.(?=\s|$)")
+WEAK_BREAKS = re.compile(r"[，,、：:]+")
+
+
+def _runs(text: str) -> list[tuple[str, str]]:
+    """Split ``text`` into (emotion tag, text) runs.
+
+    Like the editor preview, a tag applies until the next tag or line break.
+    """
+    runs = []
+
+    def add(chunk: str, tag: str):
+        for i, line in enumerate(re.split(r"(?<=\n)", chunk)):
+            if line:
+                runs.append((tag if i == 0 else "", line))
+
+    tag, pos = "", 0
+    for match in EMOTION_TAG.finditer(text):
+        add(text[pos : match.start()], tag)
+        tag, pos = match.group(0), match.end()
+    add(text[pos:], tag)
+    return runs
+
+
+def _split_at(text: str, pattern: re.Pattern) -> list[tuple[str, bool]]:
+    """Split after each match, flagging pieces that end with a break."""
+    pieces, last = [], 0
+    for match in pattern.finditer(text):
+        pieces.append((text[last : match.end()], True))
+        last = match.end()
+    if last < len(text):
+        pieces.append((text[last:], False))
+    return pieces
+
+
+def _fragments(text: str, max_chars: int) -> list[tuple[str, str, bool]]:
+    """Return (tag, text, ends_sentence) fragments no longer than ``max_chars``."""
+    fragments = []
+    for tag, run in _runs(text):
+        for sentence, ends in _split_at(run, STRONG_BREAKS):
+            if len(sentence) <= max_chars:
+                fragments.append((tag, sentence, ends))
+                continue
+            parts = _split_at(sentence, WEAK_BREAKS)
+            for i, (part, _) in enumerate(parts):
+                fragments.append((tag, part, ends if i == len(parts) - 1 else True))
+    return fragments
+
+
+def split_sentences(text: str, max_chars: int = 150, min_chars: int = 10) -> list[str]:
+    """Split ``text`` into sentence-sized segments for pipelined synthesis.
+
+    ``[INST]...[/INST]`` emotion tags are never split and are repeated at
+    the start of every segment they still apply to. Segments shorter than
+    ``min_chars`` are merged with the following sentence.
+    """
+    segments = []
+    current, current_tag, current_len = "", "", 0
+
+    def flush():
+        nonlocal current, current_len
+        if EMOTION_TAG.sub("", current).strip():
+            segments.append(current.strip())
+        current, current_len = "", 0
+
+    for tag, fragment, ends in _fragments(text, max_chars):
+        if not fragment.strip():
+            continue
+        # Each segment speaks with one emotion, the tag is only sent once
+        if current and tag != current_tag:
+            flush()
+        if current and current_len + len(fragment) > max_chars:
+            flush()
+
+        if not current:
+            current += tag
+        current += fragment if current_len else fragment.lstrip()
+        current_tag = tag
+        current_len += len(fragment)
+
+        if ends and current_len >= min_chars:
+            flush()
+
+    flush()
+    return segments
@@ -0,0 +1,321 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterator
+
+import httpx
+
+from fish.config import config
+
+logger = logging.getLogger(__name__)
+
+# Queue markers sent from the transport loop to the reading thread
+_HEADERS = object()
+_DONE = object()
+
+
+class RequestCancelled(Exception):
+    """Raised when reading a response whose request has been cancelled."""
+
+
+class TransportResponse:
+    """Blocking view of a response that is received on the transport loop.
+
+    Chunks are handed over through a queue, so ``cancel()`` from any thread
+    aborts the request immediately and wakes up a blocked reader.
+    """
+
+    def __init__(self):
+        self.status_code = 0
+        self.headers = httpx.Headers()
+        self.url = ""
+        self.started = time.perf_counter()
+        # Seconds from sending the request to receiving the response headers
+        self.header_latency: float | None = None
+        # Seconds until the first body byte, the end of the body or an error
+        self.answer_latency: float | None = None
+        # Transport error or timeout that ended the request, if any
+        self.error: Exception | None = None
+        self._items = queue.Queue()
+        self._listeners: list[threading.Event] = []
+        self._future: Future | None = None
+        self._status_error: httpx.HTTPStatusError | None = None
+        self._content: bytes | None = None
+        self._finished = False
+        self.cancelled = False
+
+    def _on_headers(self, response: httpx.Response):
+        self.header_latency = time.perf_counter() - self.started
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            self._status_error = e
+        self._put(_HEADERS)
+
+    def _put(self, item):
+        self._items.put(item)
+        if item is _HEADERS or self.answer_latency is not None:
+            return
+        # Set before notifying, see notify()
+        self.answer_latency = time.perf_counter() - self.started
+        for event in list(self._listeners):
+            event.set()
+
+    @property
+    def answered(self) -> bool:
+        return self.answer_latency is not None
+
+    def notify(self, event: threading.Event):
+        """Set ``event`` once the response has something to read past its headers."""
+        self._listeners.append(event)
+        if self.answered:
+            event.set()
+
+    def _get(self):
+        item = self._items.get()
+        if isinstance(item, BaseException):
+            self._finished = True
+            raise item
+        if item is _DONE:
+            self._finished = True
+        return item
+
+    def _wait_headers(self):
+        if self._get() is not _HEADERS:
+            raise RuntimeError("Response headers were not received")
+
+    def wait(self, stream: bool = False) -> "TransportResponse":
+        """Block until the headers, or the whole body unless ``stream``, arrive."""
+        try:
+            self._wait_headers()
+            if not stream:
+                self.content
+        except BaseException:
+            self.cancel()
+            raise
+        return self
+
+    def raise_for_status(self):
+        if self._status_error is not None:
+            raise self._status_error
+
+    def _iter_raw(self) -> Iterator[bytes]:
+        while not self._finished:
+            item = self._get()
+            if item is not _DONE:
+                yield item
+
+    def iter_content(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        """Yield the body in pieces of ``chunk_size`` bytes, the last may be shorter."""
+        if self._content is not None:
+            chunks = iter([self._content])
+        else:
+            chunks = self._iter_raw()
+        if chunk_size is None:
+            yield from chunks
+            return
+
+        buffer = b""
+        for chunk in chunks:
+            buffer += chunk
+            while len(buffer) >= chunk_size:
+                yield buffer[:chunk_size]
+                buffer = buffer[chunk_size:]
+        if buffer:
+            yield buffer
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = b"".join(self._iter_raw())
+        return self._content
+
+    def cancel(self):
+        if self._finished:
+            return
+        self.cancelled = True
+        # Wakes up the reader even if the request task has not started yet
+        self._put(RequestCancelled("Request cancelled"))
+        if self._future is not None:
+            self._future.cancel()
+
+    def close(self):
+        self.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f"<Response [{self.status_code}]>"
+
+
+class PooledTransport:
+    """Process-wide keep-alive HTTP transport shared by every TTS request.
+
+    Requests run on an ``httpx.AsyncClient`` owned by a background event
+    loop thread, so they can be cancelled from any thread. Idle pooled
+    connections are closed after ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 4,
+        idle_timeout: float = 60.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        total_timeout: float = 0.0,
+    ):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # 0 disables the limit on the whole request including the body
+        self.total_timeout = total_timeout
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout,
+            pool=self.connect_timeout,
+        )
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="tts-transport", daemon=True
+                ).start()
+            return self._loop
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=None,
+                        max_keepalive_connections=self.pool_size,
+                        keepalive_expiry=self.idle_timeout,
+                    ),
+                )
+            return self._client
+
+    def configure(
+        self,
+        pool_size: int,
+        idle_timeout: float,
+        connect_timeout: float | None = None,
+        read_timeout: float | None = None,
+        total_timeout: float | None = None,
+    ):
+        with self._lock:
+            self.pool_size = pool_size
+            self.idle_timeout = idle_timeout
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+            if total_timeout is not None:
+                self.total_timeout = total_timeout
+            old, self._client = self._client, None
+        # Requests still running on the old client are aborted
+        if old is not None:
+            asyncio.run_coroutine_threadsafe(old.aclose(), self.loop)
+
+    async def _receive(
+        self, response: TransportResponse, method: str, url: str, kwargs: dict
+    ):
+        async with self.client.stream(method, url, **kwargs) as r:
+            response._on_headers(r)
+            async for chunk in r.aiter_bytes():
+                response._put(chunk)
+        response._put(_DONE)
+
+    async def _send(
+        self, response: TransportResponse, method: str, url: str, kwargs: dict
+    ):
+        try:
+            coro = self._receive(response, method, url, kwargs)
+            if self.total_timeout > 0:
+                await asyncio.wait_for(coro, self.total_timeout)
+            else:
+                await coro
+        except asyncio.TimeoutError:
+            response.error = httpx.TimeoutException(
+                f"Request exceeded the total timeout of {self.total_timeout}s"
+            )
+            response._put(response.error)
+        except asyncio.CancelledError:
+            response._put(RequestCancelled("Request cancelled"))
+            raise
+        except Exception as e:
+            response.error = e
+            response._put(e)
+
+    def send(self, method: str, url: str, **kwargs) -> TransportResponse:
+        """Start a request without waiting for the response.
+
+        Keyword arguments are passed to ``httpx.AsyncClient.stream``.
+        """
+        response = TransportResponse()
+        response.url = url
+        response._future = asyncio.run_coroutine_threadsafe(
+            self._send(response, method, url, kwargs), self.loop
+        )
+        return response
+
+    def request(
+        self, method: str, url: str, stream: bool = False, **kwargs
+    ) -> TransportResponse:
+        return self.send(method, url, **kwargs).wait(stream)
+
+    def post(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("POST", url, **kwargs)
+
+    def options(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("OPTIONS", url, **kwargs)
+
+    def warmup(self, url: str):
+        """Open a pooled connection to ``url`` in the background."""
+
+        async def _connect():
+            try:
+                await self.client.options(url, timeout=5)
+                logger.info(f"Warmed up connection to {url}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to warm up connection to {url}: {e}")
+
+        if url:
+            asyncio.run_coroutine_threadsafe(_connect(), self.loop)
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), self.loop).result()
+
+
+transport = PooledTransport(
+    pool_size=config.pool_size,
+    idle_timeout=config.pool_idle_timeout,
+    connect_timeout=config.connect_timeout,
+    read_timeout=config.read_timeout,
+    total_timeout=config.total_timeout,
+)
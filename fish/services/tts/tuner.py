@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from fish.config import config
+from fish.utils.wav import strip_header
+
+from .client import TTSClient
+from .transport import RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+# Long enough that every probed chunk_length splits it differently
+PROBE_TEXT = (
+    "The quick brown fox jumps over the lazy dog, and then it runs back into "
+    "the forest before anyone can follow. Later that evening, the farmer "
+    "counted his chickens twice, wrote the number in a small notebook, and "
+    "wondered aloud whether the fox would come back tomorrow, or the day "
+    "after that, when the moon was full and the fields were quiet again."
+)
+CHUNK_LENGTHS = (100, 150, 200, 250, 300)
+LATENCY_MODES = ("normal", "balanced")
+# Probed audio is 16 bit mono at this rate
+SAMPLE_RATE = 44100
+
+
+@dataclass
+class ProbeResult:
+    chunk_length: int
+    latency: str
+    # Seconds from sending the request to the first audio sample
+    first_audio: float | None = None
+    # Generation time per second of audio once audio started flowing
+    rtf: float | None = None
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class TuningResult:
+    backend: str
+    chunk_length: int
+    latency: str
+    first_audio: float
+    rtf: float
+    # False if no setting was faster than real time, the fastest is used then
+    realtime: bool
+    timestamp: float = field(default_factory=time.time)
+    probes: list[dict] = field(default_factory=list)
+
+
+class LatencyTuner:
+    """Find the ``chunk_length`` and latency mode with the fastest first audio.
+
+    Every combination is probed ``repeats`` times with a streaming request
+    that is read until ``probe_seconds`` of audio arrived. The setting with
+    the lowest median time to first audio wins among those whose median
+    real-time factor stays below ``max_rtf``, so playback never catches up
+    with generation.
+    """
+
+    def __init__(
+        self,
+        client: TTSClient,
+        chunk_lengths: tuple[int, ...] = CHUNK_LENGTHS,
+        latencies: tuple[str, ...] = LATENCY_MODES,
+        repeats: int = 2,
+        probe_seconds: float = 6.0,
+        max_rtf: float = 0.9,
+        text: str = PROBE_TEXT,
+        on_probe: Callable[[ProbeResult, int, int], None] | None = None,
+    ):
+        self.client = client
+        self.settings = [(c, l) for l in latencies for c in chunk_lengths]
+        self.repeats = max(1, repeats)
+        self.probe_seconds = probe_seconds
+        self.max_rtf = max_rtf
+        self.text = text
+        self.on_probe = on_probe
+        self._stop_event = threading.Event()
+
+    @property
+    def total(self) -> int:
+        return len(self.settings) * self.repeats
+
+    def probe(self, chunk_length: int, latency: str) -> ProbeResult:
+        result = ProbeResult(chunk_length, latency)
+        request = self.client.build_request(
+            self.text,
+            streaming=True,
+            format="wav",
+            chunk_length=chunk_length,
+            latency=latency,
+        )
+        wanted = int(self.probe_seconds * SAMPLE_RATE) * 2
+        head, started, received = b"", False, 0
+        first = last = None
+        start = time.perf_counter()
+        try:
+            with self.client.post(request) as response:
+                for chunk in response.iter_content():
+                    if not started:
+                        chunk, started = strip_header(head + chunk)
+                        if not started:
+                            head = chunk
+                            continue
+                    if not chunk:
+                        continue
+                    last = time.perf_counter()
+                    if first is None:
+                        first, first_bytes = last, len(chunk)
+                    received += len(chunk)
+                    if received >= wanted:
+                        # Enough to measure, the rest is cancelled on close
+                        break
+        except (RequestCancelled, httpx.HTTPError) as e:
+            result.error = str(e) or type(e).__name__
+            return result
+
+        if first is None:
+            result.error = "No audio received"
+            return result
+        result.first_audio = first - start
+        # Rate after the first chunk, which already paid the first audio latency
+        seconds = (received - first_bytes) / 2 / SAMPLE_RATE
+        if seconds > 0:
+            result.rtf = (last - first) / seconds
+        return result
+
+    def run(self) -> TuningResult | None:
+        """Probe every setting, None if stopped or no probe succeeded."""
+        # The first request may pay for a cold connection or model
+        self.probe(self.settings[0][0], self.settings[0][1])
+
+        results: list[ProbeResult] = []
+        for _ in range(self.repeats):
+            # Interleaved, so a slow phase of the backend hits every setting
+            for chunk_length, latency in self.settings:
+                if self.stopped:
+                    return None
+                result = self.probe(chunk_length, latency)
+                results.append(result)
+                logger.info(f"Tuning probe: {result}")
+                if self.on_probe is not None:
+                    self.on_probe(result, len(results), self.total)
+        return self.recommend(results)
+
+    def recommend(self, results: list[ProbeResult]) -> TuningResult | None:
+        candidates = []
+        for chunk_length, latency in self.settings:
+            probes = [
+                r
+                for r in results
+                if r.ok
+                and r.rtf is not None
+                and (r.chunk_length, r.latency) == (chunk_length, latency)
+            ]
+            if probes:
+                candidates.append(
+                    (
+                        chunk_length,
+                        latency,
+                        statistics.median(r.first_audio for r in probes),
+                        statistics.median(r.rtf for r in probes),
+                    )
+                )
+        if not candidates:
+            return None
+
+        realtime = [c for c in candidates if c[3] <= self.max_rtf]
+        if realtime:
+            best = min(realtime, key=lambda c: c[2])
+        else:
+            best = min(candidates, key=lambda c: c[3])
+        return TuningResult(
+            backend=self.client.backend,
+            chunk_length=best[0],
+            latency=best[1],
+            first_audio=best[2],
+            rtf=best[3],
+            realtime=bool(realtime),
+            probes=[asdict(r) for r in results],
+        )
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def stop(self):
+        self._stop_event.set()
+        self.client.cancel()
+
+
+class TuningStore:
+    """Calibration results in a JSON file, keyed by backend URL."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, backend: str) -> TuningResult | None:
+        with self._lock:
+            entry = self._load().get(backend)
+        if entry is None:
+            return None
+        try:
+            return TuningResult(**entry)
+        except TypeError:
+            return None
+
+    def put(self, result: TuningResult):
+        with self._lock:
+            entries = self._load()
+            entries[result.backend] = asdict(result)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, indent=1)
+            os.replace(tmp_path, self.path)
+
+
+tuning_store = TuningStore(config.tuning_file)
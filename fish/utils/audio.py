@@ -3,6 +3,8 @@ import wave
 
 import sounddevice as sd
 
+from .wav import SAMPLE_RATE
+
 
 def get_devices(update: bool = True):
     if update:
@@ -31,7 +33,7 @@ def get_devices(update: bool = True):
     return input_devices, output_devices
 
 
-def wav_chunk_header(sample_rate=44100, bit_depth=16, channels=1):
+def wav_chunk_header(sample_rate=SAMPLE_RATE, bit_depth=16, channels=1):
     buffer = io.BytesIO()
 
     with wave.open(buffer, "wb") as wav_file:
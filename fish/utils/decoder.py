@@ -0,0 +1,126 @@
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+
+from .wav import SAMPLE_RATE
+
+# ffmpeg demuxer for each compressed format the backend can stream
+FFMPEG_FORMATS = {"mp3": "mp3", "opus": "ogg"}
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def can_stream(format: str) -> bool:
+    """Whether ``format`` can be played while it is being received."""
+    if format in ("wav", "pcm"):
+        return True
+    return format in FFMPEG_FORMATS and ffmpeg_available()
+
+
+class StreamDecoder:
+    """Incrementally turns received audio bytes into int16 mono PCM."""
+
+    def feed(self, data: bytes) -> bytes:
+        """Consume ``data`` and return the PCM decoded so far."""
+        return data
+
+    def flush(self) -> bytes:
+        """Signal the end of the stream and return the remaining PCM."""
+        return b""
+
+    def close(self):
+        pass
+
+
+class FFmpegStreamDecoder(StreamDecoder):
+    """Decode a compressed stream by piping it through an ffmpeg process.
+
+    A reader thread drains ffmpeg's stdout, so feeding never blocks on a
+    full output pipe and PCM is returned as soon as frames are decoded.
+    """
+
+    def __init__(self, format: str, sample_rate: int = SAMPLE_RATE, channels: int = 1):
+        self.format = format
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._pcm = queue.Queue()
+        self._done = False
+        # Partial sample left over from the last read, kept for alignment
+        self._remainder = b""
+        self._process = subprocess.Popen(
+            self.command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=(
+                subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+            ),
+        )
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def command(self) -> list[str]:
+        # fmt: off
+        return [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-fflags", "nobuffer", "-probesize", "32", "-analyzeduration", "0",
+            "-f", FFMPEG_FORMATS[self.format], "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "pipe:1",
+        ]
+        # fmt: on
+
+    def _read(self):
+        stdout = self._process.stdout
+        while chunk := stdout.read1(65536):
+            self._pcm.put(chunk)
+        self._pcm.put(None)
+
+    def _drain(self, block: bool) -> bytes:
+        chunks = [self._remainder]
+        while not self._done:
+            try:
+                chunk = self._pcm.get(block=block)
+            except queue.Empty:
+                break
+            if chunk is None:
+                self._done = True
+                break
+            chunks.append(chunk)
+        pcm = b"".join(chunks)
+        aligned = len(pcm) - len(pcm) % (2 * self.channels)
+        self._remainder = pcm[aligned:]
+        return pcm[:aligned]
+
+    def feed(self, data: bytes) -> bytes:
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass
+        return self._drain(block=False)
+
+    def flush(self) -> bytes:
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        # Blocks until ffmpeg exits and the reader queues its end marker
+        return self._drain(block=True)
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.kill()
+        self._process.wait()
+        self._process.stdout.close()
+
+
+def create_decoder(format: str, sample_rate: int = SAMPLE_RATE) -> StreamDecoder:
+    if format in FFMPEG_FORMATS:
+        return FFmpegStreamDecoder(format, sample_rate=sample_rate)
+    return StreamDecoder()
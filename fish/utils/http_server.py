@@ -0,0 +1,205 @@
+"""A minimal asyncio HTTP/1.1 server for the bundled stand-in tools.
+
+It supports keep-alive, ``Content-Length`` and chunked request bodies, and
+streams responses whose body is an async iterator with chunked encoding.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import AsyncIterator, Awaitable, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_SIZE = 64 * 1024
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, str]
+    # Header names are lower-cased
+    headers: dict[str, str]
+    body: bytes = b""
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes | AsyncIterator[bytes] = b""
+    content_type: str = "application/octet-stream"
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class BadRequest(Exception):
+    pass
+
+
+class AbortConnection(Exception):
+    """Raise from a streaming body to drop the connection mid-response."""
+
+
+class HTTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080):
+        self.host = host
+        self.port = port
+        self.routes: dict[tuple[str, str], Handler] = {}
+        self.fallback: Handler | None = None
+        self._server: asyncio.AbstractServer | None = None
+
+    def route(self, method: str, path: str):
+        def decorator(handler: Handler) -> Handler:
+            self.routes[(method.upper(), path)] = handler
+            return handler
+
+        return decorator
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        # Port 0 picks a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Request | None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise BadRequest("Header too large")
+        if len(head) > MAX_HEADER_SIZE:
+            raise BadRequest("Header too large")
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise BadRequest(f"Malformed request line: {lines[0]!r}")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        else:
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        url = urlsplit(target)
+        return Request(
+            method=method.upper(),
+            path=url.path,
+            query=dict(parse_qsl(url.query)),
+            headers=headers,
+            body=body,
+        )
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        parts = []
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                # Skip trailers
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                return b"".join(parts)
+            parts.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    async def _dispatch(self, request: Request) -> Response:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None and request.method == "OPTIONS":
+            return Response(status=204, headers={"allow": "GET, POST, OPTIONS"})
+        if handler is None:
+            handler = self.fallback
+        if handler is None:
+            return Response(status=404, body=b"Not Found", content_type="text/plain")
+        return await handler(request)
+
+    async def _write_response(
+        self, writer: asyncio.StreamWriter, response: Response, keep_alive: bool
+    ) -> bool:
+        """Write ``response`` and return whether the connection can be reused."""
+        reason = HTTPStatus(response.status).phrase
+        headers = {
+            "content-type": response.content_type,
+            "connection": "keep-alive" if keep_alive else "close",
+            **response.headers,
+        }
+        streaming = not isinstance(response.body, bytes)
+        if streaming:
+            headers["transfer-encoding"] = "chunked"
+        else:
+            headers["content-length"] = str(len(response.body))
+
+        head = f"HTTP/1.1 {response.status} {reason}\r\n"
+        head += "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n")
+
+        if not streaming:
+            writer.write(response.body)
+            await writer.drain()
+            return keep_alive
+
+        body = response.body
+        try:
+            async for chunk in body:
+                if chunk:
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except AbortConnection:
+            return False
+        finally:
+            # Lets the body notice a disconnected client in its own finally
+            if hasattr(body, "aclose"):
+                await body.aclose()
+        return keep_alive
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except BadRequest as e:
+                    await self._write_response(
+                        writer,
+                        Response(400, str(e).encode(), "text/plain"),
+                        keep_alive=False,
+                    )
+                    break
+                if request is None:
+                    break
+
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                try:
+                    response = await self._dispatch(request)
+                except Exception as e:
+                    logger.exception(f"Error handling {request.method} {request.path}")
+                    response = Response(500, str(e).encode(), "text/plain")
+                if not await self._write_response(writer, response, keep_alive):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,153 @@
+import struct
+import time
+from typing import Callable
+
+HEADER_SIZE = 44
+# Rate of the 16-bit mono PCM that fish-speech produces, and so of all TTS
+# decoding, output files and playback
+SAMPLE_RATE = 44100
+
+
+def wav_header(
+    data_size: int,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = 1,
+    sample_width: int = 2,
+) -> bytes:
+    """A canonical 44 byte PCM WAV header for ``data_size`` bytes of frames."""
+    block_align = channels * sample_width
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        HEADER_SIZE - 8 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_size,
+    )
+
+
+def data_offset(data: bytes) -> int | None:
+    """Offset of the frames in a WAV, None if ``data`` holds no complete header.
+
+    Chunk sizes are only used to skip the chunks before ``data``, so headers
+    of streamed WAVs with placeholder sizes are handled as well.
+    """
+    if data[:4] != b"RIFF":
+        return None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        (size,) = struct.unpack("<I", data[offset + 4 : offset + 8])
+        if chunk_id == b"data":
+            return offset + 8
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def strip_header(data: bytes) -> tuple[bytes, bool]:
+    """Remove a leading WAV header, False if more bytes are needed to tell."""
+    if len(data) < 12:
+        return data, not b"RIFF".startswith(data[:4])
+    if data[:4] != b"RIFF":
+        return data, True
+    offset = data_offset(data)
+    if offset is None:
+        return data, False
+    return data[offset:], True
+
+
+class ProgressiveWavWriter:
+    """Writes streamed PCM to a WAV file that stays playable while it grows.
+
+    ``wave`` only fills in the RIFF and data sizes on close, so until then
+    players see an empty file. This writer rewrites both sizes every
+    ``update_interval`` seconds and flushes, so the file can be opened,
+    seeked and previewed while synthesis is still running. A WAV header at
+    the start of the stream, as sent by streaming backends, is dropped.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1,
+        sample_width: int = 2,
+        update_interval: float = 1.0,
+        on_update: Callable[[float], None] | None = None,
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.update_interval = update_interval
+        # Called with the playable duration after every header update
+        self.on_update = on_update
+        self.data_size = 0
+        self._head = b""
+        self._started = False
+        self._last_update = time.monotonic()
+        self._f = open(path, "wb")
+        self._f.write(wav_header(0, sample_rate, channels, sample_width))
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def duration(self) -> float:
+        frames = self.data_size // self.block_align
+        return frames / self.sample_rate
+
+    def write(self, data: bytes) -> bytes:
+        """Append ``data`` and return the PCM that was written, header removed."""
+        if not self._started:
+            data, self._started = strip_header(self._head + data)
+            if not self._started:
+                self._head = data
+                return b""
+            self._head = b""
+        if data:
+            self._f.write(data)
+            self.data_size += len(data)
+        if time.monotonic() - self._last_update >= self.update_interval:
+            self.update()
+        return data
+
+    def update(self):
+        """Write the current sizes into the header and flush to disk."""
+        self._last_update = time.monotonic()
+        # Only whole frames are announced, a partial one may still be arriving
+        size = self.data_size - self.data_size % self.block_align
+        self._f.seek(0)
+        self._f.write(
+            wav_header(size, self.sample_rate, self.channels, self.sample_width)
+        )
+        self._f.seek(0, 2)
+        self._f.flush()
+        if self.on_update is not None:
+            self.on_update(self.duration)
+
+    def close(self):
+        if self._f.closed:
+            return
+        if self._head:
+            # Too short to be a header after all
+            self._f.write(self._head)
+            self.data_size += len(self._head)
+            self._head = b""
+        self.update()
+        self._f.close()
+
+    def __enter__(self) -> "ProgressiveWavWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,19 @@
+import pytest
+
+from fish.cli.standin import StandInConfig, StandInServer
+
+
+@pytest.fixture
+def standin():
+    """Start stand-in TTS servers, returning the server and its TTS URL."""
+    servers = []
+
+    def start(**overrides) -> tuple[StandInServer, str]:
+        settings = dict(latency=0.01, throughput=100.0, jitter=0.0)
+        server = StandInServer(StandInConfig(**{**settings, **overrides}), port=0)
+        servers.append(server)
+        return server, server.start_in_thread() + "/v1/tts"
+
+    yield start
+    for server in servers:
+        server.shutdown()
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+
+import pytest
+
+from fish.services.scheduler import Priority, scheduler
+from fish.services.tts import RequestMetrics, TTSClient
+from fish.services.tts.batch import BatchRunner, load_batch_items
+
+
+def write_jsonl(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def test_loads_text_csv_and_jsonl(tmp_path):
+    text = tmp_path / "prompts.txt"
+    text.write_text("First line\n\nSecond line\n", encoding="utf-8")
+    items = load_batch_items(text, format="mp3")
+    assert [item.text for item in items] == ["First line", "Second line"]
+    assert all(item.output.endswith(".mp3") for item in items)
+
+    table = tmp_path / "prompts.csv"
+    table.write_text("text,output,temperature\nHi,greeting,0.5\n", encoding="utf-8")
+    [item] = load_batch_items(table)
+    assert item.output == "greeting.wav"
+    assert item.params == {"temperature": "0.5"}
+
+    [item] = load_batch_items(write_jsonl(tmp_path / "p.jsonl", [{"text": "Hi"}]))
+    assert item.params == {}
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("chapter/one.wav", "chapter/one.wav"),
+        ("../escape.wav", "escape.wav"),
+        ("/etc/passwd", "passwd.wav"),
+        ("C:\\out\\a.wav", "a.wav"),
+        ("a\\..\\..\\b.mp3", "b.mp3"),
+    ],
+)
+def test_output_names_stay_inside_the_output_directory(tmp_path, name, expected):
+    path = write_jsonl(tmp_path / "p.jsonl", [{"text": "Hi", "output": name}])
+    [item] = load_batch_items(path)
+    assert item.output == expected
+
+
+@pytest.mark.parametrize("name", ["", "..", "."])
+def test_unusable_output_names_get_a_default(tmp_path, name):
+    path = write_jsonl(tmp_path / "p.jsonl", [{"text": "Hi", "output": name}])
+    [item] = load_batch_items(path)
+    assert item.output.startswith("00000_") and item.output.endswith(".wav")
+
+
+def test_runs_items_into_subdirectories(standin, tmp_path):
+    server, url = standin()
+    rows = [{"text": f"Line {i}", "output": f"part{i % 2}/line{i}"} for i in range(5)]
+    items = load_batch_items(write_jsonl(tmp_path / "p.jsonl", rows))
+    runner = BatchRunner(
+        TTSClient(url, "", use_cache=False), items, tmp_path / "out", adaptive=True
+    )
+
+    results = runner.run()
+    assert [r.error for r in results] == [None] * 5
+    assert runner.stats.done == 5
+    assert (tmp_path / "out" / "part1" / "line3.wav").stat().st_size > 0
+    assert runner.limiter.in_flight == 0
+    assert runner.limiter.baseline is not None
+
+
+def test_stopped_requests_are_not_limiter_samples(standin, tmp_path):
+    _, url = standin(latency=5.0)
+    items = load_batch_items(write_jsonl(tmp_path / "p.jsonl", [{"text": "Hi"}] * 3))
+    runner = BatchRunner(
+        TTSClient(url, "", use_cache=False), items, tmp_path, adaptive=True
+    )
+    threading.Timer(0.3, runner.stop).start()
+
+    results = runner.run()
+    assert all(r.error == "stopped" for r in results)
+    assert runner.limiter.in_flight == 0
+    assert runner.limiter.baseline is None
+
+
+def test_concurrency_above_the_bulk_cap_runs_in_parallel(standin, tmp_path):
+    _, url = standin(latency=0.5)
+    rows = [{"text": f"Line {i}"} for i in range(16)]
+    items = load_batch_items(write_jsonl(tmp_path / "p.jsonl", rows))
+    runner = BatchRunner(
+        TTSClient(url, "", use_cache=False), items, tmp_path, concurrency=16
+    )
+    assert scheduler.limit(Priority.BULK) < 16
+
+    start = time.monotonic()
+    results = runner.run()
+    assert all(r.ok for r in results)
+    # Four at a time would take at least two seconds
+    assert time.monotonic() - start < 1.5
+    assert scheduler.limit(Priority.BULK) < 16
+
+
+def test_limiter_stays_within_the_scheduler_limit(standin, tmp_path):
+    _, url = standin()
+    items = load_batch_items(write_jsonl(tmp_path / "p.jsonl", [{"text": "Hi"}] * 40))
+    seen = []
+    runner = BatchRunner(
+        TTSClient(url, "", use_cache=False),
+        items,
+        tmp_path,
+        concurrency=6,
+        adaptive=True,
+        on_result=lambda r, s: seen.append((s.limit, scheduler.limit(Priority.BULK))),
+    )
+    runner.run()
+    assert runner.limiter.max_limit == 6
+    assert all(limit <= allowed for limit, allowed in seen)
+
+
+def test_queueing_counts_towards_latency(tmp_path):
+    runner = BatchRunner(TTSClient("http://backend", ""), [], tmp_path, adaptive=True)
+    metrics = RequestMetrics()
+    # Half a second waiting for a scheduler slot, then one on the backend
+    metrics.marks.update(build=0.5, last_byte=1.5)
+    assert runner.limiter.acquire()
+    runner._record(metrics, 10, None)
+    assert runner.limiter.baseline == pytest.approx(0.15)
+
+
+def test_unwritable_output_fails_the_item_only(standin, tmp_path):
+    _, url = standin()
+    # A file where the item's directory should be
+    (tmp_path / "taken").write_text("", encoding="utf-8")
+    rows = [{"text": "Hi", "output": "taken/a"}, {"text": "Hi", "output": "b"}]
+    items = load_batch_items(write_jsonl(tmp_path / "p.jsonl", rows))
+    runner = BatchRunner(
+        TTSClient(url, "", use_cache=False), items, tmp_path, adaptive=True
+    )
+
+    results = runner.run()
+    assert not results[0].ok and results[1].ok
+    assert runner.limiter.in_flight == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from fish.services.tts import ResultCache, TTSClient, TTSJob
+from fish.services.tts import job as job_module
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    results = ResultCache(tmp_path / "results", max_bytes=1 << 20)
+    speculative = ResultCache(tmp_path / "speculative", max_bytes=1 << 20)
+    monkeypatch.setattr(job_module, "result_cache", results)
+    monkeypatch.setattr(job_module, "speculative_cache", speculative)
+    return results, speculative
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=10)
+    cache.put_bytes("a", b"1234", ".wav")
+    cache.put_bytes("b", b"1234", ".wav")
+    cache.get("a")
+    cache.put_bytes("c", b"1234", ".wav")
+    assert cache.get("b") is None
+    assert cache.get("a").read_bytes() == b"1234"
+    # The index survives a restart
+    assert ResultCache(tmp_path, max_bytes=10).get("c") is not None
+
+
+def test_delete(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=100)
+    path = cache.put_bytes("a", b"1234", ".wav")
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    assert not path.exists()
+    assert cache.total_bytes == 0
+
+
+def test_speculative_result_is_used_once(caches, tmp_path):
+    _, speculative = caches
+    client = TTSClient("http://backend/v1/tts", "", use_cache=False)
+    first = TTSJob(client, "Hello", tmp_path / "first.wav")
+    speculative.put_bytes(first.request_key(), b"audio", ".wav")
+
+    assert first.load_cached() == tmp_path / "first.wav"
+    assert (tmp_path / "first.wav").read_bytes() == b"audio"
+    assert first.cache_hit
+
+    second = TTSJob(client, "Hello", tmp_path / "second.wav")
+    assert second.load_cached() is None
+
+
+def test_result_cache_replays_when_enabled(caches, tmp_path):
+    results, _ = caches
+    client = TTSClient("http://backend/v1/tts", "", use_cache=True)
+    job = TTSJob(client, "Hello", tmp_path / "out.wav")
+    results.put_bytes(job.cache_key(), b"audio", ".wav")
+    for _ in range(2):
+        assert TTSJob(client, "Hello", tmp_path / "out.wav").load_cached()
@@ -0,0 +1,87 @@
+import threading
+
+import httpx
+import pytest
+
+from fish.cli.standin import encode, synthesize, to_pcm
+from fish.services.tts import RequestCancelled, RequestMetrics, TTSClient
+from fish.utils.wav import strip_header
+
+TEXT = "Hello from the stand-in server."
+
+
+def test_synthesize_round_trip(standin, tmp_path):
+    server, url = standin()
+    client = TTSClient(url, "secret", use_cache=False)
+    path = tmp_path / "out.wav"
+    metrics = RequestMetrics()
+
+    size = client.synthesize(TEXT, path, metrics=metrics)
+    expected = encode(synthesize(TEXT), "wav")
+    assert path.read_bytes() == expected
+    assert size == metrics.bytes_received == len(expected)
+    assert metrics.backend == url
+    for phase in ("build", "upload", "last_byte"):
+        assert metrics.elapsed(phase) is not None
+    assert server.stats["completed"] == 1
+
+
+def test_streaming_round_trip(standin):
+    _, url = standin(chunk_ms=50)
+    client = TTSClient(url, "", use_cache=False)
+
+    with client.post(client.build_request(TEXT, streaming=True)) as response:
+        chunks = list(response.iter_content())
+    assert len(chunks) > 1
+    pcm, found = strip_header(b"".join(chunks))
+    assert found
+    assert pcm == to_pcm(synthesize(TEXT))
+
+
+def test_request_fields_reach_the_server(standin, tmp_path):
+    _, url = standin()
+    client = TTSClient(url, "", use_cache=False, format="pcm", chunk_length=100)
+    client.synthesize(TEXT, tmp_path / "out.pcm")
+    assert (tmp_path / "out.pcm").read_bytes() == to_pcm(synthesize(TEXT))
+
+
+def test_error_status_is_raised(standin, tmp_path):
+    _, url = standin(failure_rate=1.0, failure_status=422)
+    client = TTSClient(url, "", use_cache=False)
+    with pytest.raises(httpx.HTTPStatusError) as info:
+        client.synthesize(TEXT, tmp_path / "out.wav")
+    assert info.value.response.status_code == 422
+
+
+def test_cancel_aborts_a_running_request(standin, tmp_path):
+    server, url = standin(latency=5.0)
+    client = TTSClient(url, "", use_cache=False)
+    threading.Timer(0.2, client.cancel).start()
+    with pytest.raises(RequestCancelled):
+        client.synthesize(TEXT, tmp_path / "out.wav")
+    assert server.stats["completed"] == 0
+
+
+def test_cancel_before_sending(standin, tmp_path):
+    server, url = standin()
+    client = TTSClient(url, "", use_cache=False)
+    client.cancel()
+    with pytest.raises(RequestCancelled):
+        client.synthesize(TEXT, tmp_path / "out.wav")
+    assert server.stats["requests"] == 0
+
+
+def test_cancel_while_packing(standin, tmp_path, monkeypatch):
+    server, url = standin()
+    client = TTSClient(url, "", use_cache=False)
+    pack = client.pack
+
+    def slow_pack(request):
+        # As if stopped while references are loaded
+        client.cancel()
+        return pack(request)
+
+    monkeypatch.setattr(client, "pack", slow_pack)
+    with pytest.raises(RequestCancelled):
+        client.synthesize(TEXT, tmp_path / "out.wav")
+    assert server.stats["requests"] == 0
@@ -0,0 +1,77 @@
+import threading
+
+import httpx
+
+from fish.services.tts.limiter import AdaptiveLimiter
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://backend/v1/tts")
+    response = httpx.Response(status, request=request)
+    return httpx.HTTPStatusError("failed", request=request, response=response)
+
+
+def complete(limiter: AdaptiveLimiter, latency: float, chars: int = 100, error=None):
+    assert limiter.acquire()
+    limiter.record(latency, chars, error)
+
+
+def test_grows_after_a_limit_of_successes():
+    limiter = AdaptiveLimiter(initial=2, max_limit=4)
+    complete(limiter, 1.0)
+    assert limiter.current == 2
+    complete(limiter, 1.0)
+    assert limiter.current == 3
+
+    for _ in range(10):
+        complete(limiter, 1.0)
+    assert limiter.current == 4
+    assert limiter.in_flight == 0
+
+
+def test_overload_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial=10, backoff=0.5)
+    complete(limiter, 1.0, error=status_error(503))
+    assert limiter.current == 5
+    # Failures of the same overload within one latency only count once
+    complete(limiter, 1.0, error=status_error(429))
+    assert limiter.current == 5
+
+
+def test_client_errors_do_not_cut_the_limit():
+    limiter = AdaptiveLimiter(initial=4)
+    complete(limiter, 1.0, error=status_error(422))
+    assert limiter.current == 4
+
+
+def test_rising_latency_cuts_the_limit():
+    limiter = AdaptiveLimiter(initial=8, tolerance=1.5, backoff=0.5)
+    complete(limiter, 1.0)
+    for _ in range(10):
+        complete(limiter, 5.0)
+    assert limiter.current < 8
+    assert limiter.smoothed > 1.5 * limiter.baseline
+
+
+def test_record_without_latency_only_releases():
+    limiter = AdaptiveLimiter(initial=2)
+    assert limiter.acquire()
+    limiter.record(None, 100)
+    assert limiter.in_flight == 0
+    assert limiter.current == 2
+    assert limiter.baseline is None
+    assert limiter.throughput == 0.0
+
+
+def test_acquire_blocks_at_the_limit_until_closed():
+    limiter = AdaptiveLimiter(initial=1)
+    assert limiter.acquire()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    waiter.start()
+    waiter.join(0.05)
+    assert waiter.is_alive()
+
+    limiter.close()
+    waiter.join(1)
+    assert results == [False]
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from fish.cli.loadtest import audio_seconds, main
+from fish.cli.standin import encode, synthesize
+
+TEXT = "Hello, this is a load test."
+
+
+def test_audio_seconds_of_wav():
+    audio = synthesize(TEXT)
+    assert audio_seconds(encode(audio, "wav")) == pytest.approx(len(audio) / 44100)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_closed_loop_report(standin, tmp_path, streaming):
+    server, url = standin()
+    report_path = tmp_path / "report.json"
+    argv = [url, "--text", TEXT, "--requests", "6", "--concurrency", "2"]
+    argv += ["--json", str(report_path)] + (["--streaming"] if streaming else [])
+
+    assert main(argv) == 0
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["requests"] == report["succeeded"] == 6
+    assert report["errors"] == {}
+    assert report["latency"]["ttfb"]["p50"] > 0
+    assert report["rtf"]["max"] < 1
+    assert server.stats["completed"] == 6
+
+
+def test_errors_are_counted(standin, tmp_path):
+    _, url = standin(failure_rate=1.0, failure_status=503)
+    report_path = tmp_path / "report.json"
+    main([url, "--text", TEXT, "--requests", "3", "--json", str(report_path)])
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["succeeded"] == 0
+    assert report["error_rate"] == 1.0
+    assert sum(report["errors"].values()) == 3
@@ -0,0 +1,74 @@
+import pytest
+
+from fish.services.tts.longform import CHAPTER_HEADING, split_chapters
+
+
+def test_splits_chapters_and_paragraphs():
+    text = """Opening words before any heading.
+
+Chapter 1
+The first line
+continues here.
+
+Part of me wanted to leave.
+
+CHAPTER TWO: The Storm
+Rain.
+
+# Epilogue
+Done."""
+    chapters = split_chapters(text, default_title="Intro")
+    assert [c.title for c in chapters] == [
+        "Intro",
+        "Chapter 1",
+        "CHAPTER TWO: The Storm",
+        "Epilogue",
+    ]
+    assert chapters[0].paragraphs == ["Opening words before any heading."]
+    # Headings are read out first, lines of a paragraph are joined
+    assert chapters[1].paragraphs == [
+        "Chapter 1",
+        "The first line continues here.",
+        "Part of me wanted to leave.",
+    ]
+
+
+def test_chinese_headings():
+    chapters = split_chapters("第一章 开始\n正文。\n\n第二章\n更多。")
+    assert [c.title for c in chapters] == ["第一章 开始", "第二章"]
+    assert chapters[1].paragraphs == ["第二章", "更多。"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "Chapter 12",
+        "Chapter 12.",
+        "chapter xiv: The Return",
+        "Part IV - Winter",
+        "Book Three",
+        "Chapter Twenty-One The Long Night",
+        "Prologue",
+        "Epilogue: After",
+        "## Notes",
+        "第十二章 重逢",
+        "序章",
+    ],
+)
+def test_heading_lines(line):
+    assert CHAPTER_HEADING.match(line)
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "Part of me wanted to leave.",
+        "Book me a table, she said.",
+        "Chapter and verse were quoted.",
+        "Chapter 3 was the best one.",
+        "Prologues are often skipped",
+        "#hashtag",
+    ],
+)
+def test_prose_lines(line):
+    assert not CHAPTER_HEADING.match(line)
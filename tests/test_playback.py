@@ -0,0 +1,44 @@
+import pytest
+
+try:
+    from fish.services.playback import RingBuffer
+except OSError:
+    # sounddevice raises OSError when the PortAudio library is missing
+    pytest.skip("PortAudio library not found", allow_module_level=True)
+
+
+def test_fifo_order():
+    ring = RingBuffer(8)
+    assert ring.write(b"abc") == 3
+    assert ring.write(b"de") == 2
+    assert ring.read(4) == b"abcd"
+    assert ring.size == 1
+    assert ring.free == 7
+
+
+def test_write_takes_only_what_fits():
+    ring = RingBuffer(4)
+    assert ring.write(b"abcdef") == 4
+    assert ring.write(b"g") == 0
+    assert ring.read(10) == b"abcd"
+    assert ring.read(1) == b""
+
+
+def test_wraps_around():
+    ring = RingBuffer(5)
+    ring.write(b"abcd")
+    assert ring.read(3) == b"abc"
+    # Three of these bytes wrap to the start of the buffer
+    assert ring.write(b"efgh") == 4
+    assert ring.free == 0
+    assert ring.read(5) == b"defgh"
+
+
+def test_clear():
+    ring = RingBuffer(4)
+    ring.write(b"abc")
+    ring.read(2)
+    ring.clear()
+    assert ring.size == 0 and ring.free == 4
+    ring.write(b"wxyz")
+    assert ring.read(4) == b"wxyz"
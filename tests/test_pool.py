@@ -0,0 +1,101 @@
+import socket
+
+import pytest
+
+from fish.config import config
+from fish.services.tts import BackendPool, NoBackendError, RequestMetrics, TTSClient
+from fish.services.tts.pool import HEDGE_MIN_SAMPLES
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(config, "hedge", True)
+    monkeypatch.setattr(config, "hedge_percentile", 95.0)
+    monkeypatch.setattr(config, "hedge_min_delay", 0.0)
+
+
+@pytest.fixture(autouse=True)
+def no_hedging(monkeypatch):
+    monkeypatch.setattr(config, "hedge", False)
+
+
+def unused_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1/tts"
+
+
+def test_rejects_missing_or_invalid_backends():
+    with pytest.raises(NoBackendError):
+        BackendPool("")
+    with pytest.raises(NoBackendError):
+        BackendPool("ftp://example.com/v1/tts")
+
+
+def test_prefers_the_endpoint_with_the_lowest_expected_wait(standin):
+    _, fast = standin()
+    _, slow = standin()
+    pool = BackendPool([slow, fast])
+    pool.endpoint(fast).latency = 0.1
+    pool.endpoint(slow).latency = 1.0
+
+    first = pool.acquire()
+    assert first.url == fast
+    # Ten requests queued on the fast replica cost more than one on the slow
+    first.outstanding = 10
+    assert pool.acquire().url == slow
+
+
+def test_fails_over_on_server_error(standin, tmp_path):
+    failing, bad = standin(failure_rate=1.0, failure_status=503)
+    healthy, good = standin()
+    client = TTSClient(f"{bad},{good}", "", use_cache=False)
+
+    assert client.synthesize("Hello", tmp_path / "out.wav") > 0
+    assert failing.stats["failures"] == 1
+    assert healthy.stats["completed"] == 1
+    assert not client.pool.endpoint(bad).healthy
+
+
+def test_fails_over_when_unreachable(standin, tmp_path):
+    down = unused_url()
+    healthy, good = standin()
+    client = TTSClient(f"{down},{good}", "", use_cache=False)
+    metrics = RequestMetrics()
+
+    assert client.synthesize("Hello", tmp_path / "out.wav", metrics=metrics) > 0
+    assert metrics.backend == good
+    assert not client.pool.endpoint(down).healthy
+
+
+def test_hedges_a_slow_primary(standin, hedging, tmp_path):
+    slow_server, slow = standin(latency=2.0)
+    fast_server, fast = standin()
+    client = TTSClient(f"{slow},{fast}", "", use_cache=False)
+    primary = client.pool.endpoint(slow)
+    # Route to the slow replica, which usually answers within 50 ms
+    primary.latency = 0.001
+    primary.answers.extend([0.05] * HEDGE_MIN_SAMPLES)
+    client.pool.endpoint(fast).latency = 1.0
+    metrics = RequestMetrics()
+
+    assert client.synthesize("Hello", tmp_path / "out.wav", metrics=metrics) > 0
+    assert metrics.hedged and metrics.hedge_won
+    assert metrics.backend == fast
+    assert metrics.elapsed("last_byte") < 2.0
+    assert fast_server.stats["completed"] == 1
+    assert slow_server.stats["completed"] == 0
+
+
+def test_no_hedge_without_enough_samples(standin, hedging, tmp_path):
+    _, slow = standin(latency=0.1)
+    _, fast = standin()
+    client = TTSClient(f"{slow},{fast}", "", use_cache=False)
+    client.pool.endpoint(slow).latency = 0.001
+    client.pool.endpoint(fast).latency = 1.0
+    metrics = RequestMetrics()
+
+    client.synthesize("Hello", tmp_path / "out.wav", metrics=metrics)
+    assert not metrics.hedged
+    assert metrics.backend == slow
@@ -0,0 +1,78 @@
+import ormsgpack
+import pytest
+
+from fish.config import config
+from fish.services.tts import ReferenceCache, ServeReferenceAudio, ServeTTSRequest
+from fish.services.tts.reference import pack_tts_request
+
+
+def packb(request: ServeTTSRequest) -> bytes:
+    return ormsgpack.packb(request, option=ormsgpack.OPT_SERIALIZE_PYDANTIC)
+
+
+@pytest.fixture
+def reference_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "reference_preprocess", False)
+    paths = []
+    for i, text in enumerate(["First reference.", "第二个参考。"]):
+        audio = tmp_path / f"ref{i}.wav"
+        audio.write_bytes(bytes(range(256)) * (i + 3))
+        audio.with_suffix(".lab").write_text(text, encoding="utf-8")
+        paths.append(str(audio))
+    return paths
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        ServeTTSRequest(text="Hello"),
+        ServeTTSRequest(
+            text="A longer text, streamed as mp3",
+            streaming=True,
+            format="mp3",
+            reference_id="voice",
+            temperature=0.5,
+            chunk_length=150,
+        ),
+    ],
+)
+def test_pack_matches_ormsgpack(request_, reference_files):
+    cache = ReferenceCache(max_bytes=1 << 20)
+    entries = [cache.get(path) for path in reference_files]
+    references = [ServeReferenceAudio(audio=e.audio, text=e.text) for e in entries]
+
+    assert pack_tts_request(request_, []) == packb(request_)
+    expected = packb(request_.model_copy(update={"references": references}))
+    assert pack_tts_request(request_, entries) == expected
+
+
+def test_cache_entries_are_reused_until_the_files_change(reference_files):
+    cache = ReferenceCache(max_bytes=1 << 20)
+    entry = cache.get(reference_files[0])
+    assert cache.get(reference_files[0]) is entry
+
+    with open(reference_files[0][:-4] + ".lab", "a", encoding="utf-8") as f:
+        f.write(" Edited.")
+    changed = cache.get(reference_files[0])
+    assert changed is not entry
+    assert changed.text == "First reference. Edited."
+
+
+def test_reference_without_transcript_is_skipped(tmp_path):
+    audio = tmp_path / "ref.wav"
+    audio.write_bytes(b"RIFF")
+    assert ReferenceCache(max_bytes=1 << 20).get(str(audio)) is None
+
+
+def test_cache_entries_follow_preprocessing_settings(reference_files, monkeypatch):
+    cache = ReferenceCache(max_bytes=1 << 20)
+    entry = cache.get(reference_files[0])
+    for name, value in [
+        ("reference_preprocess", True),
+        ("reference_flac", not config.reference_flac),
+        ("reference_sample_rate", config.reference_sample_rate // 2),
+    ]:
+        monkeypatch.setattr(config, name, value)
+        changed = cache.get(reference_files[0])
+        assert changed is not entry
+        entry = changed
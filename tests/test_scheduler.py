@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from fish.services.scheduler import Priority, RequestScheduler
+
+
+def make_scheduler(max_concurrency: int = 1, **limits) -> RequestScheduler:
+    caps = {p: limits.get(p.name.lower(), 1) for p in Priority}
+    return RequestScheduler(caps, max_concurrency)
+
+
+def test_grants_up_to_the_class_limit():
+    scheduler = make_scheduler(max_concurrency=4, bulk=2)
+    tickets = [scheduler.submit(Priority.BULK) for _ in range(3)]
+    assert [t.granted for t in tickets] == [True, True, False]
+    assert scheduler.pending[Priority.BULK] == 1
+
+    scheduler.release(tickets[0])
+    assert tickets[2].granted
+    assert scheduler.running[Priority.BULK] == 2
+
+
+def test_higher_priority_is_admitted_first():
+    scheduler = make_scheduler()
+    running = scheduler.submit(Priority.BULK)
+    bulk = scheduler.submit(Priority.BULK)
+    speculative = scheduler.submit(Priority.SPECULATIVE)
+    interactive = scheduler.submit(Priority.INTERACTIVE)
+
+    scheduler.release(running)
+    assert interactive.granted
+    assert not bulk.granted and not speculative.granted
+
+    scheduler.release(interactive)
+    assert bulk.granted and not speculative.granted
+
+
+def test_waiting_class_blocks_lower_classes():
+    scheduler = make_scheduler(max_concurrency=3, interactive=1, bulk=2)
+    scheduler.submit(Priority.INTERACTIVE)
+    waiting = scheduler.submit(Priority.INTERACTIVE)
+    bulk = scheduler.submit(Priority.BULK)
+    # There is room for bulk, but it must not overtake the waiting click
+    assert not waiting.granted
+    assert not bulk.granted
+
+
+def test_cancel_pending_ticket():
+    scheduler = make_scheduler()
+    running = scheduler.submit(Priority.BULK)
+    pending = scheduler.submit(Priority.BULK)
+
+    scheduler.cancel(pending)
+    assert pending.cancelled and pending.done
+    assert not pending.wait(timeout=0)
+    assert scheduler.pending[Priority.BULK] == 0
+
+    # The cancelled ticket must not take the slot that frees up
+    scheduler.release(running)
+    assert scheduler.running[Priority.BULK] == 0
+    assert scheduler.submit(Priority.BULK).granted
+
+
+def test_release_is_idempotent():
+    scheduler = make_scheduler()
+    ticket = scheduler.submit(Priority.CHAT)
+    scheduler.release(ticket)
+    scheduler.release(ticket)
+    scheduler.cancel(ticket)
+    assert scheduler.running[Priority.CHAT] == 0
+    assert not ticket.cancelled
+
+
+def test_aslot_raises_when_cancelled():
+    scheduler = make_scheduler()
+    running = scheduler.submit(Priority.BULK)
+
+    async def main():
+        async def enter():
+            async with scheduler.aslot(Priority.BULK):
+                pass
+
+        task = asyncio.create_task(enter())
+        await asyncio.sleep(0.01)
+        [ticket] = scheduler._pending
+        scheduler.cancel(ticket)
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert scheduler.pending[Priority.BULK] == 0
+    scheduler.release(running)
+    assert scheduler.running[Priority.BULK] == 0
+
+
+def test_widen_raises_a_class_cap_for_the_block():
+    scheduler = make_scheduler(max_concurrency=2, bulk=1, interactive=1)
+    tickets = [scheduler.submit(Priority.BULK) for _ in range(4)]
+    assert [t.granted for t in tickets] == [True, False, False, False]
+
+    with scheduler.widen(Priority.BULK, 3):
+        assert scheduler.limit(Priority.BULK) == 3
+        assert [t.granted for t in tickets] == [True, True, True, False]
+        # Interactive requests keep their own slot on top of the widened class
+        assert scheduler.submit(Priority.INTERACTIVE).granted
+
+    assert scheduler.limit(Priority.BULK) == 1
+    for ticket in tickets[:3]:
+        scheduler.release(ticket)
+    assert tickets[3].granted
@@ -0,0 +1,61 @@
+import pytest
+
+from fish.services.tts.segment import split_sentences
+
+
+def test_splits_at_sentence_ends():
+    text = "Hello there. How are you today? I am fine."
+    assert split_sentences(text) == [
+        "Hello there.",
+        "How are you today?",
+        "I am fine.",
+    ]
+
+
+def test_merges_short_sentences():
+    text = "Hi. Ok. Then a longer sentence follows here."
+    assert split_sentences(text) == [text]
+    assert split_sentences("你好，世界。今天天气很好！我们去公园吧？") == [
+        "你好，世界。今天天气很好！",
+        "我们去公园吧？",
+    ]
+
+
+def test_decimal_point_is_not_a_break():
+    assert split_sentences("Version 3.14 is out. Yes") == [
+        "Version 3.14 is out.",
+        "Yes",
+    ]
+
+
+def test_long_sentences_split_at_weak_breaks():
+    text = "one, two, three, four, five, six, seven, eight, nine, ten, eleven"
+    segments = split_sentences(text, max_chars=20)
+    assert all(len(segment) <= 20 for segment in segments)
+    assert " ".join(segments) == text
+
+
+def test_emotion_tags_repeat_until_line_break():
+    text = "[INST]happy[/INST]First sentence here. Second sentence here.\nPlain line."
+    assert split_sentences(text) == [
+        "[INST]happy[/INST]First sentence here.",
+        "[INST]happy[/INST]Second sentence here.",
+        "Plain line.",
+    ]
+
+
+@pytest.mark.parametrize("text", ["", "   \n ", "[INST]sad[/INST]"])
+def test_nothing_to_say(text):
+    assert split_sentences(text) == []
+
+
+def test_each_segment_has_one_emotion():
+    text = "[INST]a[/INST]Hello there friend.\n[INST]b[/INST]Another line here."
+    assert split_sentences(text) == [
+        "[INST]a[/INST]Hello there friend.",
+        "[INST]b[/INST]Another line here.",
+    ]
+    assert split_sentences("[INST]a[/INST]Hi.\n[INST]b[/INST]Yo.") == [
+        "[INST]a[/INST]Hi.",
+        "[INST]b[/INST]Yo.",
+    ]
@@ -0,0 +1,81 @@
+import wave
+
+import pytest
+
+from fish.utils.wav import (
+    HEADER_SIZE,
+    ProgressiveWavWriter,
+    data_offset,
+    strip_header,
+    wav_header,
+)
+
+
+def frames(wav_path) -> bytes:
+    with wave.open(str(wav_path), "rb") as f:
+        return f.readframes(f.getnframes())
+
+
+def test_header_matches_wave_module(tmp_path):
+    path = tmp_path / "ref.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(22050)
+        f.writeframes(b"\x01\x02" * 20)
+    assert path.read_bytes()[:HEADER_SIZE] == wav_header(40, 22050, 2, 2)
+
+
+def test_strip_header():
+    pcm = b"\x01\x00" * 8
+    assert strip_header(wav_header(0) + pcm) == (pcm, True)
+    assert strip_header(pcm) == (pcm, True)
+    # A partial header cannot be told apart from PCM yet
+    assert strip_header(b"RIF") == (b"RIF", False)
+    assert strip_header(wav_header(0)[:30]) == (wav_header(0)[:30], False)
+
+
+def test_data_offset_skips_extra_chunks():
+    header = wav_header(0)
+    # A LIST chunk with an odd size is padded to an even boundary
+    extra = b"LIST" + (3).to_bytes(4, "little") + b"abc\x00"
+    wav = header[:36] + extra + header[36:]
+    assert data_offset(wav) == HEADER_SIZE + len(extra)
+    assert data_offset(wav[:40]) is None
+    assert data_offset(b"\x01\x00" * 30) is None
+
+
+@pytest.mark.parametrize("split", [1, 7, HEADER_SIZE - 1, HEADER_SIZE + 3])
+def test_streamed_header_is_dropped(tmp_path, split):
+    pcm = bytes(range(200))
+    stream = wav_header(0) + pcm
+    path = tmp_path / "out.wav"
+    with ProgressiveWavWriter(str(path)) as writer:
+        written = writer.write(stream[:split]) + writer.write(stream[split:])
+    assert written == pcm
+    assert frames(path) == pcm
+
+
+def test_playable_while_growing(tmp_path):
+    path = tmp_path / "out.wav"
+    updates = []
+    writer = ProgressiveWavWriter(
+        str(path), update_interval=0, on_update=updates.append
+    )
+    writer.write(b"\x00\x01" * 441)
+    # An odd byte is not announced until the rest of its frame arrives
+    writer.write(b"\x02")
+    assert frames(path) == b"\x00\x01" * 441
+    assert updates[-1] == pytest.approx(0.01)
+
+    writer.write(b"\x03")
+    writer.close()
+    assert frames(path) == b"\x00\x01" * 441 + b"\x02\x03"
+    assert writer.duration == pytest.approx(442 / 44100)
+
+
+def test_short_stream_without_header(tmp_path):
+    path = tmp_path / "out.wav"
+    with ProgressiveWavWriter(str(path)) as writer:
+        writer.write(b"RI")
+    assert frames(path) == b"RI"